@@ -21,6 +21,7 @@ from app.utils.file_utils import write_file
 from app.modules.cloud_sync import post_history_added_products_to_cloud, load_products_from_cloud, load_rfids_from_cloud, load_posters_from_cloud, load_combo_from_cloud
 from app.utils.sound_utils import play_sound
 from app.modules import globals
+from app.modules.device_commands import RfidStateChanged, device_commands
 from dotenv import load_dotenv
 
 def adding_product():
@@ -36,7 +37,7 @@ def adding_product():
         print(f"Error loading data from cloud: {e}")
 
     globals.bool_rfid_devices = True 
-    globals.bool_rfid = True
+    device_commands.post(RfidStateChanged(1))
 
 def added_product():
     load_dotenv()
@@ -78,4 +79,4 @@ def added_product():
         print(f"Error posting history added data to cloud: {e}")
 
     globals.bool_rfid_devices = True 
-    globals.bool_rfid = True
\ No newline at end of file
+    device_commands.post(RfidStateChanged(0))
@@ -0,0 +1,147 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+BLE Outbox - pending GATT writes of one device, the latest value per characteristic
+
+put() can be called from any thread and replaces a value that was not written yet (last write
+wins), so repeated RFID taps or a reconnect never send stale weight/name/price payloads.
+Characteristics listed in `commands` are edge-triggered firmware commands (save quantity: [0]
+then [1] must reach the loadcell as two writes), so every put of those is queued and written in
+turn instead of replacing the pending one.
+The device task writes the pending characteristics in `order` (others after, oldest first);
+a value is only removed once it was written, a failed write stays pending for the next connection
+unless a newer value replaced it.
+"""
+import asyncio
+import threading
+import time
+
+# Every outbox by device name, for the debug endpoint
+outboxes = {}
+
+
+class BleOutbox:
+    """Last-write-wins pending writes of one device, flushed in a fixed characteristic order"""
+
+    def __init__(self, device_name, order=(), commands=()):
+        self.device_name = device_name
+        self.order = [char_uuid for char_uuid in order if char_uuid]
+        self.commands = {char_uuid for char_uuid in commands if char_uuid}
+        self._lock = threading.Lock()
+        # char_uuid (or (char_uuid, seq) for commands) -> (char_uuid, data, seq, queued_at)
+        self._pending = {}
+        self._seq = 0
+        self._loop = None
+        self._event = None
+        self.puts = 0
+        self.coalesced = 0
+        self.writes = 0
+        self.failures = 0
+        self.last_write_at = None
+        outboxes[device_name] = self
+
+    def attach(self, loop):
+        """Bind to the BLE event loop the device task runs on"""
+        self._loop = loop
+        self._event = None  # Created by wait(), on the loop
+
+    def _wake(self):
+        loop, event = self._loop, self._event
+        if loop is None or event is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # Loop closed in between
+
+    def put(self, char_uuid, data):
+        """Queue a write, replacing the pending value of this characteristic unless it is a command (thread-safe)"""
+        with self._lock:
+            self._seq += 1
+            if char_uuid in self.commands:
+                key = (char_uuid, self._seq)
+            else:
+                key = char_uuid
+                if key in self._pending:
+                    self.coalesced += 1
+                    del self._pending[key]  # Re-insert: keeps "oldest first" for unordered chars
+            self._pending[key] = (char_uuid, list(data), self._seq, time.monotonic())
+            self.puts += 1
+        self._wake()
+
+    def next_write(self):
+        """(char_uuid, data, seq) to write next, None when nothing is pending"""
+        with self._lock:
+            if not self._pending:
+                return None
+            # Insertion order: the oldest pending write of each characteristic comes first
+            entry = None
+            for char_uuid in self.order:
+                entry = next((e for e in self._pending.values() if e[0] == char_uuid), None)
+                if entry is not None:
+                    break
+            else:
+                entry = next(iter(self._pending.values()))
+            char_uuid, data, seq, _ = entry
+            return char_uuid, data, seq
+
+    def ack(self, char_uuid, seq):
+        """The write of seq succeeded: drop it unless a newer value was put meanwhile"""
+        with self._lock:
+            key = (char_uuid, seq) if char_uuid in self.commands else char_uuid
+            entry = self._pending.get(key)
+            if entry is not None and entry[2] == seq:
+                del self._pending[key]
+            self.writes += 1
+            self.last_write_at = time.time()
+
+    def fail(self, char_uuid, seq):
+        """The write failed: the value stays pending and is written again after reconnecting"""
+        with self._lock:
+            self.failures += 1
+
+    async def wait(self, timeout=None):
+        """Wait until something is pending (returns at once when it already is)"""
+        if self._event is None:
+            self._loop = asyncio.get_running_loop()
+            self._event = asyncio.Event()
+        self._event.clear()
+        with self._lock:
+            if self._pending:
+                return True
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'pending': len(self._pending),
+                'oldest_pending_s': round(max((now - entry[3] for entry in self._pending.values()), default=0.0), 3),
+                'puts': self.puts,
+                'writes': self.writes,
+                'coalesced': self.coalesced,
+                'failures': self.failures,
+                'last_write_at': self.last_write_at,
+            }
+
+
+def get_outbox_stats():
+    """Pending/written/coalesced writes of every device"""
+    return {name: outbox.stats() for name, outbox in list(outboxes.items())}
@@ -0,0 +1,205 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+BLE Runtime - one asyncio event loop thread for every BLE peripheral
+
+The loadcells and the XG26 sensor run as tasks on this loop instead of one loop (and one BlueZ
+D-Bus connection, bleak keeps one per loop) per device thread. Other threads submit coroutines
+or callbacks with submit()/call_soon(); add_device() runs a device's connect loop as a task and
+restarts it if it ever exits with an error. Each device reports connects, notifications, reads,
+writes and errors through its BleDeviceStats.
+"""
+import asyncio
+import threading
+import time
+
+
+class BleDeviceStats:
+    """Connection state and traffic counters of one device"""
+
+    COUNTERS = ('notifications', 'reads', 'writes', 'errors', 'restarts')
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.connected = False
+        self.connects = 0
+        self.disconnects = 0
+        self.counters = {key: 0 for key in self.COUNTERS}
+        self.connected_at = None
+        self.last_activity_at = None
+
+    def set_connected(self, connected):
+        with self._lock:
+            if connected and not self.connected:
+                self.connects += 1
+                self.connected_at = time.time()
+            elif not connected and self.connected:
+                self.disconnects += 1
+            self.connected = connected
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+            self.last_activity_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'connected': self.connected,
+                'connects': self.connects,
+                'disconnects': self.disconnects,
+                **self.counters,
+                'connected_for_s': round(time.time() - self.connected_at, 1) if self.connected and self.connected_at else 0.0,
+                'last_activity_at': self.last_activity_at,
+            }
+
+
+class BleRuntime:
+    """Owns the BLE event loop thread and the device tasks running on it"""
+
+    def __init__(self, lag_interval=1.0):
+        self.lag_interval = lag_interval
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._devices = {}
+        self._tasks = {}
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def is_running(self):
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self):
+        """Start the loop thread (once); returns the loop"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._loop = loop
+            self._thread = threading.Thread(target=self._run, args=(loop, ready), name="ble-runtime", daemon=True)
+            self._thread.start()
+        ready.wait()
+        return loop
+
+    def _run(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.create_task(self._measure_lag())
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _measure_lag(self):
+        # How late the loop runs a callback: notification handlers that block show up here
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, time.monotonic() - start - self.lag_interval)
+            self.loop_lag = lag
+            self.max_loop_lag = max(self.max_loop_lag, lag)
+
+    def submit(self, coro):
+        """Run a coroutine on the BLE loop from any thread, returns a concurrent.futures.Future"""
+        if self._loop is None:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def call_soon(self, callback, *args):
+        """Run a plain callback on the BLE loop from any thread"""
+        if self._loop is None:
+            self.start()
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def device(self, name):
+        """Stats of a device, created on first use"""
+        with self._lock:
+            stats = self._devices.get(name)
+            if stats is None:
+                stats = self._devices[name] = BleDeviceStats(name)
+            return stats
+
+    def add_device(self, name, connect, *args, restart_delay=5.0):
+        """
+        Run connect(*args) (a device's reconnect loop coroutine function) as a task on the BLE loop
+        It is started again after restart_delay if it returns or raises
+        """
+        stats = self.device(name)
+
+        async def supervise():
+            while True:
+                try:
+                    await connect(*args)
+                except asyncio.CancelledError:
+                    stats.set_connected(False)
+                    raise
+                except Exception as e:
+                    print(f"[{name}] BLE task failed: {e}")
+                stats.set_connected(False)
+                stats.count('restarts')
+                await asyncio.sleep(restart_delay)
+
+        def create():
+            self._tasks[name] = self._loop.create_task(supervise())
+
+        self.call_soon(create)
+        return stats
+
+    def stop(self, timeout=5.0):
+        """Cancel the device tasks and stop the loop"""
+        loop, thread = self._loop, self._thread
+        if loop is None or loop.is_closed():
+            return
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            loop.stop()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop)
+        except RuntimeError:
+            return
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            self._loop = None
+            self._thread = None
+            self._tasks = {}
+
+    def stats(self):
+        with self._lock:
+            devices = dict(self._devices)
+        return {
+            'running': self.is_running(),
+            'thread': self._thread.name if self._thread is not None else None,
+            'loop_lag_ms': round(self.loop_lag * 1000, 2),
+            'max_loop_lag_ms': round(self.max_loop_lag * 1000, 2),
+            'devices': {name: stats.snapshot() for name, stats in devices.items()},
+        }
+
+
+# Global BLE runtime shared by the loadcells and the XG26 sensor
+ble_runtime = BleRuntime()
@@ -0,0 +1,482 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+BLE Simulation - fake BGM220 loadcells and XG26 sensor behind the subset of bleak the server uses
+
+With BLE_SIMULATION = "true" update_loadcell_quantity and xg26_sensor import BleakClient,
+BleakScanner and BleakError from here instead of bleak, so the server runs without the hardware.
+BleakClient supports `async with`, is_connected, start_notify/stop_notify, write_gatt_char and
+read_gatt_char; BleakScanner.find_device_by_address looks up the simulated peripherals.
+
+Peripherals are scriptable from any thread (take/put items, error codes, IMU lean/shake, notify
+rate, disconnects) and from a JSON script (BLE_SIM_SCRIPT):
+
+    {"loop_s": 60,
+     "devices": {"Loadcell_1": {"notify_hz": 2}, "XG26_Sensor": {"notify_hz": 10}},
+     "steps": [{"at": 5, "device": "Loadcell_1", "slot": 3, "take": 1},
+               {"at": 9, "device": "Loadcell_1", "slot": 3, "put": 1},
+               {"at": 12, "device": "Loadcell_2", "slot": 0, "error": 255},
+               {"at": 15, "device": "Loadcell_2", "slot": 0, "clear": true},
+               {"at": 20, "device": "XG26_Sensor", "mode": "shake"},
+               {"at": 23, "device": "XG26_Sensor", "mode": "still"},
+               {"at": 30, "device": "Loadcell_1", "disconnect": 5}]}
+"""
+import asyncio
+import json
+import os
+import random
+import struct
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BLE_SIMULATION = os.getenv("BLE_SIMULATION", "false").lower() == "true"
+
+loadcell_file_path = os.path.abspath(os.path.join(__file__, "../../..", "database/loadcell.json"))
+
+
+class BleakError(Exception):
+    """Raised like bleak.exc.BleakError by the simulated transport"""
+
+
+class SimCharacteristic:
+    """What bleak passes as `sender` to notification callbacks"""
+
+    def __init__(self, uuid, handle):
+        self.uuid = uuid
+        self.handle = handle
+
+    def __str__(self):
+        return f"{self.uuid} (Handle: {self.handle}): Simulated"
+
+
+class SimulatedPeripheral:
+    """A device on the simulated adapter: notifications, readable and writable characteristics"""
+
+    def __init__(self, name, address, notify_uuid=None, notify_hz=1.0, seed=None):
+        self.name = name
+        self.address = address.upper()
+        self.notify_uuid = notify_uuid
+        self.notify_hz = notify_hz
+        self.readable = {}
+        self.writes = deque(maxlen=1000)
+        self.last_written = {}
+        self.connect_delay = 0.05
+        self.write_latency = 0.005
+        self.fail_connects = 0
+        self.unavailable_until = 0.0
+        self.notifications = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.client = None
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._changed = None
+
+    # Behaviour
+    def payload(self):
+        raise NotImplementedError
+
+    def on_write(self, uuid, data):
+        with self._lock:
+            self.writes.append((time.time(), uuid, bytes(data)))
+            self.last_written[uuid] = list(data)
+
+    def read(self, uuid):
+        with self._lock:
+            data = self.readable.get(uuid)
+        if data is None:
+            raise BleakError(f"Characteristic {uuid} was not found!")
+        return data() if callable(data) else data
+
+    def set_rate(self, notify_hz):
+        """Periodic notifications per second (0 = only on changes)"""
+        self.notify_hz = notify_hz
+        self.changed()
+
+    def changed(self):
+        """Notify now (thread-safe); periodic notifications continue at notify_hz"""
+        loop, event = self._loop, self._changed
+        if loop is not None and event is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+
+    def inject_disconnect(self, down_for=0.0):
+        """Drop the connection (thread-safe); the device can't be found/connected for down_for seconds"""
+        self.unavailable_until = time.monotonic() + down_for
+        client, loop = self.client, self._loop
+        if client is not None and loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(client._lost)
+
+    def available(self):
+        return time.monotonic() >= self.unavailable_until
+
+    # Transport side, on the client's loop
+    def _attach(self, client):
+        self.client = client
+        self.connects += 1
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+
+    def _detach(self, client):
+        if self.client is client:
+            self.client = None
+            self.disconnects += 1
+
+    async def _notify_loop(self, client, characteristic, callback):
+        while client.is_connected:
+            period = 1.0 / self.notify_hz if self.notify_hz > 0 else None
+            try:
+                await asyncio.wait_for(self._changed.wait(), period)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            if not client.is_connected:
+                break
+            data = bytearray(self.payload())
+            self.notifications += 1
+            callback(characteristic, data)
+
+    def stats(self):
+        return {
+            'address': self.address,
+            'connected': self.client is not None and self.client.is_connected,
+            'notify_hz': self.notify_hz,
+            'notifications': self.notifications,
+            'writes': len(self.writes),
+            'connects': self.connects,
+            'disconnects': self.disconnects,
+        }
+
+
+class LoadcellPeripheral(SimulatedPeripheral):
+    """BGM220 loadcell board: notifies the quantity of each of its slots (255 sensor, 200/222 position errors)"""
+
+    def __init__(self, name, address, notify_uuid, quantities, notify_hz=1.0, churn=False, seed=None):
+        super().__init__(name, address, notify_uuid, notify_hz, seed)
+        self.quantities = [int(q) for q in quantities]
+        self.errors = {}
+        self.churn = churn
+
+    def payload(self):
+        with self._lock:
+            if self.churn:
+                # Load test: every notification is a new state (one slot one item up or down)
+                slot = self.rng.randrange(len(self.quantities))
+                self.quantities[slot] = max(0, self.quantities[slot] + self.rng.choice((-1, 1)))
+            values = [self.errors.get(i, q) for i, q in enumerate(self.quantities)]
+        return [max(0, min(255, v)) for v in values]
+
+    def take(self, slot, n=1):
+        with self._lock:
+            self.quantities[slot] = max(0, self.quantities[slot] - n)
+        self.changed()
+
+    def put(self, slot, n=1):
+        with self._lock:
+            self.quantities[slot] += n
+        self.changed()
+
+    def set_quantity(self, slot, quantity):
+        with self._lock:
+            self.quantities[slot] = quantity
+        self.changed()
+
+    def set_error(self, slot, code):
+        """Report an error code (255, 200, 222) instead of the quantity of a slot"""
+        with self._lock:
+            self.errors[slot] = code
+        self.changed()
+
+    def clear_error(self, slot):
+        with self._lock:
+            self.errors.pop(slot, None)
+        self.changed()
+
+
+class ImuPeripheral(SimulatedPeripheral):
+    """XG26 sensor: IMU notifications (still, lean, shake) and readable environment characteristics"""
+
+    def __init__(self, name, address, imu_uuid, readable=None, notify_hz=10.0, base=(0, 0, 1000), seed=None):
+        super().__init__(name, address, imu_uuid, notify_hz, seed)
+        self.readable.update(readable or {})
+        self.base = base
+        self.mode = 'still'
+        self._shake_sign = 1
+
+    def set_mode(self, mode):
+        if mode not in ('still', 'lean', 'shake'):
+            raise ValueError(f"Unknown IMU mode '{mode}'")
+        self.mode = mode
+        self.changed()
+
+    def payload(self):
+        x, y, z = self.base
+        noise = [self.rng.randint(-3, 3) for _ in range(3)]
+        if self.mode == 'lean':
+            x += 120
+        elif self.mode == 'shake':
+            self._shake_sign = -self._shake_sign
+            noise = [self._shake_sign * self.rng.randint(100, 200) for _ in range(3)]
+        return struct.pack("<hhh", x + noise[0], y + noise[1], z + noise[2])
+
+
+class SimulatedAdapter:
+    """Peripherals by address, plus the script runner"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.peripherals = {}
+
+    def add(self, peripheral):
+        with self._lock:
+            self.peripherals[peripheral.address] = peripheral
+        return peripheral
+
+    def get(self, address):
+        with self._lock:
+            return self.peripherals.get(str(address).upper())
+
+    def by_name(self, name):
+        with self._lock:
+            return next((p for p in self.peripherals.values() if p.name == name), None)
+
+    def apply_step(self, step):
+        peripheral = self.by_name(step.get('device'))
+        if peripheral is None:
+            print(f"BLE simulation: unknown device in step {step}")
+            return
+        if 'notify_hz' in step:
+            peripheral.set_rate(step['notify_hz'])
+        if 'disconnect' in step:
+            peripheral.inject_disconnect(step['disconnect'])
+        if 'mode' in step:
+            peripheral.set_mode(step['mode'])
+        if 'slot' in step:
+            slot = step['slot']
+            if 'take' in step:
+                peripheral.take(slot, step['take'])
+            if 'put' in step:
+                peripheral.put(slot, step['put'])
+            if 'set' in step:
+                peripheral.set_quantity(slot, step['set'])
+            if 'error' in step:
+                peripheral.set_error(slot, step['error'])
+            if step.get('clear'):
+                peripheral.clear_error(slot)
+
+    async def run_script(self, script):
+        """Apply the script steps at their time offsets, looping every loop_s seconds when set"""
+        for name, settings in script.get('devices', {}).items():
+            peripheral = self.by_name(name)
+            if peripheral is not None:
+                for key, value in settings.items():
+                    setattr(peripheral, key, value)
+        steps = sorted(script.get('steps', []), key=lambda step: step.get('at', 0))
+        loop_s = script.get('loop_s')
+        while True:
+            start = time.monotonic()
+            for step in steps:
+                delay = start + step.get('at', 0) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    self.apply_step(step)
+                except Exception as e:
+                    print(f"BLE simulation: step {step} failed: {e}")
+            if not loop_s:
+                break
+            await asyncio.sleep(max(0.0, start + loop_s - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            return {p.name: p.stats() for p in self.peripherals.values()}
+
+
+# Global simulated adapter
+sim_adapter = SimulatedAdapter()
+
+
+class BleakClient:
+    """Simulated bleak.BleakClient (subset)"""
+
+    def __init__(self, address_or_ble_device, timeout=10.0, disconnected_callback=None, adapter=None, **kwargs):
+        if isinstance(address_or_ble_device, SimulatedPeripheral):
+            self.address = address_or_ble_device.address
+        else:
+            self.address = str(address_or_ble_device).upper()
+        self.timeout = timeout
+        self._disconnected_callback = disconnected_callback
+        self._adapter = adapter or sim_adapter
+        self._peripheral = None
+        self._connected = False
+        self._tasks = []
+
+    @property
+    def is_connected(self):
+        return self._connected
+
+    async def connect(self, **kwargs):
+        peripheral = self._adapter.get(self.address)
+        if peripheral is None or not peripheral.available():
+            await asyncio.sleep(min(self.timeout, 1.0))
+            raise BleakError(f"Device with address {self.address} was not found.")
+        if peripheral.fail_connects > 0:
+            peripheral.fail_connects -= 1
+            await asyncio.sleep(peripheral.connect_delay)
+            raise BleakError(f"[org.bluez.Error.Failed] le-connection-abort-by-local ({self.address})")
+        await asyncio.sleep(peripheral.connect_delay)
+        peripheral._attach(self)
+        self._peripheral = peripheral
+        self._connected = True
+        return True
+
+    async def disconnect(self):
+        self._close()
+        return True
+
+    def _close(self):
+        if self._peripheral is not None:
+            self._peripheral._detach(self)
+        self._connected = False
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def _lost(self):
+        # Link loss injected by the peripheral
+        if not self._connected:
+            return
+        self._close()
+        if self._disconnected_callback is not None:
+            self._disconnected_callback(self)
+
+    def _check(self):
+        if not self._connected:
+            raise BleakError("Not connected")
+
+    async def start_notify(self, char_specifier, callback, **kwargs):
+        self._check()
+        uuid = str(char_specifier)
+        if uuid != self._peripheral.notify_uuid:
+            raise BleakError(f"Characteristic {uuid} does not support notifications")
+        characteristic = SimCharacteristic(uuid, 0x10)
+        self._tasks.append(asyncio.get_running_loop().create_task(
+            self._peripheral._notify_loop(self, characteristic, callback)))
+
+    async def stop_notify(self, char_specifier):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def write_gatt_char(self, char_specifier, data, response=None):
+        self._check()
+        await asyncio.sleep(self._peripheral.write_latency)
+        self._check()
+        self._peripheral.on_write(str(char_specifier), bytes(data))
+
+    async def read_gatt_char(self, char_specifier, **kwargs):
+        self._check()
+        await asyncio.sleep(self._peripheral.write_latency)
+        self._check()
+        return bytearray(self._peripheral.read(str(char_specifier)))
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+
+class BleakScanner:
+    """Simulated bleak.BleakScanner (find_device_by_address only)"""
+
+    @staticmethod
+    async def find_device_by_address(device_identifier, timeout=10.0, adapter=None, **kwargs):
+        peripheral = (adapter or sim_adapter).get(device_identifier)
+        if peripheral is None or not peripheral.available():
+            await asyncio.sleep(min(timeout, 1.0))
+            return None
+        return peripheral
+
+
+def _initial_quantities(slot_counts):
+    try:
+        with open(loadcell_file_path, 'r', encoding='utf-8') as f:
+            values = json.load(f)["values"]
+    except Exception:
+        values = []
+    values = [int(v) if int(v) < 200 else 0 for v in values]
+    values += [0] * (sum(slot_counts) - len(values))
+    return values[:slot_counts[0]], values[slot_counts[0]:sum(slot_counts)]
+
+
+_setup_lock = threading.Lock()
+_setup_done = False
+
+
+def setup_simulation(slot_counts=None):
+    """
+    Register the shelf's loadcells and XG26 sensor (addresses/UUIDs from .env) and start BLE_SIM_SCRIPT
+    slot_counts: slots of (Loadcell_1, Loadcell_2), default globals.LOADCELL_NUM_1/LOADCELL_NUM_2
+    """
+    global _setup_done
+    with _setup_lock:
+        if _setup_done:
+            return sim_adapter
+        _setup_done = True
+    if slot_counts is None:
+        # Same slot layout as the payloads handle_loadcell_events decodes
+        from app.modules import globals
+        slot_counts = (globals.LOADCELL_NUM_1, globals.LOADCELL_NUM_2)
+    loadcell_hz = float(os.getenv("BLE_SIM_LOADCELL_HZ", "1"))
+    quantities_1, quantities_2 = _initial_quantities(slot_counts)
+    sim_adapter.add(LoadcellPeripheral("Loadcell_1", os.getenv("BGM220_LOADCELL_1_ADDRESS", "SIM:LOADCELL:1"),
+                                       os.getenv("LOADCELL_UUID"), quantities_1, loadcell_hz))
+    sim_adapter.add(LoadcellPeripheral("Loadcell_2", os.getenv("BGM220_LOADCELL_2_ADDRESS", "SIM:LOADCELL:2"),
+                                       os.getenv("LOADCELL_UUID"), quantities_2, loadcell_hz))
+    readable = {
+        os.getenv("CHAR_UUID_PRESSURE"): struct.pack("<I", 1013250),
+        os.getenv("CHAR_UUID_TEMPERATURE"): struct.pack("<h", 2650),
+        os.getenv("CHAR_UUID_HUMIDITY"): struct.pack("<H", 6200),
+        os.getenv("CHAR_UUID_LIGHT"): struct.pack("<I", 320),
+        os.getenv("CHAR_UUID_SOUND"): struct.pack("<H", 45),
+        os.getenv("CHAR_UUID_MAGNETIC"): struct.pack("<I", 48),
+    }
+    readable.pop(None, None)
+    sim_adapter.add(ImuPeripheral("XG26_Sensor", os.getenv("XG26_SENSOR_ADDRESS", "SIM:XG26:1"), os.getenv("IMU_UUID"),
+                                  readable, float(os.getenv("BLE_SIM_IMU_HZ", "10"))))
+
+    script_path = os.getenv("BLE_SIM_SCRIPT", "")
+    if script_path:
+        try:
+            with open(script_path, 'r', encoding='utf-8') as f:
+                script = json.load(f)
+            from app.modules.ble_runtime import ble_runtime
+            ble_runtime.submit(sim_adapter.run_script(script))
+            print(f"BLE simulation: running script {script_path}")
+        except Exception as e:
+            print(f"BLE simulation: could not start script {script_path}: {e}")
+    print(f"BLE simulation: {', '.join(sim_adapter.stats())}")
+    return sim_adapter
@@ -0,0 +1,309 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+BLE Trace - record raw BLE traffic to a compact binary log and replay it into the handlers
+
+With BLE_TRACE_FILE set (or POST /api/debug/ble-trace) every loadcell/IMU notification, XG26
+sensor read and GATT write is appended to the file as it happens, before any decoding, so field
+incidents (error codes 200/222/255 flapping, bursts, reconnects) can be reproduced offline with
+benchmarks/bench_ble_trace.py.
+
+File layout, little endian. Each recording session starts with
+    b"BLETRACE", version (u8), wall clock start time (f64)
+followed by records
+    time since the previous record in us (u32), kind (u8), channel (u8), payload length (u16), payload
+A CHANNEL record defines a channel id as "<device name>\\n<characteristic uuid>" the first time a
+pair is seen, so a loadcell notification costs 8 bytes plus its payload. Restarting the server
+appends a new session to the same file.
+
+Records are buffered, so a crash can leave a partial record at the end of the file: start() cuts
+it off before appending, and read_trace() resyncs on the next b"BLETRACE" when a record would run
+over one (files written before start() did the cut).
+"""
+import os
+import struct
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAGIC = b"BLETRACE"
+VERSION = 1
+SESSION = struct.Struct("<Bd")
+RECORD = struct.Struct("<IBBH")
+MAX_DELTA_US = 0xFFFFFFFF
+
+# Record kinds
+KIND_CHANNEL = 0
+KIND_NOTIFY = 1
+KIND_WRITE = 2
+KIND_READ = 3
+KIND_GAP = 4        # Time only: bridges more than MAX_DELTA_US between two records
+KIND_NAMES = {KIND_NOTIFY: 'notify', KIND_WRITE: 'write', KIND_READ: 'read'}
+
+
+class TraceRecord:
+    """One notification/read/write of a trace; t is seconds since its session started"""
+
+    __slots__ = ('session', 't', 'kind', 'device_name', 'char_uuid', 'data')
+
+    def __init__(self, session, t, kind, device_name, char_uuid, data):
+        self.session = session
+        self.t = t
+        self.kind = kind
+        self.device_name = device_name
+        self.char_uuid = char_uuid
+        self.data = data
+
+    def __repr__(self):
+        return f"{self.t:10.6f} {KIND_NAMES.get(self.kind, self.kind):6} {self.device_name} {self.char_uuid} {list(self.data)}"
+
+
+class BleTraceRecorder:
+    """Appends BLE traffic to a trace file; thread-safe, a no-op while not started"""
+
+    def __init__(self, flush_interval=1.0):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self.path = None
+        self.active = False
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self._channels = {}
+        self._t0 = 0.0
+        self._last_us = 0
+        self._last_flush = 0.0
+        self.records = {name: 0 for name in KIND_NAMES.values()}
+        self.bytes = 0
+        self.dropped = 0
+        self.started_at = None
+
+    def start(self, path):
+        """Start appending a new session to path (stops the current one first)"""
+        self.stop()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            # Drop the partial last record a crash may have left, the new session header follows it
+            with open(path, 'r+b') as f:
+                end = complete_length(f.read())
+                if end is None:
+                    raise ValueError(f"{path} is not a BLE trace")
+                f.truncate(end)
+        f = open(path, 'ab', buffering=64 * 1024)
+        with self._lock:
+            self._reset_counters()
+            self._file = f
+            self.path = path
+            self._t0 = time.monotonic()
+            self._last_flush = self._t0
+            self.started_at = time.time()
+            self._write(MAGIC + SESSION.pack(VERSION, self.started_at))
+            self.active = True
+        print(f"BLE trace: recording to {path}")
+
+    def start_from_env(self):
+        """Start recording to BLE_TRACE_FILE when it is set and nothing is being recorded yet"""
+        path = os.getenv("BLE_TRACE_FILE", "")
+        if path and not self.active:
+            try:
+                self.start(path)
+            except (OSError, ValueError) as e:
+                print(f"BLE trace: could not open {path}: {e}")
+
+    def stop(self):
+        with self._lock:
+            f, self._file = self._file, None
+            self.active = False
+        if f is not None:
+            f.close()
+            print(f"BLE trace: stopped {self.path} ({self.bytes} bytes)")
+
+    def _write(self, chunk):
+        self._file.write(chunk)
+        self.bytes += len(chunk)
+
+    def _channel(self, device_name, char_uuid):
+        key = (device_name, str(char_uuid))
+        channel = self._channels.get(key)
+        if channel is None:
+            if len(self._channels) > 0xFF:
+                return None
+            channel = self._channels[key] = len(self._channels)
+            name = f"{key[0]}\n{key[1]}".encode('utf-8')
+            self._write(RECORD.pack(0, KIND_CHANNEL, channel, len(name)) + name)
+        return channel
+
+    def record(self, kind, device_name, char_uuid, data):
+        """Append one record; called from the BLE loop, the payload is copied as is"""
+        if not self.active:
+            return
+        data = bytes(data)
+        now = time.monotonic()
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                channel = self._channel(device_name, char_uuid)
+                if channel is None or len(data) > 0xFFFF:
+                    self.dropped += 1
+                    return
+                now_us = int((now - self._t0) * 1e6)
+                delta = max(0, now_us - self._last_us)
+                self._last_us = now_us
+                while delta > MAX_DELTA_US:
+                    self._write(RECORD.pack(MAX_DELTA_US, KIND_GAP, 0, 0))
+                    delta -= MAX_DELTA_US
+                self._write(RECORD.pack(delta, kind, channel, len(data)) + data)
+                self.records[KIND_NAMES[kind]] += 1
+                if now - self._last_flush >= self.flush_interval:
+                    self._file.flush()
+                    self._last_flush = now
+            except (OSError, ValueError) as e:
+                self.dropped += 1
+                print(f"BLE trace: write error: {e}")
+
+    def notify(self, device_name, char_uuid, data):
+        self.record(KIND_NOTIFY, device_name, char_uuid, data)
+
+    def write(self, device_name, char_uuid, data):
+        self.record(KIND_WRITE, device_name, char_uuid, data)
+
+    def read(self, device_name, char_uuid, data):
+        self.record(KIND_READ, device_name, char_uuid, data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': self.active,
+                'path': self.path,
+                'started_at': self.started_at,
+                'records': dict(self.records),
+                'channels': len(self._channels),
+                'bytes': self.bytes,
+                'dropped': self.dropped,
+            }
+
+
+def _parse(data, source="data"):
+    """
+    Yield (end offset, TraceRecord or None) after every complete session header and record of data;
+    stops at a truncated last record. A record running over the next session header is the partial
+    record of a crashed session: parsing resumes at that header.
+    """
+    offset = 0
+    session = -1
+    header_size = len(MAGIC) + SESSION.size
+    while offset < len(data):
+        if data.startswith(MAGIC, offset):
+            if offset + header_size > len(data):
+                return
+            version, _ = SESSION.unpack_from(data, offset + len(MAGIC))
+            if version != VERSION:
+                raise ValueError(f"Unsupported BLE trace version {version} in {source}")
+            offset += header_size
+            session += 1
+            channels = {}
+            t_us = 0
+            yield offset, None
+            continue
+        if MAGIC.startswith(data[offset:]):
+            return  # Partial session header at the end
+        if session < 0:
+            raise ValueError(f"{source} is not a BLE trace")
+        if offset + RECORD.size > len(data):
+            resync = data.find(MAGIC, offset)
+            if resync == -1:
+                return
+            offset = resync
+            continue
+        delta, kind, channel, length = RECORD.unpack_from(data, offset)
+        end = offset + RECORD.size + length
+        resync = data.find(MAGIC, offset, end)
+        if resync != -1:
+            offset = resync
+            continue
+        if end > len(data):
+            return
+        payload = data[offset + RECORD.size:end]
+        offset = end
+        t_us += delta
+        if kind == KIND_CHANNEL:
+            device_name, _, char_uuid = payload.decode('utf-8').partition("\n")
+            channels[channel] = (device_name, char_uuid)
+            yield offset, None
+        elif kind in KIND_NAMES:
+            device_name, char_uuid = channels.get(channel, ('?', '?'))
+            yield offset, TraceRecord(session, t_us / 1e6, kind, device_name, char_uuid, payload)
+        else:
+            yield offset, None
+
+
+def complete_length(data):
+    """Length of data up to its last complete record (0 when empty), None when it is not a BLE trace"""
+    end = 0
+    try:
+        for end, _ in _parse(data):
+            pass
+    except ValueError:
+        return None
+    return end
+
+
+def read_trace(path):
+    """Yield the TraceRecords of every session in a trace file (a partial record is skipped)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    for _, record in _parse(data, path):
+        if record is not None:
+            yield record
+
+
+def replay(records, handlers, speed=1.0):
+    """
+    Feed trace records to handlers[kind](record) in order, in the calling thread
+    speed 1.0 keeps the recorded timing, 2.0 twice as fast, 0 as fast as possible;
+    sessions follow each other without waiting. Returns the number of records handled.
+    """
+    handled = 0
+    start = time.monotonic()
+    base = 0.0      # Replay time at which the current session started
+    session = None
+    last_t = 0.0
+    for record in records:
+        if record.session != session:
+            base += last_t
+            session = record.session
+        last_t = record.t
+        handler = handlers.get(record.kind)
+        if handler is None:
+            continue
+        if speed > 0:
+            delay = start + (base + record.t) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        handler(record)
+        handled += 1
+    return handled
+
+
+# Global recorder used by the loadcell and XG26 sensor BLE code
+ble_trace = BleTraceRecorder()
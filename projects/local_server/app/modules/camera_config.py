@@ -0,0 +1,83 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Camera configuration - per camera settings loaded from database/cameras.json
+
+    name        camera name used in logs and metrics
+    source      frame source spec, see app/modules/frame_source.py
+    frame_size  [width, height] frames are captured (or resized) at
+    fps         camera frame rate
+    roi         customer region [x1, y1, x2, y2] in frame pixels
+    roi_crop    crop the frame to the ROI (plus margin) before running the detector
+    roi_margin  pixels added around the ROI when cropping
+    motion_gate              skip the detector while the scene is static
+    motion_pixel_threshold   gray level change for a pixel to count as moving
+    motion_min_area          fraction of moving pixels that triggers inference
+    motion_keepalive_frames  run the detector at least once every N frames
+    detect_interval          run the detector every N frames, Kalman predict-only in between
+    track_min_score          detect early when a live track's last score is below this
+    track_max_uncertainty    detect early when a track's predicted centre is this uncertain (pixels)
+"""
+import os
+
+from app.utils.file_utils import read_file
+
+cameras_file_path = os.path.abspath(os.path.join(__file__, "../../..", "database/cameras.json"))
+
+DEFAULT_CAMERA = {
+    "name": "shelf_front",
+    "source": "gstreamer",
+    "frame_size": [416, 416],
+    "fps": 30,
+    "roi": [50, 0, 366, 640],
+    "roi_crop": False,
+    "roi_margin": 32,
+    "motion_gate": True,
+    "motion_pixel_threshold": 25,
+    "motion_min_area": 0.002,
+    "motion_keepalive_frames": 15,
+    "detect_interval": 1,
+    "track_min_score": 0.6,
+    "track_max_uncertainty": 10.0
+}
+
+
+def load_camera_configs(file_path=cameras_file_path):
+    """Load every camera config, missing keys fall back to DEFAULT_CAMERA"""
+    try:
+        cameras = read_file(file_path)
+    except Exception as e:
+        print(f"Could not read {file_path}, using default camera config: {e}")
+        cameras = [DEFAULT_CAMERA]
+    return [{**DEFAULT_CAMERA, **camera} for camera in cameras]
+
+
+def get_camera_config(name=None, file_path=cameras_file_path):
+    """Get one camera config by name, the first camera when name is None"""
+    cameras = load_camera_configs(file_path)
+    if name is None:
+        return cameras[0]
+    for camera in cameras:
+        if camera["name"] == name:
+            return camera
+    raise KeyError(f"Camera '{name}' not found in {file_path}")
+
+
+def get_camera_configs(names=None, file_path=cameras_file_path):
+    """Get the configs of the named cameras (all cameras when names is empty), in the given order"""
+    if not names:
+        return load_camera_configs(file_path)
+    return [get_camera_config(name, file_path) for name in names]
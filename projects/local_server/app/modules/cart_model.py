@@ -0,0 +1,255 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Cart Model - the loadcell cart, updated from the slots whose taken quantity changed
+
+A loadcell change only rebuilds the cart lines of the changed slots and re-prices the combos that
+contain one of their products (database_utils.evaluate_combo, the same pricing as
+detect_and_apply_combo_pricing). Each update returns a change set (added/updated/removed positions
+and combos that started/stopped applying) for the emitters.
+
+A new product catalog version, a changed combo.json or an expired combo rebuilds the whole cart.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from app.modules.product_catalog import product_catalog
+from app.utils.database_utils import load_combos_from_json, evaluate_combo, combo_product_ids
+
+combo_path = os.path.abspath(os.path.join(__file__, "../../..", "database/combo.json"))
+
+
+def _combo_valid_to(combo):
+    """validTo as a timestamp, None when the combo does not expire"""
+    try:
+        valid_to_str = combo.get('validTo', '')
+        if valid_to_str:
+            valid_to_date = datetime.fromisoformat(valid_to_str.replace('Z', '+00:00'))
+            return valid_to_date.replace(tzinfo=None).timestamp()
+    except Exception:
+        pass
+    return None
+
+
+class CartModel:
+    """Cart lines keyed by shelf position with per-combo pricing results"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._taken = {}            # position -> taken quantity (> 0 only)
+        self._base_lines = {}       # position -> line without combo pricing
+        self._lines = {}            # position -> priced line
+        self._positions = {}        # product_id -> sorted positions in the cart
+        self._combos = []
+        self._combo_index = {}      # product_id -> indexes of the combos it takes part in
+        self._combo_results = {}    # combo index -> (combo_info, overrides) of applied combos
+        self._catalog_version = None
+        self._combo_stat = None
+        self._combo_expiry = None
+        self._cart = []
+        self.version = 0
+        self.updates = 0
+        self.full_rebuilds = 0
+        self.slots_changed = 0
+        self.combos_repriced = 0
+
+    def _load_combos(self):
+        self._combos = load_combos_from_json()
+        self._combo_index = {}
+        for i, combo in enumerate(self._combos):
+            for product_id in set(combo_product_ids(combo)):
+                self._combo_index.setdefault(product_id, []).append(i)
+        expiries = [t for t in (_combo_valid_to(combo) for combo in self._combos) if t is not None]
+        self._combo_expiry = min(expiries) if expiries else None
+
+    def _combo_file_stat(self):
+        try:
+            st = os.stat(combo_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _sources_changed(self):
+        catalog_version = product_catalog.get_version()
+        combo_stat = self._combo_file_stat()
+        expired = self._combo_expiry is not None and time.time() > self._combo_expiry
+        if catalog_version == self._catalog_version and combo_stat == self._combo_stat and not expired:
+            return False
+        self._catalog_version = catalog_version
+        self._combo_stat = combo_stat
+        self._load_combos()
+        return True
+
+    def _build_line(self, position, qty):
+        product = product_catalog.get_by_position(position)
+        if product is None:
+            return None
+        return {
+            'position': position,
+            'quantity': qty,
+            'product_id': product.get('product_id'),
+            'product_name': product.get('product_name'),
+            'price': product.get('price'),
+            'img_url': product.get('img_url'),
+            'weight': product.get('weight')
+        }
+
+    def _cart_view(self, product_ids):
+        """{product_id: line} like detect_and_apply_combo_pricing's lookup (the last line of a product wins)"""
+        view = {}
+        for product_id in product_ids:
+            positions = self._positions.get(product_id)
+            if positions:
+                view[product_id] = self._base_lines[positions[-1]]
+        return view
+
+    def _price_product(self, product_id):
+        """Priced lines of one product: combo fields go on its first line, in combo order"""
+        positions = self._positions.get(product_id, [])
+        lines = {position: self._base_lines[position] for position in positions}
+        if positions:
+            first = positions[0]
+            for i in self._combo_index.get(product_id, []):
+                result = self._combo_results.get(i)
+                if result is None:
+                    continue
+                for override_id, fields in result[1]:
+                    if override_id == product_id:
+                        lines[first] = {**lines[first], **fields}
+        return lines
+
+    def apply(self, slot_changes):
+        """
+        Apply {position: taken quantity} for the changed slots
+        Returns the change set: added/updated/removed positions, combos_applied/combos_removed ids
+        and full (whole cart rebuilt)
+        """
+        with self._lock:
+            old_combo_ids = [result[0]['combo_id'] for _, result in sorted(self._combo_results.items())]
+            full = self._sources_changed()
+            if full:
+                slot_changes = {**self._taken, **slot_changes}
+                self._base_lines = {}
+                self._positions = {}
+                self._combo_results = {}
+                self.full_rebuilds += 1
+            old_lines = self._lines
+
+            # Cart lines of the changed slots
+            changed_ids = set()
+            for position, qty in slot_changes.items():
+                qty = int(qty)
+                old_line = self._base_lines.pop(position, None)
+                if old_line is not None:
+                    changed_ids.add(str(old_line.get('product_id')))
+                    self._positions[str(old_line.get('product_id'))].remove(position)
+                self._taken.pop(position, None)
+                if qty <= 0:
+                    continue
+                self._taken[position] = qty
+                line = self._build_line(position, qty)
+                if line is None:
+                    continue
+                product_id = str(line.get('product_id'))
+                self._base_lines[position] = line
+                positions = self._positions.setdefault(product_id, [])
+                positions.append(position)
+                positions.sort()
+                changed_ids.add(product_id)
+
+            # Re-price only the combos containing a changed product
+            combo_indexes = set(range(len(self._combos))) if full else set()
+            for product_id in changed_ids:
+                combo_indexes.update(self._combo_index.get(product_id, ()))
+            product_lookup = product_catalog.get_lookup()
+            results = dict(self._combo_results)
+            reprice_ids = set(changed_ids)
+            for i in combo_indexes:
+                combo = self._combos[i]
+                old = results.pop(i, None)
+                if old is not None:
+                    reprice_ids.update(product_id for product_id, _ in old[1])
+                try:
+                    combo_info, overrides = evaluate_combo(combo, self._cart_view(combo_product_ids(combo)), product_lookup)
+                except Exception as e:
+                    print(f"Error applying combo {combo.get('name')}: {e}")
+                    continue
+                if combo_info is not None:
+                    results[i] = (combo_info, overrides)
+                    reprice_ids.update(product_id for product_id, _ in overrides)
+            self._combo_results = results
+            self.combos_repriced += len(combo_indexes)
+
+            # Priced lines of the affected products
+            lines = {} if full else dict(old_lines)
+            touched = set(slot_changes)
+            for position in slot_changes:
+                lines.pop(position, None)
+            for product_id in reprice_ids:
+                priced = self._price_product(product_id)
+                lines.update(priced)
+                touched.update(priced)
+
+            combo_ids = [result[0]['combo_id'] for _, result in sorted(results.items())]
+            changes = {
+                'version': self.version + 1,
+                'full': full,
+                'added': sorted(p for p in touched if p in lines and p not in old_lines),
+                'updated': sorted(p for p in touched if p in lines and p in old_lines and lines[p] != old_lines[p]),
+                'removed': sorted(p for p in touched if p in old_lines and p not in lines),
+                'combos_applied': [combo_id for combo_id in combo_ids if combo_id not in old_combo_ids],
+                'combos_removed': [combo_id for combo_id in old_combo_ids if combo_id not in combo_ids],
+            }
+            self._lines = lines
+            self._cart = [lines[p] for p in sorted(lines)]
+            self.version += 1
+            self.updates += 1
+            self.slots_changed += len(slot_changes)
+            return changes
+
+    def update(self, taken_quantity):
+        """Diff a full taken_quantity list against the cart and apply the changed slots"""
+        with self._lock:
+            taken = self._taken
+            slot_changes = {i: qty for i, qty in enumerate(taken_quantity) if qty != taken.get(i, 0)}
+        return self.apply(slot_changes)
+
+    def get_cart(self):
+        """Cart lines in position order, with combo pricing (do not modify)"""
+        with self._lock:
+            return self._cart
+
+    def get_applied_combos(self):
+        with self._lock:
+            return [self._combo_results[i][0] for i in sorted(self._combo_results)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'lines': len(self._lines),
+                'applied_combos': len(self._combo_results),
+                'updates': self.updates,
+                'full_rebuilds': self.full_rebuilds,
+                'slots_changed': self.slots_changed,
+                'combos_repriced': self.combos_repriced,
+            }
+
+
+# Global cart of the loadcell consumer
+cart_model = CartModel()
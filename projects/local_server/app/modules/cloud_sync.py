@@ -19,6 +19,7 @@ import os
 import dotenv
 from dotenv import load_dotenv
 from app.modules import globals
+from app.modules.product_catalog import product_catalog
 
 def load_products_from_cloud():
     load_dotenv()
@@ -33,17 +34,8 @@ def load_products_from_cloud():
             if img_url and not img_url.startswith("http"):
                 product["img_url"] = str(prefix + img_url)
 
-        json_path = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'products.json')
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        print("Data written to products.json")
-        globals.set_products_data(data)
-        globals.set_products_weight(globals.load_weight_of_one(data))
-        globals.set_products_price(globals.load_products_price(data))
-        globals.set_products_name(globals.load_products_name(data))
-        products_name_decimal, products_name_char_count = globals.load_products_name_decimal(globals.get_products_name())
-        globals.set_products_name_char_count(products_name_char_count)
-        globals.set_products_name_decimal(products_name_decimal)
+        version = product_catalog.publish(data)
+        print(f"Data written to products.json (catalog version {version})")
     else:
         print(f"Failed to retrieve products: {response.status_code}")
 
@@ -105,20 +97,23 @@ def load_posters_from_cloud():
     else:
         print(f"Failed to retrieve posters: {response.status_code}")
 
-def post_order_data_to_cloud(order_data):
+def post_order_data_to_cloud(order_data, image_bytes=None):
+    """Post an order with the customer image (JPEG bytes from the snapshot store, frame_box.jpg otherwise)"""
     load_dotenv()
     file_path = os.path.abspath(os.path.join(__file__, "../../..", "app/static/img/customer_frame/frame_box.jpg"))
     url = os.getenv("POST_ORDER_API_KEY")
-    with open(file_path, "rb") as f:
-        files = {"file": (os.path.basename(file_path), f, "image/jpeg")}
-        response = requests.post(url, files=files, data=order_data, timeout=30)
+    if image_bytes is None:
+        with open(file_path, "rb") as f:
+            image_bytes = f.read()
+    files = {"file": (os.path.basename(file_path), image_bytes, "image/jpeg")}
+    response = requests.post(url, files=files, data=order_data, timeout=30)
 
-        if response.ok:
-            print("Order data posted successfully")
-            print(response.text)
-        else:
-            print(f"Failed to post order data: {response.status_code}")
-            print(response.text)
+    if response.ok:
+        print("Order data posted successfully")
+        print(response.text)
+    else:
+        print(f"Failed to post order data: {response.status_code}")
+        print(response.text)
 
 def post_history_added_products_to_cloud(history_added_data):
     load_dotenv()
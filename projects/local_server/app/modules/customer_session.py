@@ -0,0 +1,174 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Customer Session - ROI and unpaid-alert state of the customer in front of the shelf
+
+The first tracked person becomes the customer. The alert is the time (seconds of frame_time) the
+customer has been out of the ROI; it resets when they come back. It is measured in seconds, not
+frames, so it does not depend on the camera frame rate, the motion gate or the detect interval.
+
+Events returned by update():
+    assigned   a track was picked as the customer
+    enter      the customer moved into the ROI (box is set)
+    leave      the customer was in the ROI on the previous frame and is not anymore
+    warning    the alert reached a warning level (WARNING_ALERTS seconds)
+    unpaid     the alert reached UNPAID_ALERT seconds, the session resets itself
+
+With several cameras each one keeps its own CustomerSession (track ids differ per camera) with
+alerts=False, and one ShelfPresence times how long no camera has seen the customer in its ROI;
+only it returns warning/unpaid.
+"""
+import threading
+import time
+
+# Seconds without the customer in the ROI (the vision loop used to run at about 10 FPS: 20/60/100 frames)
+WARNING_ALERTS = (2.0, 6.0)
+UNPAID_ALERT = 10.0
+
+
+class AbsenceTimer:
+    """How long the customer has been out of the ROI, and the warning/unpaid levels reached"""
+
+    def __init__(self):
+        self.present()
+
+    def present(self):
+        self.since = None
+        self.alert = 0.0
+        self._warnings = 0
+
+    def absent(self, now, customer_id):
+        """Customer out of the ROI at now, returns warning/unpaid events (the timer restarts after unpaid)"""
+        if self.since is None:
+            self.since = now
+        self.alert = now - self.since
+        events = []
+        if self.alert >= UNPAID_ALERT:
+            events.append({'type': 'unpaid', 'customer_id': customer_id, 'alert': round(self.alert, 2)})
+            self.present()
+            return events
+        warnings = self._warnings
+        while self._warnings < len(WARNING_ALERTS) and self.alert >= WARNING_ALERTS[self._warnings]:
+            self._warnings += 1
+        if self._warnings > warnings:
+            # One warning even if a long gap between frames crossed several levels
+            events.append({'type': 'warning', 'customer_id': customer_id, 'alert': round(self.alert, 2)})
+        return events
+
+
+class CustomerSession:
+    """Pure per-frame logic, side effects (sounds, snapshots, cloud) are left to the caller"""
+
+    def __init__(self, roi, alerts=True):
+        self.roi = tuple(roi)
+        # False: warning/unpaid are left to a ShelfPresence shared by the cameras
+        self.alerts = alerts
+        self.timer = AbsenceTimer()
+        self.reset()
+
+    @property
+    def alert(self):
+        """Seconds the customer has been out of the ROI"""
+        return self.timer.alert
+
+    def reset(self):
+        self.customer_id = None
+        self.timer.present()
+        self.in_roi = False
+        # None: the customer track is not in this frame's output, otherwise whether it is inside the ROI
+        self.customer_in_roi = None
+        self.customer_box = None
+
+    def _inside(self, cx, cy):
+        x1, y1, x2, y2 = self.roi
+        return x1 <= cx <= x2 and y1 <= cy <= y2
+
+    def update(self, tracked_objects, now=None):
+        """
+        Process one frame of Sort output ([x1, y1, x2, y2, id] rows), returns a list of event dicts
+        now is the frame's time.monotonic() timestamp (default: now)
+        """
+        now = time.monotonic() if now is None else now
+        events = []
+        self.customer_in_roi = None
+        person_detected = False
+
+        for x1, y1, x2, y2, obj_id in tracked_objects:
+            if self.customer_id is None:
+                self.customer_id = int(obj_id)
+                events.append({'type': 'assigned', 'customer_id': self.customer_id})
+
+            if int(obj_id) == self.customer_id:
+                self.customer_box = (x1, y1, x2, y2)
+                self.customer_in_roi = self._inside((x1 + x2) / 2, (y1 + y2) / 2)
+                if self.customer_in_roi:
+                    person_detected = True
+                    self.timer.present()
+                    if not self.in_roi:
+                        events.append({'type': 'enter', 'customer_id': self.customer_id, 'box': self.customer_box})
+
+        if self.in_roi and not person_detected:
+            events.append({'type': 'leave', 'customer_id': self.customer_id})
+        self.in_roi = person_detected
+
+        if not person_detected and self.alerts:
+            alert_events = self.timer.absent(now, self.customer_id)
+            events += alert_events
+            if any(event['type'] == 'unpaid' for event in alert_events):
+                self.reset()
+
+        return events
+
+
+class ShelfPresence:
+    """
+    Unpaid-alert timer of the whole shelf, shared by the camera threads.
+    It runs while the latest frame of every camera shows no customer in its ROI and resets as soon
+    as one camera sees them there; with one camera it behaves like the CustomerSession alert.
+    """
+
+    def __init__(self, cameras):
+        self._lock = threading.Lock()
+        self._in_roi = {camera: False for camera in cameras}
+        self.timer = AbsenceTimer()
+
+    @property
+    def alert(self):
+        return self.timer.alert
+
+    def reset(self, camera):
+        """New shopping session on camera"""
+        with self._lock:
+            if camera in self._in_roi:
+                self._in_roi[camera] = False
+                self.timer.present()
+
+    def remove(self, camera):
+        """camera stopped processing frames, its last state no longer counts"""
+        with self._lock:
+            self._in_roi.pop(camera, None)
+
+    def update(self, camera, in_roi, customer_id=None, now=None):
+        """One processed frame of camera (now: its time.monotonic() timestamp), returns warning/unpaid events"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if camera not in self._in_roi:
+                return []
+            self._in_roi[camera] = in_roi
+            if any(self._in_roi.values()):
+                self.timer.present()
+                return []
+            return self.timer.absent(now, customer_id)
@@ -0,0 +1,99 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Person detector package - pick a backend by config:
+
+    DETECTOR_BACKEND   = ultralytics | onnxruntime | opencv_dnn
+    DETECTOR_MODEL     = file name in app/modules/detector/models/ or an absolute path
+    DETECTOR_CONF      = confidence threshold (default 0.5)
+    DETECTOR_IMGSZ     = model input size (default 416)
+    DETECTOR_PRECISION = fp32 | fp16 | int8 (default fp32)
+
+database/detector.json, written by benchmarks/bench_detector_tune.py, overrides these settings
+unless DETECTOR_TUNED_CONFIG = "false".
+"""
+import os
+
+from dotenv import load_dotenv
+
+from app.modules.detector.base import Detector, PERSON_CLASS_ID, PRECISIONS, empty_detections
+from app.utils.file_utils import read_file
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "models"))
+tuned_config_path = os.path.abspath(os.path.join(__file__, "../../../..", "database/detector.json"))
+
+# Jetson default: TensorRT engine through ultralytics
+DEFAULT_BACKEND = "ultralytics"
+DEFAULT_MODELS = {
+    "ultralytics": "yolo11n-person-416-ver2.engine",
+    "onnxruntime": "yolo11n-person-416-ver2.onnx",
+    "opencv_dnn": "yolo11n-person-416-ver2.onnx",
+}
+
+
+def resolve_model_path(model):
+    """Model names without a directory are looked up in the detector models folder"""
+    if os.path.isabs(model) or os.path.dirname(model):
+        return os.path.abspath(model)
+    return os.path.join(MODELS_DIR, model)
+
+
+def load_tuned_config(file_path=tuned_config_path):
+    """Detector settings picked by the autotuner, None if the tuner never ran (or it is disabled)"""
+    if os.getenv("DETECTOR_TUNED_CONFIG", "true").lower() != "true" or not os.path.exists(file_path):
+        return None
+    try:
+        return read_file(file_path)
+    except Exception as e:
+        print(f"Could not read {file_path}, using .env detector settings: {e}")
+        return None
+
+
+def create_detector(backend=None, model=None, conf_threshold=None, imgsz=None, classes=(PERSON_CLASS_ID,),
+                    precision=None):
+    """Create the configured detector, arguments override the tuned config, which overrides the environment"""
+    load_dotenv()
+    # The tuned config only applies when the caller didn't pick a backend/model itself
+    tuned = load_tuned_config() if backend is None and model is None else None
+    if tuned:
+        print(f"Detector settings from {tuned_config_path}")
+        backend, model = tuned.get("backend"), tuned.get("model")
+        conf_threshold = conf_threshold if conf_threshold is not None else tuned.get("conf")
+        imgsz = imgsz if imgsz is not None else tuned.get("imgsz")
+        precision = precision or tuned.get("precision")
+
+    backend = (backend or os.getenv("DETECTOR_BACKEND") or DEFAULT_BACKEND).lower()
+    if backend not in DEFAULT_MODELS:
+        raise ValueError(f"Unknown detector backend: {backend} (expected one of {', '.join(DEFAULT_MODELS)})")
+    model_path = resolve_model_path(model or os.getenv("DETECTOR_MODEL") or DEFAULT_MODELS[backend])
+    conf_threshold = conf_threshold if conf_threshold is not None else float(os.getenv("DETECTOR_CONF", "0.5"))
+    imgsz = imgsz if imgsz is not None else int(os.getenv("DETECTOR_IMGSZ", "416"))
+    precision = (precision or os.getenv("DETECTOR_PRECISION") or "fp32").lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown detector precision: {precision} (expected one of {', '.join(PRECISIONS)})")
+
+    if backend == "ultralytics":
+        from app.modules.detector.ultralytics_detector import UltralyticsDetector
+        detector = UltralyticsDetector(model_path, conf_threshold, classes, imgsz, precision)
+    elif backend == "onnxruntime":
+        from app.modules.detector.onnx_detector import OnnxRuntimeDetector
+        detector = OnnxRuntimeDetector(model_path, conf_threshold, classes, imgsz, precision)
+    else:
+        from app.modules.detector.opencv_dnn_detector import OpenCvDnnDetector
+        detector = OpenCvDnnDetector(model_path, conf_threshold, classes, imgsz, precision)
+
+    print(f"Detector loaded: {detector}")
+    return detector
@@ -0,0 +1,63 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Detector interface - every backend returns detections as an (N, 5) array [x1, y1, x2, y2, conf]
+"""
+import numpy as np
+
+# Person class id of the COCO / person-only YOLO models
+PERSON_CLASS_ID = 0
+
+# Inference precisions; which ones a backend runs depends on the backend and the model file
+PRECISIONS = ("fp32", "fp16", "int8")
+
+
+def empty_detections():
+    """Detection array with no rows, accepted by Sort.update"""
+    return np.empty((0, 5), dtype=np.float32)
+
+
+class Detector:
+    """Base class of the person detector backends"""
+
+    backend_name = "base"
+
+    def __init__(self, model_path, conf_threshold=0.5, classes=(PERSON_CLASS_ID,), imgsz=416, precision="fp32"):
+        self.model_path = model_path
+        self.conf_threshold = conf_threshold
+        self.classes = tuple(classes) if classes is not None else None
+        self.imgsz = imgsz
+        self.precision = precision
+
+    def detect(self, frame):
+        """
+        Run the model on a BGR frame.
+        Returns a float32 array of shape (N, 5) in frame coordinates: [x1, y1, x2, y2, conf],
+        already filtered by class and confidence threshold.
+        """
+        raise NotImplementedError
+
+    def detect_batch(self, frames):
+        """Detections for several frames (a list of (N, 5) arrays); backends with batched models override this"""
+        return [self.detect(frame) for frame in frames]
+
+    def warmup(self, frame):
+        """Run one inference so weights/engines are loaded before the first real frame"""
+        self.detect(frame)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(model={self.model_path}, conf={self.conf_threshold}, imgsz={self.imgsz}, "
+                f"precision={self.precision})")
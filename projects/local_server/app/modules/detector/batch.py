@@ -0,0 +1,220 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Batched inference - one detector shared by several cameras, frames batched into one model call
+"""
+import queue
+import threading
+import time
+from collections import Counter
+
+from app.modules.detector.base import Detector
+
+
+class InferenceRequest:
+    """One frame waiting for the shared detector"""
+
+    __slots__ = ('camera', 'frame', 'done', 'detections', 'error', 'abandoned')
+
+    def __init__(self, camera, frame):
+        self.camera = camera
+        self.frame = frame
+        self.done = threading.Event()
+        self.detections = None
+        self.error = None
+        # The camera thread timed out waiting: the worker drops the request instead of running it
+        self.abandoned = False
+
+
+class BatchInferenceWorker:
+    """
+    Collect detection requests from the camera threads and run them through detector.detect_batch.
+    A batch closes when it holds max_batch frames or max_wait seconds after its first frame.
+    If detect_batch fails (e.g. a model exported with a static batch size of 1) the frames are
+    detected one by one, and batching stays off when that works.
+    """
+
+    def __init__(self, detector, max_batch=2, max_wait=0.01, timeout=10.0):
+        self.detector = detector
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.batching = True
+        self._requests = queue.Queue()
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.running = False
+        self.batches = 0
+        self.frames = 0
+        self.batch_sizes = Counter()
+        self.frames_per_camera = Counter()
+        self.busy_seconds = 0.0
+        self.batch_errors = 0
+        self.abandoned = 0
+        self.started_at = time.monotonic()
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._loop, name="batch-inference", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+        # Fail what was queued meanwhile instead of leaving the camera threads waiting
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._pending[request.camera] -= 1
+            request.frame = None
+            request.error = RuntimeError("Batch inference worker is stopped")
+            request.done.set()
+
+    def detect(self, camera, frame):
+        """Queue a frame and block until its detections are ready (TimeoutError after self.timeout)"""
+        if not self.running:
+            raise RuntimeError("Batch inference worker is stopped")
+        request = InferenceRequest(camera, frame)
+        with self._lock:
+            self._pending[camera] += 1
+        self._requests.put(request)
+        if not request.done.wait(self.timeout):
+            request.abandoned = True
+            raise TimeoutError(f"No detections for camera {camera} after {self.timeout:.0f}s")
+        if request.error is not None:
+            raise request.error
+        return request.detections
+
+    def _next_batch(self):
+        try:
+            batch = [self._requests.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drop_abandoned(self, batch):
+        """Requests of batch whose camera thread is still waiting; the others are dropped"""
+        waiting = [request for request in batch if not request.abandoned]
+        if len(waiting) < len(batch):
+            with self._lock:
+                for request in batch:
+                    if request.abandoned:
+                        self._pending[request.camera] -= 1
+                        self.abandoned += 1
+                        request.frame = None
+        return waiting
+
+    def _loop(self):
+        while self.running:
+            batch = self._drop_abandoned(self._next_batch())
+            if not batch:
+                continue
+            start = time.perf_counter()
+            self._run_batch(batch)
+            busy = time.perf_counter() - start
+
+            with self._lock:
+                self.batches += 1
+                self.frames += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self.busy_seconds += busy
+                for request in batch:
+                    self._pending[request.camera] -= 1
+                    self.frames_per_camera[request.camera] += 1
+            for request in batch:
+                request.frame = None
+                request.done.set()
+
+    def _run_batch(self, batch):
+        if self.batching:
+            try:
+                results = self.detector.detect_batch([request.frame for request in batch])
+                for request, detections in zip(batch, results):
+                    request.detections = detections
+                return
+            except Exception as e:
+                self.batch_errors += 1
+                print(f"Batched detection failed ({e}), detecting the {len(batch)} frame(s) one by one")
+        failed = False
+        for request in batch:
+            try:
+                request.detections = self.detector.detect(request.frame)
+            except Exception as e:
+                request.error = e
+                failed = True
+        if not failed and len(batch) > 1 and self.batching:
+            # The model works, only the batch does not: stop batching
+            print("Batched detection disabled, frames are detected one by one")
+            self.batching = False
+
+    def stats(self):
+        """JSON-serializable batching counters; occupancy is the average fill of a batch (1.0 = always full)"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-9)
+            return {
+                'max_batch': self.max_batch,
+                'batching': self.batching,
+                'batch_errors': self.batch_errors,
+                'abandoned': self.abandoned,
+                'batches': self.batches,
+                'frames': self.frames,
+                'avg_batch_size': round(self.frames / self.batches, 2) if self.batches else 0.0,
+                'batch_occupancy': round(self.frames / (self.batches * self.max_batch), 3) if self.batches else 0.0,
+                'batch_sizes': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                'queue_depth': self._requests.qsize(),
+                'pending_per_camera': {camera: count for camera, count in self._pending.items()},
+                'frames_per_camera': dict(self.frames_per_camera),
+                'detector_busy': round(self.busy_seconds / elapsed, 3),
+            }
+
+
+class BatchedDetector(Detector):
+    """Detector for one camera that sends its frames to a shared BatchInferenceWorker"""
+
+    def __init__(self, worker, camera):
+        detector = worker.detector
+        super().__init__(detector.model_path, detector.conf_threshold, detector.classes, detector.imgsz,
+                         detector.precision)
+        self.worker = worker
+        self.camera = camera
+        self.backend_name = f"{detector.backend_name}+batch"
+
+    def detect(self, frame):
+        return self.worker.detect(self.camera, frame)
+
+    def warmup(self, frame):
+        # The shared detector is warmed up once by the worker's owner
+        pass
+
+    def __repr__(self):
+        return f"BatchedDetector({self.worker.detector!r}, camera={self.camera}, max_batch={self.worker.max_batch})"
@@ -0,0 +1,73 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+ONNX Runtime backend - CPU inference of an exported YOLO .onnx model, no torch required
+"""
+import os
+
+import numpy as np
+
+from app.modules.detector.base import Detector
+from app.modules.detector.yolo_output import letterbox, make_blob, decode_yolo_output
+
+
+class OnnxRuntimeDetector(Detector):
+    """Person detector on top of onnxruntime.InferenceSession (CPUExecutionProvider)"""
+
+    backend_name = "onnxruntime"
+
+    def __init__(self, model_path, conf_threshold=0.5, classes=(0,), imgsz=416, precision="fp32", num_threads=None):
+        # int8 means a quantized model file (see benchmarks/bench_detector_tune.py); CPU has no fp16 path
+        if precision == "fp16":
+            raise ValueError("onnxruntime CPU backend has no fp16 inference, use fp32 or an int8 model")
+        super().__init__(model_path, conf_threshold, classes, imgsz, precision)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        num_threads = num_threads or int(os.getenv("DETECTOR_THREADS", "0"))
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        # Fixed-size exports carry their input size, prefer it over the configured one
+        input_shape = self.session.get_inputs()[0].shape
+        if isinstance(input_shape[-1], int):
+            self.imgsz = input_shape[-1]
+        # Static batch size of the export, None for a dynamic batch axis
+        self.batch_size = input_shape[0] if isinstance(input_shape[0], int) else None
+
+    def detect(self, frame):
+        image, scale, pad = letterbox(frame, self.imgsz)
+        output = self.session.run(None, {self.input_name: make_blob(image)})[0]
+        return decode_yolo_output(output, self.conf_threshold, self.classes, scale, pad, frame.shape)
+
+    def detect_batch(self, frames):
+        if self.batch_size == 1 or len(frames) < 2:
+            return super().detect_batch(frames)
+        if self.batch_size is not None and len(frames) > self.batch_size:
+            return self.detect_batch(frames[:self.batch_size]) + self.detect_batch(frames[self.batch_size:])
+
+        letterboxed = [letterbox(frame, self.imgsz) for frame in frames]
+        blob = np.concatenate([make_blob(image) for image, _, _ in letterboxed], axis=0)
+        if self.batch_size is not None and len(frames) < self.batch_size:
+            # Static batch export: pad with empty images
+            padding = np.zeros((self.batch_size - len(frames),) + blob.shape[1:], dtype=blob.dtype)
+            blob = np.concatenate([blob, padding], axis=0)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return [decode_yolo_output(output[i:i + 1], self.conf_threshold, self.classes, scale, pad, frame.shape)
+                for i, (frame, (_, scale, pad)) in enumerate(zip(frames, letterboxed))]
@@ -0,0 +1,43 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+OpenCV DNN backend - CPU inference of an exported YOLO .onnx model using only opencv-python
+"""
+import cv2
+
+from app.modules.detector.base import Detector
+from app.modules.detector.yolo_output import letterbox, make_blob, decode_yolo_output
+
+
+class OpenCvDnnDetector(Detector):
+    """Person detector on top of cv2.dnn.readNetFromONNX"""
+
+    backend_name = "opencv_dnn"
+
+    def __init__(self, model_path, conf_threshold=0.5, classes=(0,), imgsz=416, precision="fp32"):
+        if precision == "int8" or (precision == "fp16" and not hasattr(cv2.dnn, "DNN_TARGET_CPU_FP16")):
+            raise ValueError(f"OpenCV DNN {cv2.__version__} has no {precision} CPU target")
+        super().__init__(model_path, conf_threshold, classes, imgsz, precision)
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        # DNN_TARGET_CPU_FP16 exists since OpenCV 4.9
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU_FP16 if precision == "fp16" else cv2.dnn.DNN_TARGET_CPU)
+
+    def detect(self, frame):
+        image, scale, pad = letterbox(frame, self.imgsz)
+        self.net.setInput(make_blob(image))
+        output = self.net.forward()
+        return decode_yolo_output(output, self.conf_threshold, self.classes, scale, pad, frame.shape)
@@ -0,0 +1,72 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Batched post-processing of ultralytics results - one device-to-host copy per frame
+"""
+import numpy as np
+
+from app.modules.detector.base import empty_detections
+
+
+def filter_detections(data, conf_threshold, classes=None):
+    """
+    Filter an (N, 6) array [x1, y1, x2, y2, conf, cls] with a numpy mask.
+    Returns a float32 (N, 5) array [x1, y1, x2, y2, conf] ready for Sort.update.
+    """
+    if data.shape[0] == 0:
+        return empty_detections()
+    mask = data[:, 4] > conf_threshold
+    if classes is not None:
+        mask &= np.isin(data[:, 5].astype(np.int64), classes)
+    return np.ascontiguousarray(data[mask, :5], dtype=np.float32)
+
+
+def results_to_detections(results, conf_threshold, classes=None):
+    """
+    Convert ultralytics results to an (N, 5) detection array.
+    boxes.data already holds xyxy, conf and cls side by side, so each result is copied to host once.
+    """
+    chunks = []
+    for result in results:
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        data = boxes.data
+        data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+        chunks.append(filter_detections(data, conf_threshold, classes))
+
+    if not chunks:
+        return empty_detections()
+    if len(chunks) == 1:
+        return chunks[0]
+    return np.concatenate(chunks, axis=0)
+
+
+def results_to_detections_per_box(results, conf_threshold, classes=None):
+    """Previous per-box implementation, kept as the baseline for benchmarks/bench_postprocess.py"""
+    detections = []
+    for result in results:
+        boxes = result.boxes
+        for box in boxes:
+            cls = int(box.cls[0].cpu().numpy())
+            conf = float(box.conf[0])
+            if conf > conf_threshold and (classes is None or cls in classes):
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                detections.append([x1, y1, x2, y2, conf])
+
+    if len(detections) == 0:
+        return empty_detections()
+    return np.array(detections, dtype=np.float32)
@@ -0,0 +1,79 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+ROI-cropped inference - run the detector only on the customer region and map boxes back
+"""
+import numpy as np
+
+from app.modules.detector.base import Detector
+
+
+class RoiCropper:
+    """Crop frames to an ROI expanded by a margin, clipped to the frame"""
+
+    def __init__(self, roi, margin=0):
+        self.roi = tuple(int(v) for v in roi)
+        self.margin = int(margin)
+        self._region_cache = {}
+
+    def crop_region(self, frame_shape):
+        """(x1, y1, x2, y2) of the crop inside a frame of the given shape"""
+        key = tuple(frame_shape[:2])
+        region = self._region_cache.get(key)
+        if region is None:
+            frame_h, frame_w = key
+            x1, y1, x2, y2 = self.roi
+            region = (
+                max(0, x1 - self.margin),
+                max(0, y1 - self.margin),
+                min(frame_w, x2 + self.margin),
+                min(frame_h, y2 + self.margin),
+            )
+            self._region_cache[key] = region
+        return region
+
+    def crop(self, frame):
+        """Return (crop, (offset_x, offset_y))"""
+        x1, y1, x2, y2 = self.crop_region(frame.shape)
+        return np.ascontiguousarray(frame[y1:y2, x1:x2]), (x1, y1)
+
+    @staticmethod
+    def map_back(detections, offset):
+        """Shift crop-space detections [x1, y1, x2, y2, conf] back to frame coordinates"""
+        if len(detections) == 0:
+            return detections
+        detections = detections.copy()
+        detections[:, [0, 2]] += offset[0]
+        detections[:, [1, 3]] += offset[1]
+        return detections
+
+
+class RoiCroppedDetector(Detector):
+    """Wrap any Detector so it only sees the ROI crop; output stays in full-frame coordinates"""
+
+    def __init__(self, detector, roi, margin=0):
+        super().__init__(detector.model_path, detector.conf_threshold, detector.classes, detector.imgsz,
+                         detector.precision)
+        self.detector = detector
+        self.cropper = RoiCropper(roi, margin)
+        self.backend_name = f"{detector.backend_name}+roi"
+
+    def detect(self, frame):
+        crop, offset = self.cropper.crop(frame)
+        return self.cropper.map_back(self.detector.detect(crop), offset)
+
+    def __repr__(self):
+        return f"RoiCroppedDetector({self.detector!r}, roi={self.cropper.roi}, margin={self.cropper.margin})"
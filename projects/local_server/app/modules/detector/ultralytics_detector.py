@@ -0,0 +1,44 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Ultralytics backend - runs .pt weights, TensorRT .engine files (Jetson) and exported .onnx models
+"""
+from app.modules.detector.base import Detector
+from app.modules.detector.postprocess import results_to_detections
+
+
+class UltralyticsDetector(Detector):
+    """Person detector on top of ultralytics.YOLO"""
+
+    backend_name = "ultralytics"
+
+    def __init__(self, model_path, conf_threshold=0.5, classes=(0,), imgsz=416, precision="fp32"):
+        super().__init__(model_path, conf_threshold, classes, imgsz, precision)
+        # Imported here so CPU-only backends don't pay for torch/ultralytics at startup
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.model.overrides['verbose'] = False
+        # fp16 runs .pt weights in half precision (CUDA only); int8 needs an INT8 TensorRT engine file
+        self.half = precision == "fp16"
+
+    def detect(self, frame):
+        results = self.model(frame, imgsz=self.imgsz, half=self.half)
+        return results_to_detections(results, self.conf_threshold, self.classes)
+
+    def detect_batch(self, frames):
+        # One predictor call for the whole list; TensorRT engines must be exported with batch >= len(frames)
+        results = self.model(list(frames), imgsz=self.imgsz, half=self.half)
+        return [results_to_detections([result], self.conf_threshold, self.classes) for result in results]
@@ -0,0 +1,87 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Pre/post-processing shared by the raw ONNX backends (ONNX Runtime, OpenCV DNN)
+"""
+import cv2
+import numpy as np
+
+from app.modules.detector.base import empty_detections
+
+
+def letterbox(frame, size):
+    """
+    Resize keeping aspect ratio and pad to a size x size square (ultralytics style, pad value 114).
+    Returns (image, scale, (pad_x, pad_y)).
+    """
+    h, w = frame.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = frame
+    return canvas, scale, (pad_x, pad_y)
+
+
+def make_blob(image):
+    """BGR uint8 HWC image -> RGB float32 NCHW blob in [0, 1]"""
+    return cv2.dnn.blobFromImage(image, scalefactor=1.0 / 255.0, swapRB=True)
+
+
+def decode_yolo_output(output, conf_threshold, classes, scale, pad, frame_shape, nms_iou=0.45):
+    """
+    Decode a raw YOLOv8/YOLO11 head output of shape (1, 4 + nc, A) into an (N, 5) array
+    [x1, y1, x2, y2, conf] in original frame coordinates, with class filter and NMS applied.
+    """
+    pred = np.squeeze(np.asarray(output), 0)
+    if pred.shape[0] > pred.shape[1]:
+        pred = pred.T  # some exporters emit (A, 4 + nc)
+
+    class_scores = pred[4:]
+    if class_scores.shape[0] == 1:
+        cls = np.zeros(class_scores.shape[1], dtype=np.int64)
+        conf = class_scores[0]
+    else:
+        cls = class_scores.argmax(0)
+        conf = class_scores[cls, np.arange(class_scores.shape[1])]
+
+    mask = conf > conf_threshold
+    if classes is not None:
+        mask &= np.isin(cls, classes)
+    if not np.any(mask):
+        return empty_detections()
+
+    cx, cy, w, h = pred[:4, mask]
+    conf = conf[mask]
+    pad_x, pad_y = pad
+    x1 = (cx - w / 2 - pad_x) / scale
+    y1 = (cy - h / 2 - pad_y) / scale
+    x2 = (cx + w / 2 - pad_x) / scale
+    y2 = (cy + h / 2 - pad_y) / scale
+
+    frame_h, frame_w = frame_shape[:2]
+    boxes = np.stack([x1, y1, x2, y2], axis=1)
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_w)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_h)
+
+    xywh = np.column_stack([boxes[:, 0], boxes[:, 1], boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]])
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), conf.tolist(), conf_threshold, nms_iou)
+    keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+    if keep.size == 0:
+        return empty_detections()
+    return np.column_stack([boxes[keep], conf[keep]]).astype(np.float32)
@@ -0,0 +1,102 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Device Commands - what the payment and RFID code asks the loadcells to do
+
+Payment routes, the tracking loop and the RFID/add product code post() a typed command from any
+thread; update_loadcell_quantity.send_data_to_devices() blocks on the queue, so it wakes up as soon
+as a command arrives. It turns the command into writes on the device outboxes (ble_outbox), which
+wake the device tasks on the BLE loop: both loadcells are written concurrently.
+"""
+import queue
+import threading
+import time
+
+
+class DeviceCommand:
+    """Base of the loadcell commands"""
+
+    __slots__ = ('created_at',)
+
+    def __init__(self):
+        self.created_at = time.monotonic()
+
+
+class PaymentVerified(DeviceCommand):
+    """Payment done: the loadcell quantities become the verified quantities (save quantity 0)"""
+
+    __slots__ = ()
+
+
+class RfidStateChanged(DeviceCommand):
+    """Employee tap: 1 = adding (push weights, names, prices), 0 = added (save quantity)"""
+
+    __slots__ = ('rfid_state',)
+
+    def __init__(self, rfid_state):
+        super().__init__()
+        self.rfid_state = rfid_state
+
+
+class DeviceCommandQueue:
+    """Thread-safe command queue with dispatch latency counters per command type"""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self.posted = {}
+        self.handled = {}
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    def post(self, command):
+        """Called from any thread: never blocks"""
+        name = type(command).__name__
+        with self._lock:
+            self.posted[name] = self.posted.get(name, 0) + 1
+        self._queue.put(command)
+
+    def get(self, timeout=None):
+        """Next command, None after timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def record(self, command):
+        """Record a handled command; latency is measured from post()"""
+        latency = time.monotonic() - command.created_at
+        name = type(command).__name__
+        with self._lock:
+            self.handled[name] = self.handled.get(name, 0) + 1
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self):
+        """Get a JSON-serializable view of the counters"""
+        with self._lock:
+            return {
+                'posted': dict(self.posted),
+                'handled': dict(self.handled),
+                'pending': self._queue.qsize(),
+                'latency_ms': round(self.last_latency * 1000, 2),
+                'max_latency_ms': round(self.max_latency * 1000, 2),
+                'timestamp': time.time()
+            }
+
+
+# Global command queue to the loadcell devices
+device_commands = DeviceCommandQueue()
@@ -0,0 +1,227 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Frame Capture - Grab camera frames in a background thread and hand the newest one to the vision loop
+"""
+import threading
+import time
+from collections import deque
+
+
+class FpsMeter:
+    """Frames-per-second over a sliding time window"""
+
+    def __init__(self, window_seconds=2.0):
+        self.window_seconds = window_seconds
+        self._ticks = deque()
+        self._lock = threading.Lock()
+
+    def tick(self, now=None):
+        """Record one processed frame"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._ticks.append(now)
+            while self._ticks and now - self._ticks[0] > self.window_seconds:
+                self._ticks.popleft()
+
+    def get_fps(self):
+        """Get the current rate, 0 when nothing was recorded in the window"""
+        now = time.monotonic()
+        with self._lock:
+            while self._ticks and now - self._ticks[0] > self.window_seconds:
+                self._ticks.popleft()
+            if len(self._ticks) < 2:
+                return 0.0
+            span = self._ticks[-1] - self._ticks[0]
+            return (len(self._ticks) - 1) / span if span > 0 else 0.0
+
+
+class FrameRingBuffer:
+    """Small ring of the most recent frames; readers only ever get the newest one"""
+
+    def __init__(self, size=3):
+        self.size = max(1, int(size))
+        self._slots = [None] * self.size
+        self._seq = 0  # sequence number of the newest frame, 0 means empty
+        self._cond = threading.Condition()
+
+    def put(self, frame, timestamp):
+        """Store a frame, overwriting the oldest slot"""
+        with self._cond:
+            self._seq += 1
+            self._slots[self._seq % self.size] = (self._seq, frame, timestamp)
+            self._cond.notify_all()
+            return self._seq
+
+    def get_latest(self, after_seq=0, timeout=None):
+        """
+        Return (seq, frame, timestamp) of the newest frame newer than after_seq.
+        Blocks up to timeout seconds, returns None if no new frame arrived.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq, timeout=timeout):
+                return None
+            return self._slots[self._seq % self.size]
+
+    @property
+    def seq(self):
+        with self._cond:
+            return self._seq
+
+
+class VisionMetrics:
+    """Thread-safe capture/inference/latency counters of the vision pipeline"""
+
+    def __init__(self):
+        self.capture_fps = FpsMeter()
+        self.inference_fps = FpsMeter()
+        self._lock = threading.Lock()
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_inferred = 0
+        self.frames_skipped = 0
+        self.frames_predicted = 0
+        self.last_frame_age = 0.0
+        self.avg_frame_age = 0.0
+        self.max_frame_age = 0.0
+
+    def record_capture(self):
+        self.capture_fps.tick()
+        with self._lock:
+            self.frames_captured += 1
+
+    def record_dropped(self, count):
+        """Record frames that were overwritten before the consumer picked them up"""
+        if count > 0:
+            with self._lock:
+                self.frames_dropped += count
+
+    def record_skipped(self):
+        """Record a frame the motion gate let through without running the detector"""
+        with self._lock:
+            self.frames_skipped += 1
+
+    def record_predicted(self):
+        """Record a frame tracked with Kalman prediction only (detector not scheduled)"""
+        with self._lock:
+            self.frames_predicted += 1
+
+    def record_inference(self, frame_timestamp):
+        """Record a finished inference on a frame grabbed at frame_timestamp (time.monotonic)"""
+        self.inference_fps.tick()
+        age = time.monotonic() - frame_timestamp
+        with self._lock:
+            self.frames_inferred += 1
+            self.last_frame_age = age
+            # Exponential moving average keeps the number stable under bursts
+            self.avg_frame_age = age if self.frames_inferred == 1 else 0.9 * self.avg_frame_age + 0.1 * age
+            self.max_frame_age = max(self.max_frame_age, age)
+
+    def snapshot(self):
+        """Get a JSON-serializable view of the metrics"""
+        with self._lock:
+            return {
+                'capture_fps': round(self.capture_fps.get_fps(), 2),
+                'inference_fps': round(self.inference_fps.get_fps(), 2),
+                'frame_age_ms': round(self.last_frame_age * 1000, 1),
+                'avg_frame_age_ms': round(self.avg_frame_age * 1000, 1),
+                'max_frame_age_ms': round(self.max_frame_age * 1000, 1),
+                'frames_captured': self.frames_captured,
+                'frames_dropped': self.frames_dropped,
+                'frames_inferred': self.frames_inferred,
+                'frames_skipped': self.frames_skipped,
+                'frames_predicted': self.frames_predicted,
+                'timestamp': time.time()
+            }
+
+
+class FrameCapture:
+    """Keep reading from an opened cv2.VideoCapture so the consumer always sees the newest frame"""
+
+    def __init__(self, cap, buffer_size=3, metrics=None):
+        self.cap = cap
+        self.buffer = FrameRingBuffer(buffer_size)
+        self.metrics = metrics if metrics is not None else VisionMetrics()
+        self.running = False
+        self.thread = None
+        self._last_read_seq = 0
+
+    def start(self):
+        """Start grabbing frames in a separate thread"""
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop grabbing frames"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+        print("Frame capture stopped")
+
+    def _capture_loop(self):
+        """Main capture loop"""
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                print("Error: Can't read frame!")
+                time.sleep(0.1)
+                continue
+            self.buffer.put(frame, time.monotonic())
+            self.metrics.record_capture()
+
+    def read(self, timeout=1.0):
+        """
+        Return (ret, frame, timestamp) with the newest frame not returned before.
+        Older frames are skipped, ret is False if no frame arrived within timeout.
+        """
+        latest = self.buffer.get_latest(self._last_read_seq, timeout=timeout)
+        if latest is None:
+            return False, None, None
+        seq, frame, timestamp = latest
+        # Every frame between the previous read and this one was never seen
+        if self._last_read_seq:
+            self.metrics.record_dropped(seq - self._last_read_seq - 1)
+        self._last_read_seq = seq
+        return True, frame, timestamp
+
+    def pending(self):
+        """Frames captured since the last read (the consumer only takes the newest one)"""
+        return self.buffer.seq - self._last_read_seq
+
+    def skip_pending(self):
+        """Mark every buffered frame as seen without counting it as dropped (used while idle)"""
+        self._last_read_seq = self.buffer.seq
+
+
+# Latest snapshot sent by the vision worker (the live counters are in that process):
+# {'cameras': {name: VisionMetrics.snapshot() + queue_depth}, 'inference': BatchInferenceWorker.stats() or None}
+published_metrics = None
+
+
+def publish_vision_metrics(snapshot):
+    """Store a snapshot received from the vision worker for the debug API"""
+    global published_metrics
+    published_metrics = snapshot
+
+
+def get_vision_metrics():
+    """Get a snapshot of the vision pipeline metrics"""
+    if published_metrics is not None:
+        return published_metrics
+    return {'cameras': {}, 'inference': None}
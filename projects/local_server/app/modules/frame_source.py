@@ -0,0 +1,199 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Frame Sources - camera, video file and image directory inputs behind the cv2.VideoCapture interface
+
+Source specs (the "source" key in database/cameras.json):
+    gstreamer              Jetson CSI camera through nvarguscamerasrc
+    gstreamer:<n>          CSI camera with sensor-id n (second/third camera)
+    gstreamer:<pipeline>   any GStreamer pipeline ending in appsink
+    v4l2 / v4l2:<device>   USB/V4L2 camera, device index or path (default 0)
+    file:<path>            recorded video
+    images:<dir>           directory of frames, replayed in file name order
+    <path>                 video file or image directory, picked by what exists
+"""
+import glob
+import os
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def jetson_csi_pipeline(width=416, height=416, fps=30, sensor_id=0):
+    """GStreamer pipeline for the Jetson CSI camera; appsink keeps only the newest frame"""
+    return (
+        f"nvarguscamerasrc sensor-id={sensor_id} ! "
+        f"video/x-raw(memory:NVMM), width={width}, height={height}, framerate={fps}/1 ! "
+        "nvvidconv ! "
+        "video/x-raw, format=BGRx ! "
+        "videoconvert ! "
+        "video/x-raw, format=BGR ! appsink drop=true max-buffers=1 sync=false"
+    )
+
+
+class FrameSource:
+    """Base class: read() -> (ret, frame), isOpened(), release(); same calls as cv2.VideoCapture"""
+
+    name = "source"
+    is_live = True
+
+    def __init__(self, size=None):
+        # (width, height) every frame is resized to, None keeps the source size
+        self.size = tuple(size) if size else None
+        self.fps = 0.0
+
+    def isOpened(self):
+        raise NotImplementedError
+
+    def grab_frame(self):
+        raise NotImplementedError
+
+    def read(self):
+        ret, frame = self.grab_frame()
+        if ret and self.size and (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        return ret, frame
+
+    def release(self):
+        pass
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name})"
+
+
+class OpenCvFrameSource(FrameSource):
+    """Anything cv2.VideoCapture can open"""
+
+    def __init__(self, target, api_preference=cv2.CAP_ANY, size=None):
+        super().__init__(size)
+        self.name = str(target)
+        self.cap = cv2.VideoCapture(target, api_preference)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def grab_frame(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class GStreamerCameraSource(OpenCvFrameSource):
+    """Jetson CSI camera (or a custom pipeline)"""
+
+    def __init__(self, pipeline=None, width=416, height=416, fps=30):
+        super().__init__(pipeline or jetson_csi_pipeline(width, height, fps), cv2.CAP_GSTREAMER)
+        self.name = "gstreamer"
+        self.fps = fps
+
+
+class V4L2CameraSource(OpenCvFrameSource):
+    """USB / V4L2 camera (the PC setup)"""
+
+    def __init__(self, device=0, width=416, height=416, fps=30):
+        super().__init__(device, cv2.CAP_V4L2, size=(width, height))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap.set(cv2.CAP_PROP_FPS, fps)
+        self.name = f"v4l2:{device}"
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or fps
+
+
+class VideoFileSource(OpenCvFrameSource):
+    """Recorded video; realtime paces reads to the file frame rate, loop restarts at the end"""
+
+    is_live = False
+
+    def __init__(self, path, size=None, realtime=False, loop=False):
+        super().__init__(path, size=size)
+        self.realtime = realtime
+        self.loop = loop
+        self._next_frame_time = None
+
+    def grab_frame(self):
+        if self.realtime and self.fps > 0:
+            now = time.monotonic()
+            if self._next_frame_time is not None and self._next_frame_time > now:
+                time.sleep(self._next_frame_time - now)
+            self._next_frame_time = max(now, self._next_frame_time or now) + 1.0 / self.fps
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+
+class ImageDirectorySource(FrameSource):
+    """Directory of frames replayed in sorted file name order"""
+
+    is_live = False
+
+    def __init__(self, path, size=None, fps=30.0, realtime=False, loop=False):
+        super().__init__(size)
+        self.name = path
+        self.files = sorted(f for f in glob.glob(os.path.join(path, '*')) if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self._index = 0
+        self._next_frame_time = None
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+    def grab_frame(self):
+        if self._index >= len(self.files):
+            if not self.loop or not self.files:
+                return False, None
+            self._index = 0
+        if self.realtime and self.fps > 0:
+            now = time.monotonic()
+            if self._next_frame_time is not None and self._next_frame_time > now:
+                time.sleep(self._next_frame_time - now)
+            self._next_frame_time = max(now, self._next_frame_time or now) + 1.0 / self.fps
+        frame = cv2.imread(self.files[self._index])
+        self._index += 1
+        return frame is not None, frame
+
+
+def create_frame_source(spec="gstreamer", size=(416, 416), fps=30, realtime=False, loop=False):
+    """
+    Open a frame source from a spec string (see module docstring).
+    realtime/loop only apply to recorded sources.
+    """
+    kind, _, arg = spec.partition(':')
+    width, height = size if size else (416, 416)
+
+    if kind == "gstreamer":
+        if arg.isdigit():
+            return GStreamerCameraSource(jetson_csi_pipeline(width, height, fps, int(arg)), width, height, fps)
+        return GStreamerCameraSource(arg or None, width, height, fps)
+    if kind == "v4l2":
+        device = int(arg) if arg.isdigit() else (arg or 0)
+        return V4L2CameraSource(device, width, height, fps)
+    if kind == "file":
+        return VideoFileSource(arg, size, realtime, loop)
+    if kind == "images":
+        return ImageDirectorySource(arg, size, fps, realtime, loop)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, size, fps, realtime, loop)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec, size, realtime, loop)
+    raise ValueError(f"Unknown frame source '{spec}'")
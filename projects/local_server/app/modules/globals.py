@@ -18,6 +18,7 @@ import numpy as np
 import os
 from app.utils.file_utils import read_file
 from app.modules.cloud_sync import load_rfids_from_cloud, load_combo_from_cloud, load_posters_from_cloud
+from app.modules.product_catalog import product_catalog
 from app.utils.string_utils import remove_accents
 
 # Define loadcell configuration
@@ -64,12 +65,10 @@ rfids = read_file(rfids_path) # List of valid RFID tags
 
 rfid_state = 0 # 0 is added, 1 is adding
 bool_rfid_devices = False
-bool_rfid = False
 rfid = ""
 
 # When payment is verified, update verified quantity is set to True
 update_verified_quantity = False
-payment_verified = False
 is_tracking = False
 print_bill = False
 
@@ -81,15 +80,12 @@ verified_quantity_data = read_file(loadcell_file_path)
 
 verified_quantity = np.array(verified_quantity_data["values"])
 loadcell_quantity = np.array(verified_quantity_data["values"])
+# Incremented by every loadcell_quantity update, analyses of the values are cached per version
+loadcell_version = 0
 taken_quantity = np.zeros(LOADCELL_NUM_TOTAL)
 
-# Load products infomation from json file
-product_path = os.path.abspath(os.path.join(__file__, "../../..", "database/products.json"))
-products_data = read_file(product_path)
-weight_of_one = load_weight_of_one(products_data)
-products_price = load_products_price(products_data)
-products_name = load_products_name(products_data)
-products_name_decimal, products_name_char_count = load_products_name_decimal(products_name)
+# Products infomation lives in product_catalog (database/products.json, reloaded when it changes);
+# the values sent to the loadcells are derived from it once per catalog version
 
 voice_command = None
 
@@ -99,6 +95,7 @@ imu_data_init = None
 shelf_lean = False
 shelf_shake = False
 unpaid_customer_warning = False
+customer_session_id = None # Snapshot store session of the customer at the shelf
 pressure = None
 temperature = None
 humidity = None
@@ -112,17 +109,10 @@ loadcell_lock = threading.Lock()
 verified_quantity_lock = threading.Lock()
 taken_quantity_lock = threading.Lock()
 is_tracking_lock = threading.Lock()
-payment_verified_lock = threading.Lock()
 update_verified_quantity_lock = threading.Lock()
 voice_command_lock = threading.Lock()
 print_bill_lock = threading.Lock()
 rfid_lock = threading.Lock()
-products_lock = threading.Lock()
-products_weight_lock = threading.Lock()
-products_price_lock = threading.Lock()
-products_name_lock = threading.Lock()
-products_name_decimal_lock = threading.Lock()
-products_name_char_count_lock = threading.Lock()
 rfids_lock = threading.Lock()
 imu_data_init_lock = threading.Lock()
 threatshold_imu_lean_lock = threading.Lock()
@@ -136,6 +126,7 @@ magnetic_lock = threading.Lock()
 shelf_lean_lock = threading.Lock()
 shelf_shake_lock = threading.Lock()
 unpaid_customer_warning_lock = threading.Lock()
+customer_session_id_lock = threading.Lock()
 
 # Last data reception timestamp for connection tracking
 last_data_reception_time = 0
@@ -215,25 +206,24 @@ def get_loadcell_quantity_snapshot():
     with loadcell_lock:
         return [int(x) for x in loadcell_quantity.copy()]
 
+def get_loadcell_version():
+    """Version of loadcell quantity, changes with every update"""
+    return loadcell_version
+
+def get_loadcell_state():
+    """Get (version, copy of the loadcell quantity array) taken together"""
+    with loadcell_lock:
+        return loadcell_version, loadcell_quantity.copy()
+
 def set_loadcell_quantity(new_data):
     """Set loadcell quantity in a thread-safe way"""
     with loadcell_lock:
-        global loadcell_quantity
+        global loadcell_quantity, loadcell_version
         if isinstance(new_data, list):
             loadcell_quantity[:len(new_data)] = new_data
         else:
             loadcell_quantity = np.array([int(x) for x in new_data])
-
-def get_payment_verified():
-    """Get a thread-safe snapshot of payment verified state"""
-    with payment_verified_lock:
-        return payment_verified
-
-def set_payment_verified(new_state):
-    """Set payment verified state in a thread-safe way"""
-    with payment_verified_lock:
-        global payment_verified
-        payment_verified = new_state
+        loadcell_version += 1
 
 def get_update_verified_quantity():
     """Get a thread-safe snapshot of update verified quantity state"""
@@ -280,70 +270,35 @@ def set_rfid_state(new_state):
         rfid_state = new_state
 
 def get_products_data():
-    """Get a thread-safe snapshot of products data"""
-    with products_lock:
-        return products_data
+    """Get the current products list from the product catalog (do not modify it)"""
+    return product_catalog.get_products()
 
 def set_products_data(new_data):
-    """Set products data in a thread-safe way"""
-    with products_lock:
-        global products_data
-        products_data = new_data
+    """Publish a new products list (also written to products.json)"""
+    product_catalog.publish(new_data)
 
-def get_products_weight():
-    """Get a thread-safe snapshot of products weight"""
-    with products_weight_lock:
-        return weight_of_one
+def _build_products_name_decimal(products_data):
+    return load_products_name_decimal(load_products_name(products_data))
 
-def set_products_weight(new_weight):
-    """Set products weight in a thread-safe way"""
-    with products_weight_lock:
-        global weight_of_one
-        weight_of_one = new_weight
+def get_products_weight():
+    """Get a snapshot of products weight"""
+    return list(product_catalog.derived('weight_of_one', load_weight_of_one))
 
 def get_products_price():
-    """Get a thread-safe snapshot of products price"""
-    with products_price_lock:
-        return products_price.copy()
-
-def set_products_price(new_price):
-    """Set products price in a thread-safe way"""
-    with products_price_lock:
-        global products_price
-        products_price = new_price
+    """Get a snapshot of products price"""
+    return list(product_catalog.derived('products_price', load_products_price))
 
 def get_products_name():
-    """Get a thread-safe snapshot of products name"""
-    with products_name_lock:
-        return products_name.copy()
-
-def set_products_name(new_name):
-    """Set products name in a thread-safe way"""
-    with products_name_lock:
-        global products_name
-        products_name = new_name
+    """Get a snapshot of products name"""
+    return list(product_catalog.derived('products_name', load_products_name))
 
 def get_products_name_decimal():
-    """Get a thread-safe snapshot of products name decimal"""
-    with products_name_decimal_lock:
-        return products_name_decimal.copy()
-
-def set_products_name_decimal(new_name_decimal):
-    """Set products name decimal in a thread-safe way"""
-    with products_name_decimal_lock:
-        global products_name_decimal
-        products_name_decimal = new_name_decimal
+    """Get a snapshot of products name decimal"""
+    return list(product_catalog.derived('products_name_decimal', _build_products_name_decimal)[0])
 
 def get_products_name_char_count():
-    """Get a thread-safe snapshot of products name character count"""
-    with products_name_char_count_lock:
-        return products_name_char_count.copy()
-
-def set_products_name_char_count(new_char_count):
-    """Set products name character count in a thread-safe way"""
-    with products_name_char_count_lock:
-        global products_name_char_count
-        products_name_char_count = new_char_count
+    """Get products name character count (bytes of the names of loadcell 1)"""
+    return product_catalog.derived('products_name_decimal', _build_products_name_decimal)[1]
 
 def get_rfids():
     """Get a thread-safe snapshot of rfids"""
@@ -488,6 +443,17 @@ def set_unpaid_customer_warning(new_warning):
         global unpaid_customer_warning
         unpaid_customer_warning = new_warning
 
+def get_customer_session_id():
+    """Get the snapshot session id of the current customer (None before their snapshot)"""
+    with customer_session_id_lock:
+        return customer_session_id
+
+def set_customer_session_id(new_session_id):
+    """Set the snapshot session id of the current customer in a thread-safe way"""
+    with customer_session_id_lock:
+        global customer_session_id
+        customer_session_id = new_session_id
+
 
 
 # Load data from cloud 
@@ -16,6 +16,7 @@
 import time
 import os
 from app.modules import globals
+from app.modules.device_commands import RfidStateChanged, device_commands
 import keyboard
 import numpy as np
 import threading
@@ -99,7 +100,7 @@ def start_listen_rfid():
                             print(f"Error posting history added data to cloud: {e}")
 
                     globals.bool_rfid_devices = True # send weight data and rfid state to devices, if rfid_state is 1 => send weight data
-                    globals.bool_rfid = True
+                    device_commands.post(RfidStateChanged(rfid_state))
                     if rfid_state == 1:
                         print(f"RFID state 1 - Adding products")
                     else:
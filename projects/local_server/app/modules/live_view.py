@@ -0,0 +1,131 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Live View - MJPEG stream of what the tracker sees (frame, ROI and tracked boxes)
+
+Nothing runs in the background: frames are only read from the vision rings and encoded inside the
+viewers' stream generators. All viewers share one encoded JPEG per processed frame, and each viewer
+is capped at its own frame rate.
+"""
+import os
+import threading
+import time
+
+import cv2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LIVE_VIEW_MAX_FPS = float(os.getenv("LIVE_VIEW_MAX_FPS", "10"))
+LIVE_VIEW_JPEG_QUALITY = 70
+BOUNDARY = "frame"
+
+
+def draw_overlay(frame, roi, tracked_objects):
+    """Copy of frame with the customer ROI (blue) and tracked boxes with their ids (green)"""
+    image = frame.copy()
+    x1, y1, x2, y2 = (int(v) for v in roi)
+    cv2.rectangle(image, (x1, y1), (x2, y2), (255, 0, 0), 2)
+    for x1, y1, x2, y2, track_id in (tracked_objects if tracked_objects is not None else []):
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(image, str(int(track_id)), (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    return image
+
+
+class LiveView:
+    """Encodes the newest frame of a camera of the attached VisionProcess on demand, for the MJPEG route"""
+
+    def __init__(self, max_fps=LIVE_VIEW_MAX_FPS, jpeg_quality=LIVE_VIEW_JPEG_QUALITY):
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+        self.vision = None
+        self.viewers = {}
+        self.frames_encoded = 0
+        self._cache = {}  # camera name -> (seq, jpeg)
+        self._lock = threading.Lock()
+
+    def attach(self, vision):
+        """Stream from this VisionProcess (None detaches)"""
+        with self._lock:
+            self.vision = vision
+            self._cache = {}
+
+    def detach(self):
+        self.attach(None)
+
+    def get_jpeg(self, camera=None):
+        """(seq, jpeg bytes) of a camera's newest processed frame, encoded at most once per frame; None if no frame"""
+        with self._lock:
+            vision = self.vision
+            if vision is None:
+                return None
+            camera = camera or vision.camera["name"]
+            if camera not in vision.cameras:
+                return None
+            seq = vision.latest_seq(camera)
+            cached = self._cache.get(camera)
+            if cached is not None and cached[0] == seq:
+                return cached
+            frame = vision.read_frame(seq, camera)
+            if frame is None:
+                return None
+            image = draw_overlay(frame, vision.cameras[camera]["roi"], vision.read_tracks(seq, camera))
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                return None
+            self._cache[camera] = (seq, buffer.tobytes())
+            self.frames_encoded += 1
+            return self._cache[camera]
+
+    def stream(self, camera=None, fps=None):
+        """MJPEG multipart generator for one viewer; encoding stops when the last viewer disconnects"""
+        fps = min(fps, self.max_fps) if fps is not None and fps > 0 else self.max_fps
+        period = 1.0 / fps
+        key = camera or "default"
+        with self._lock:
+            self.viewers[key] = self.viewers.get(key, 0) + 1
+        print(f"Live view: viewer connected to {key} ({self.viewers[key]} watching, {fps:g} FPS)")
+        try:
+            last_seq = 0
+            while True:
+                start = time.monotonic()
+                latest = self.get_jpeg(camera)
+                if latest is not None and latest[0] != last_seq:
+                    last_seq, jpeg = latest
+                    yield (b"--" + BOUNDARY.encode() + b"\r\nContent-Type: image/jpeg\r\n"
+                           b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+                time.sleep(max(0.0, period - (time.monotonic() - start)))
+        finally:
+            # Runs when the client disconnects and the server closes the generator
+            with self._lock:
+                self.viewers[key] -= 1
+                if sum(self.viewers.values()) == 0:
+                    self._cache = {}
+            print(f"Live view: viewer disconnected from {key} ({self.viewers[key]} watching)")
+
+    def status(self):
+        return {
+            'attached': self.vision is not None,
+            'cameras': list(self.vision.cameras) if self.vision is not None else [],
+            'viewers': dict(self.viewers),
+            'max_fps': self.max_fps,
+            'frames_encoded': self.frames_encoded,
+        }
+
+
+# Global live view, attached by the tracking loop
+live_view = LiveView()
@@ -0,0 +1,133 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Loadcell Events - hand-off between the BLE notification handlers and the loadcell consumer thread
+
+The handlers run on the BLE asyncio loop and only decode the payload and put() an event; the
+consumer (update_loadcell_quantity.consume_loadcell_events) does the cart, pricing, emits and MQTT.
+
+Lifting several items makes both loadcells send bursts of notifications. get_batch() coalesces
+them: it keeps collecting until no new event arrived for `window` seconds (capped at
+`max_wait`), and the consumer turns the whole batch into one state transition.
+"""
+import queue
+import threading
+import time
+
+
+class LoadcellEvent:
+    """One decoded loadcell notification"""
+
+    __slots__ = ('device_name', 'sender', 'values', 'received_at')
+
+    def __init__(self, device_name, sender, values, received_at=None):
+        self.device_name = device_name
+        self.sender = sender
+        self.values = values
+        self.received_at = time.monotonic() if received_at is None else received_at
+
+
+class LoadcellEventQueue:
+    """Unbounded thread-safe queue with hand-off delay and raw vs coalesced counters"""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self.received = 0
+        self.processed = 0
+        self.batches = 0
+        self.transitions = 0
+        self.unchanged = 0
+        self.max_batch_size = 0
+        self.last_delay = 0.0
+        self.avg_delay = 0.0
+        self.max_delay = 0.0
+
+    def put(self, event):
+        """Called from the BLE loop: never blocks"""
+        self._queue.put(event)
+        with self._lock:
+            self.received += 1
+
+    def get(self, timeout=None):
+        """Next event, None after timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_batch(self, window, max_wait=None, timeout=None):
+        """
+        Block up to timeout for an event, then keep collecting until the stream is quiet for
+        window seconds or max_wait (default 4 x window) passed since the first one.
+        Returns the events in arrival order, [] after timeout.
+        """
+        first = self.get(timeout)
+        if first is None:
+            return []
+        batch = [first]
+        if window <= 0:
+            return batch
+        deadline = time.monotonic() + (max_wait if max_wait is not None else 4 * window)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = self.get(min(window, remaining))
+            if event is None:
+                break
+            batch.append(event)
+        return batch
+
+    def record_batch(self, events, changed):
+        """
+        Record one processed batch; changed is False when it settled on the state already emitted.
+        The delay is measured from the oldest notification of the batch.
+        """
+        delay = time.monotonic() - events[0].received_at
+        with self._lock:
+            self.processed += len(events)
+            self.batches += 1
+            if changed:
+                self.transitions += 1
+            else:
+                self.unchanged += 1
+            self.max_batch_size = max(self.max_batch_size, len(events))
+            self.last_delay = delay
+            self.avg_delay = delay if self.batches == 1 else 0.9 * self.avg_delay + 0.1 * delay
+            self.max_delay = max(self.max_delay, delay)
+
+    def snapshot(self):
+        """Get a JSON-serializable view of the counters"""
+        with self._lock:
+            return {
+                'received': self.received,
+                'processed': self.processed,
+                'pending': self._queue.qsize(),
+                'coalesced_batches': self.batches,
+                'transitions': self.transitions,
+                'unchanged_batches': self.unchanged,
+                'avg_batch_size': round(self.processed / self.batches, 2) if self.batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'delay_ms': round(self.last_delay * 1000, 2),
+                'avg_delay_ms': round(self.avg_delay * 1000, 2),
+                'max_delay_ms': round(self.max_delay * 1000, 2),
+                'timestamp': time.time()
+            }
+
+
+# Global queue between the BLE handlers and the loadcell consumer
+loadcell_events = LoadcellEventQueue()
@@ -0,0 +1,67 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Motion Gate - cheap frame differencing that decides whether the detector needs to run
+"""
+import cv2
+
+
+class MotionGate:
+    """
+    Compare a small grayscale copy of each frame with the frame of the last inference.
+    Inference is requested when enough pixels changed, or every keepalive_frames frames.
+    """
+
+    def __init__(self, pixel_threshold=25, min_area_ratio=0.002, keepalive_frames=15, width=96):
+        self.pixel_threshold = pixel_threshold
+        self.min_area_ratio = min_area_ratio
+        self.keepalive_frames = max(1, int(keepalive_frames))
+        self.width = width
+        self.last_motion_ratio = 0.0
+        self.reset()
+
+    def reset(self):
+        """Forget the reference frame so the next frame is always inferred"""
+        self._reference = None
+        self._frames_since_inference = 0
+
+    def _prepare(self, frame):
+        height = max(1, int(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        # Blur away sensor noise so it doesn't count as motion
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_infer(self, frame):
+        """Return True if the detector should run on this frame"""
+        current = self._prepare(frame)
+        self._frames_since_inference += 1
+
+        if self._reference is None or self._reference.shape != current.shape:
+            infer = True
+            self.last_motion_ratio = 1.0
+        else:
+            # Compared with the last inferred frame, so slow movement still adds up
+            diff = cv2.absdiff(current, self._reference)
+            changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+            self.last_motion_ratio = changed / diff.size
+            infer = (self.last_motion_ratio >= self.min_area_ratio
+                     or self._frames_since_inference >= self.keepalive_frames)
+
+        if infer:
+            self._reference = current
+            self._frames_since_inference = 0
+        return infer
@@ -0,0 +1,176 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Product Catalog - the products of database/products.json, parsed once and kept in memory
+
+Products are indexed by shelf position (list order) and by product_id. Readers get the shared
+list, so they must not modify the product dicts (copy with {**product} like the cart code does).
+The file is only stat()ed, at most every `check_interval` seconds; it is read again when its
+mtime or size changed and parsed again only when its content hash changed.
+cloud_sync.load_products_from_cloud() publishes a new version directly.
+
+Values computed from the products (weights, prices and names sent to the loadcells) are cached
+per version with derived().
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+product_path = os.path.abspath(os.path.join(__file__, "../../..", "database/products.json"))
+
+
+class ProductCatalog:
+    """Versioned in-memory products.json with position and product_id lookups"""
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._products = []
+        self._by_id = {}
+        self._derived = {}
+        self._version = 0
+        self._stat = None
+        self._digest = None
+        self._checked_at = None
+        self.file_reads = 0
+        self.reloads = 0
+        self.publishes = 0
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _install(self, products, stat, digest):
+        self._products = products
+        self._by_id = {str(p.get('product_id')): p for p in products}
+        self._derived = {}
+        self._stat = stat
+        self._digest = digest
+        self._version += 1
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            stat = self._file_stat()
+            if stat is None or stat == self._stat:
+                return
+            try:
+                with open(self.path, 'rb') as f:
+                    raw = f.read()
+                self.file_reads += 1
+                digest = hashlib.sha1(raw).hexdigest()
+                if digest == self._digest:
+                    self._stat = stat
+                    return
+                products = json.loads(raw.decode('utf-8'))
+            except Exception as e:
+                # Keep serving the last good version (the file may be half written)
+                print(f"Product catalog: failed to load {self.path}: {e}")
+                return
+            self._install(products, stat, digest)
+            self.reloads += 1
+            print(f"Product catalog: loaded {len(products)} products (version {self._version})")
+
+    def reload(self):
+        """Check the file now, ignoring check_interval"""
+        self._refresh(force=True)
+
+    def publish(self, products):
+        """Install a new product list and write it to products.json"""
+        raw = json.dumps(products, ensure_ascii=False, indent=4).encode('utf-8')
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp_path, self.path)
+            self._install(products, self._file_stat(), hashlib.sha1(raw).hexdigest())
+            self._checked_at = time.monotonic()
+            self.publishes += 1
+            return self._version
+
+    def get_products(self):
+        """All products in shelf order (shared list, do not modify)"""
+        self._refresh()
+        return self._products
+
+    def get_by_position(self, position):
+        """Product at a shelf position, None when out of range"""
+        products = self.get_products()
+        if 0 <= position < len(products):
+            return products[position]
+        return None
+
+    def get_by_id(self, product_id):
+        """Product with this product_id, None when unknown"""
+        self._refresh()
+        return self._by_id.get(str(product_id))
+
+    def get_lookup(self):
+        """{product_id: product} of the current version (shared dict, do not modify)"""
+        self._refresh()
+        return self._by_id
+
+    def get_version(self):
+        self._refresh()
+        return self._version
+
+    def derived(self, key, build):
+        """build(products) computed once per catalog version and cached under key"""
+        self._refresh()
+        with self._lock:
+            version = self._version
+            entry = self._derived.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            products = self._products
+        value = build(products)
+        with self._lock:
+            if self._version == version:
+                self._derived[key] = (version, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self._version,
+                'products': len(self._products),
+                'file_reads': self.file_reads,
+                'reloads': self.reloads,
+                'publishes': self.publishes,
+                'check_interval': self.check_interval,
+            }
+
+
+# Global catalog shared by the BLE, cart, route and cloud sync code
+product_catalog = ProductCatalog(
+    product_path,
+    check_interval=float(os.getenv("PRODUCT_CATALOG_CHECK_MS", "1000")) / 1000
+)
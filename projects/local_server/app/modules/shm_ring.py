@@ -0,0 +1,111 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Shared Memory Ring - fixed-size numpy slots in multiprocessing.shared_memory, one writer, many readers
+
+Layout: [latest seq][slot seq x slots][slot timestamp x slots][slot row count x slots][data slots ...]
+A slot's seq is set to -1 while it is written, readers re-check it after copying (seqlock), so a
+reader never returns a half written slot.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_HEADER_ALIGN = 64
+
+
+class SharedRingBuffer:
+    """Ring of `slots` arrays of the same shape/dtype; rows after `count` are ignored on read"""
+
+    def __init__(self, shape, dtype=np.uint8, slots=4, name=None, create=True):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = int(slots)
+        header_bytes = 8 * (1 + 3 * self.slots)
+        self._data_offset = (header_bytes + _HEADER_ALIGN - 1) // _HEADER_ALIGN * _HEADER_ALIGN
+        slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        size = self._data_offset + slot_bytes * self.slots
+
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            # Children started by multiprocessing share the creator's resource tracker,
+            # so attaching doesn't leave anything behind to clean up
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = create
+
+        buf = self.shm.buf
+        self._latest = np.ndarray((1,), np.int64, buf, 0)
+        self._seqs = np.ndarray((self.slots,), np.int64, buf, 8)
+        self._timestamps = np.ndarray((self.slots,), np.float64, buf, 8 * (1 + self.slots))
+        self._counts = np.ndarray((self.slots,), np.int64, buf, 8 * (1 + 2 * self.slots))
+        self._data = np.ndarray((self.slots,) + self.shape, self.dtype, buf, self._data_offset)
+        if create:
+            self._latest[0] = 0
+            self._seqs[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def latest_seq(self):
+        return int(self._latest[0])
+
+    def spec(self):
+        """Arguments another process needs to attach: SharedRingBuffer(**spec, create=False)"""
+        return {'shape': self.shape, 'dtype': self.dtype.str, 'slots': self.slots, 'name': self.name}
+
+    def write(self, array, timestamp=0.0):
+        """Copy array into the next slot (up to shape[0] rows for smaller arrays), returns its seq"""
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        count = min(len(array), self.shape[0])
+        self._seqs[slot] = -1
+        if array.shape == self.shape:
+            self._data[slot] = array
+        else:
+            self._data[slot, :count] = array[:count]
+        self._timestamps[slot] = timestamp
+        self._counts[slot] = count
+        self._seqs[slot] = seq
+        self._latest[0] = seq
+        return seq
+
+    def read(self, seq=None):
+        """
+        Copy out (seq, array, timestamp) of the given seq, the newest one when seq is None.
+        Returns None if nothing was written yet or the slot was already overwritten.
+        """
+        seq = self.latest_seq if seq is None else seq
+        if seq <= 0:
+            return None
+        slot = seq % self.slots
+        if self._seqs[slot] != seq:
+            return None
+        count = int(self._counts[slot])
+        array = self._data[slot, :count].copy()
+        timestamp = float(self._timestamps[slot])
+        if self._seqs[slot] != seq:
+            return None
+        return seq, array, timestamp
+
+    def close(self):
+        """Detach; the creating process also frees the shared memory"""
+        self._latest = self._seqs = self._timestamps = self._counts = self._data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,167 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Snapshot Store - in-memory customer snapshots, JPEG encoded on a worker thread
+
+capture() only keeps the frame and queues the encoding, so the tracking loop never waits on
+cv2.imencode/imwrite. The frame with the customer box is drawn and encoded lazily, the first
+time an order needs it. With persistence on, the JPEGs are also written behind to
+app/static/img/customer_frame (Customer.jpg, frame.jpg, frame_box.jpg).
+"""
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+customer_frame_dir = os.path.abspath(os.path.join(__file__, "../../..", "app/static/img/customer_frame"))
+
+PERSIST_FILE_NAMES = {'crop': "Customer.jpg", 'frame': "frame.jpg", 'box': "frame_box.jpg"}
+
+
+class CustomerSnapshot:
+    """Frame of a customer's first appearance in the ROI, with JPEGs encoded on demand and cached"""
+
+    def __init__(self, session_id, frame, box, customer_id, jpeg_quality=90):
+        self.session_id = session_id
+        self.frame = frame
+        self.box = tuple(int(v) for v in box)
+        self.customer_id = customer_id
+        self.jpeg_quality = jpeg_quality
+        self.created_at = time.time()
+        self.order_codes = []
+        self._jpegs = {}
+        self._lock = threading.Lock()
+
+    def _render(self, kind):
+        frame_h, frame_w = self.frame.shape[:2]
+        x1, y1, x2, y2 = self.box
+        if kind == 'frame':
+            return self.frame
+        if kind == 'crop':
+            return self.frame[max(0, y1):min(frame_h, y2), max(0, x1):min(frame_w, x2)]
+        if kind == 'box':
+            image = self.frame.copy()
+            label = str("Customer " + str(self.customer_id))
+            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            return image
+        raise ValueError(f"Unknown snapshot kind '{kind}'")
+
+    def get_jpeg(self, kind='box'):
+        """JPEG bytes of 'frame', 'crop' (customer only) or 'box' (frame with the customer box)"""
+        with self._lock:
+            data = self._jpegs.get(kind)
+            if data is None:
+                image = self._render(kind)
+                if image.size == 0:
+                    return None
+                ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if not ok:
+                    return None
+                data = buffer.tobytes()
+                self._jpegs[kind] = data
+            return data
+
+
+class SnapshotStore:
+    """Keeps the last max_sessions snapshots keyed by session id; orders attach to a session"""
+
+    def __init__(self, persist_dir=None, max_sessions=8, jpeg_quality=90):
+        self.persist_dir = persist_dir
+        self.max_sessions = max_sessions
+        self.jpeg_quality = jpeg_quality
+        self._snapshots = OrderedDict()
+        self._orders = {}
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._worker = None
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._worker.start()
+
+    def _worker_loop(self):
+        while True:
+            snapshot, kinds = self._jobs.get()
+            for kind in kinds:
+                try:
+                    data = snapshot.get_jpeg(kind)
+                    if data is not None and self.persist_dir:
+                        with open(os.path.join(self.persist_dir, PERSIST_FILE_NAMES[kind]), "wb") as f:
+                            f.write(data)
+                except Exception as e:
+                    print(f"Snapshot {snapshot.session_id} {kind} failed: {e}")
+            self._jobs.task_done()
+
+    def capture(self, frame, box, customer_id, session_id=None):
+        """Store a customer snapshot (frame is kept, not copied) and encode it in the background"""
+        session_id = session_id or f"customer-{customer_id}-{int(time.time() * 1000)}"
+        snapshot = CustomerSnapshot(session_id, frame, box, customer_id, self.jpeg_quality)
+        with self._lock:
+            self._snapshots[session_id] = snapshot
+            while len(self._snapshots) > self.max_sessions:
+                _, old = self._snapshots.popitem(last=False)
+                for order_code in old.order_codes:
+                    self._orders.pop(order_code, None)
+        self._ensure_worker()
+        self._jobs.put((snapshot, ('crop', 'frame')))
+        return session_id
+
+    def get(self, session_id=None):
+        """Snapshot of a session, the latest one when session_id is None"""
+        with self._lock:
+            if session_id is not None:
+                return self._snapshots.get(session_id)
+            return next(reversed(self._snapshots.values()), None)
+
+    def attach_order(self, order_code, session_id=None):
+        """Bind an order to a session (the latest one by default), returns the snapshot or None"""
+        with self._lock:
+            snapshot = self._orders.get(order_code)
+            if snapshot is None:
+                if session_id is not None:
+                    snapshot = self._snapshots.get(session_id)
+                else:
+                    snapshot = next(reversed(self._snapshots.values()), None)
+                if snapshot is None:
+                    return None
+                self._orders[order_code] = snapshot
+                snapshot.order_codes.append(order_code)
+            return snapshot
+
+    def get_order_image(self, order_code, session_id=None):
+        """JPEG with the customer box for an order; the overlay is drawn here, on first use"""
+        snapshot = self.attach_order(order_code, session_id)
+        if snapshot is None:
+            return None
+        data = snapshot.get_jpeg('box')
+        if data is not None and self.persist_dir:
+            self._ensure_worker()
+            self._jobs.put((snapshot, ('box',)))
+        return data
+
+
+# Global store used by the tracking loop and the payment routes
+snapshot_store = SnapshotStore(
+    persist_dir=customer_frame_dir if os.getenv("SNAPSHOT_PERSIST", "true").lower() == "true" else None
+)
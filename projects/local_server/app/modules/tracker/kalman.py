@@ -0,0 +1,115 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Batched Kalman filter - the SORT constant velocity box model for every track at once
+
+State per track is [x, y, s, r, vx, vy, vs] (centre, area, aspect ratio and their velocities),
+measurements are [x, y, s, r]. The matrices are the ones KalmanBoxTracker sets on its
+filterpy.KalmanFilter, so both give the same estimates.
+"""
+import numpy as np
+
+DIM_X = 7
+DIM_Z = 4
+
+
+def boxes_to_z(boxes):
+    """[[x1, y1, x2, y2, ...], ...] -> [[x, y, s, r], ...]"""
+    boxes = np.asarray(boxes, dtype=np.float64)
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.column_stack((boxes[:, 0] + w / 2., boxes[:, 1] + h / 2., w * h, w / h))
+
+
+def x_to_boxes(x):
+    """[[x, y, s, r, ...], ...] -> [[x1, y1, x2, y2], ...]"""
+    w = np.sqrt(x[:, 2] * x[:, 3])
+    h = x[:, 2] / w
+    return np.column_stack((x[:, 0] - w / 2., x[:, 1] - h / 2., x[:, 0] + w / 2., x[:, 1] + h / 2.))
+
+
+class BatchedKalmanBoxFilter:
+    """Stacked states (N, 7) and covariances (N, 7, 7); predict and update are single numpy operations"""
+
+    F = np.array([[1, 0, 0, 0, 1, 0, 0],
+                  [0, 1, 0, 0, 0, 1, 0],
+                  [0, 0, 1, 0, 0, 0, 1],
+                  [0, 0, 0, 1, 0, 0, 0],
+                  [0, 0, 0, 0, 1, 0, 0],
+                  [0, 0, 0, 0, 0, 1, 0],
+                  [0, 0, 0, 0, 0, 0, 1]], dtype=np.float64)
+    Q = np.diag([1., 1., 1., 1., 0.01, 0.01, 0.0001])
+    R = np.diag([1., 1., 10., 10.])
+    # High uncertainty on the unobservable initial velocities
+    P0 = np.diag([10., 10., 10., 10., 10000., 10000., 10000.])
+
+    def __init__(self):
+        self.x = np.empty((0, DIM_X))
+        self.P = np.empty((0, DIM_X, DIM_X))
+        self._eye = np.eye(DIM_X)
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, z):
+        """Start new tracks from measurements z (M, 4), returns their row indices"""
+        count = len(z)
+        x = np.zeros((count, DIM_X))
+        x[:, :DIM_Z] = z
+        start = len(self.x)
+        self.x = np.concatenate((self.x, x))
+        self.P = np.concatenate((self.P, np.broadcast_to(self.P0, (count, DIM_X, DIM_X))))
+        return np.arange(start, start + count)
+
+    def predict(self):
+        """Advance every track by one frame"""
+        if len(self.x) == 0:
+            return
+        # Area must not go negative
+        self.x[(self.x[:, 6] + self.x[:, 2]) <= 0, 6] = 0.
+        self.x = self.x @ self.F.T
+        self.P = self.F @ self.P @ self.F.T + self.Q
+
+    def update(self, rows, z):
+        """Correct the given rows with their measurements z (M, 4)"""
+        if len(rows) == 0:
+            return
+        x = self.x[rows]
+        P = self.P[rows]
+        # H only selects the first 4 state entries, so H P H' and P H' are plain slices
+        y = z - x[:, :DIM_Z]
+        S = P[:, :DIM_Z, :DIM_Z] + self.R
+        K = P[:, :, :DIM_Z] @ np.linalg.inv(S)
+        x = x + (K @ y[:, :, None])[:, :, 0]
+        # Joseph form, same as filterpy
+        I_KH = np.broadcast_to(self._eye, P.shape).copy()
+        I_KH[:, :, :DIM_Z] -= K
+        P = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ self.R @ K.transpose(0, 2, 1)
+        self.x[rows] = x
+        self.P[rows] = P
+
+    def keep(self, mask):
+        """Drop the rows where mask is False"""
+        self.x = self.x[mask]
+        self.P = self.P[mask]
+
+    def boxes(self):
+        """Current [x1, y1, x2, y2] estimate of every track"""
+        return x_to_boxes(self.x)
+
+    def position_uncertainty(self):
+        """Standard deviation (pixels) of every predicted box centre"""
+        return np.sqrt(self.P[:, 0, 0] + self.P[:, 1, 1])
@@ -0,0 +1,55 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Detection Scheduler - decide per frame between running the detector and Kalman predict-only tracking
+"""
+
+
+class DetectionScheduler:
+    """
+    Run the detector every `interval` frames and let Sort.predict() carry tracks in between.
+    Detection is pulled in early when tracking confidence drops:
+      - no track is alive (nothing to predict, a new customer must be picked up quickly)
+      - a live track's last detection score is below min_score
+      - a live track's predicted centre is more uncertain than max_uncertainty pixels
+    """
+
+    def __init__(self, interval=1, min_score=0.6, max_uncertainty=10.0):
+        self.interval = max(1, int(interval))
+        self.min_score = min_score
+        self.max_uncertainty = max_uncertainty
+        self.reset()
+
+    def reset(self):
+        """Run the detector on the next frame"""
+        self._frames_since_detection = self.interval
+
+    def _confidence_dropped(self, tracker):
+        live_tracks = [trk for trk in tracker.trackers if trk.time_since_update < 1]
+        if not live_tracks:
+            return True
+        for trk in live_tracks:
+            if trk.score < self.min_score or trk.position_uncertainty() > self.max_uncertainty:
+                return True
+        return False
+
+    def should_detect(self, tracker):
+        """Return True if the detector should run on this frame, given the current Sort tracker"""
+        self._frames_since_detection += 1
+        if self.interval == 1 or self._frames_since_detection >= self.interval or self._confidence_dropped(tracker):
+            self._frames_since_detection = 0
+            return True
+        return False
@@ -17,31 +17,56 @@
 """
 from __future__ import print_function
 
-import os
 import numpy as np
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from skimage import io
 
-import glob
-import time
-import argparse
-from filterpy.kalman import KalmanFilter
+from app.modules.tracker.kalman import BatchedKalmanBoxFilter, boxes_to_z, x_to_boxes
 
-np.random.seed(0)
 
+_linear_solver = None
 
-def linear_assignment(cost_matrix):
+
+def _load_linear_solver():
+  """
+  Picks the assignment solver once: lap if installed, scipy otherwise.
+  """
   try:
     import lap
-    _, x, y = lap.lapjv(cost_matrix, extend_cost=True)
-    return np.array([[y[i],i] for i in x if i >= 0]) #
+    def solve(cost_matrix):
+      _, x, y = lap.lapjv(cost_matrix, extend_cost=True)
+      cols = x[x >= 0]
+      return np.stack((y[cols], cols), axis=1)
   except ImportError:
     from scipy.optimize import linear_sum_assignment
-    x, y = linear_sum_assignment(cost_matrix)
-    return np.array(list(zip(x, y)))
+    def solve(cost_matrix):
+      x, y = linear_sum_assignment(cost_matrix)
+      return np.stack((x, y), axis=1)
+  return solve
+
+
+def linear_assignment(cost_matrix):
+  global _linear_solver
+  if _linear_solver is None:
+    _linear_solver = _load_linear_solver()
+  return _linear_solver(cost_matrix)
+
+
+def greedy_assignment(iou_matrix, iou_threshold):
+  """
+  Matches the highest IoU pairs first; close to the Hungarian result in crowds at a fraction of the cost.
+  """
+  rows, cols = np.nonzero(iou_matrix >= iou_threshold)
+  if len(rows) == 0:
+    return np.empty((0,2),dtype=int)
+  order = np.argsort(-iou_matrix[rows, cols], kind='stable')
+  used_rows = set()
+  used_cols = set()
+  matches = []
+  for r, c in zip(rows[order], cols[order]):
+    if r not in used_rows and c not in used_cols:
+      used_rows.add(r)
+      used_cols.add(c)
+      matches.append((r, c))
+  return np.array(matches, dtype=int)
 
 
 def iou_batch(bb_test, bb_gt):
@@ -100,6 +125,8 @@ class KalmanBoxTracker(object):
     """
     Initialises a tracker using initial bounding box.
     """
+    # filterpy pulls in scipy, only import it when a per-object filter is actually used
+    from filterpy.kalman import KalmanFilter
     #define constant velocity model
     self.kf = KalmanFilter(dim_x=7, dim_z=4) 
     self.kf.F = np.array([[1,0,0,0,1,0,0],[0,1,0,0,0,1,0],[0,0,1,0,0,0,1],[0,0,0,1,0,0,0],  [0,0,0,0,1,0,0],[0,0,0,0,0,1,0],[0,0,0,0,0,0,1]])
@@ -151,61 +178,157 @@ class KalmanBoxTracker(object):
     return convert_x_to_bbox(self.kf.x)
 
 
-def associate_detections_to_trackers(detections,trackers,iou_threshold = 0.3):
+def associate_detections_to_trackers(detections,trackers,iou_threshold = 0.3,method = 'hungarian'):
   """
   Assigns detections to tracked object (both represented as bounding boxes)
+  method is 'hungarian' (optimal) or 'greedy' (highest IoU first, for large crowds)
 
   Returns 3 lists of matches, unmatched_detections and unmatched_trackers
   """
   if(len(trackers)==0):
     return np.empty((0,2),dtype=int), np.arange(len(detections)), np.empty((0,5),dtype=int)
+  if(len(detections)==0):
+    return np.empty((0,2),dtype=int), np.empty(0,dtype=int), np.arange(len(trackers))
 
   iou_matrix = iou_batch(detections, trackers)
 
-  if min(iou_matrix.shape) > 0:
+  if iou_matrix.shape[0] == 1:
+    # one detection: the best overlapping track is the optimal assignment
+    matched_indices = np.array([[0, np.argmax(iou_matrix[0])]])
+  elif iou_matrix.shape[1] == 1:
+    matched_indices = np.array([[np.argmax(iou_matrix[:, 0]), 0]])
+  elif iou_matrix.max() < iou_threshold:
+    # nothing can survive the threshold below
+    matched_indices = np.empty((0,2),dtype=int)
+  else:
     a = (iou_matrix > iou_threshold).astype(np.int32)
     if a.sum(1).max() == 1 and a.sum(0).max() == 1:
         matched_indices = np.stack(np.where(a), axis=1)
+    elif method == 'greedy':
+      matched_indices = greedy_assignment(iou_matrix, iou_threshold)
     else:
       matched_indices = linear_assignment(-iou_matrix)
-  else:
-    matched_indices = np.empty(shape=(0,2))
-
-  unmatched_detections = []
-  for d, det in enumerate(detections):
-    if(d not in matched_indices[:,0]):
-      unmatched_detections.append(d)
-  unmatched_trackers = []
-  for t, trk in enumerate(trackers):
-    if(t not in matched_indices[:,1]):
-      unmatched_trackers.append(t)
+  matched_indices = matched_indices.reshape(-1, 2).astype(int)
 
   #filter out matched with low IOU
-  matches = []
-  for m in matched_indices:
-    if(iou_matrix[m[0], m[1]]<iou_threshold):
-      unmatched_detections.append(m[0])
-      unmatched_trackers.append(m[1])
-    else:
-      matches.append(m.reshape(1,2))
-  if(len(matches)==0):
-    matches = np.empty((0,2),dtype=int)
-  else:
-    matches = np.concatenate(matches,axis=0)
+  keep = iou_matrix[matched_indices[:,0], matched_indices[:,1]] >= iou_threshold
+  matches = matched_indices[keep]
+  free_detections = np.ones(len(detections), dtype=bool)
+  free_detections[matched_indices[:,0]] = False
+  free_trackers = np.ones(len(trackers), dtype=bool)
+  free_trackers[matched_indices[:,1]] = False
+  unmatched_detections = np.concatenate((np.flatnonzero(free_detections), matched_indices[~keep,0]))
+  unmatched_trackers = np.concatenate((np.flatnonzero(free_trackers), matched_indices[~keep,1]))
+
+  return matches, unmatched_detections, unmatched_trackers
+
+
+class Track(object):
+  """
+  Lightweight record of one track; the state lives in the owning Sort's stacked arrays.
+  """
+  __slots__ = ('id', 'index', 'owner')
+
+  def __init__(self, id, index, owner):
+    self.id = id
+    self.index = index
+    self.owner = owner
+
+  @property
+  def time_since_update(self):
+    return int(self.owner._time_since_update[self.index])
+
+  @property
+  def hits(self):
+    return int(self.owner._hits[self.index])
+
+  @property
+  def hit_streak(self):
+    return int(self.owner._hit_streak[self.index])
+
+  @property
+  def age(self):
+    return int(self.owner._age[self.index])
+
+  @property
+  def score(self):
+    return float(self.owner._score[self.index])
+
+  def get_state(self):
+    """
+    Returns the current bounding box estimate.
+    """
+    return x_to_boxes(self.owner.kf.x[self.index:self.index+1])
 
-  return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+  def position_uncertainty(self):
+    """
+    Returns the standard deviation (pixels) of the predicted box centre.
+    """
+    P = self.owner.kf.P[self.index]
+    return float(np.sqrt(P[0,0] + P[1,1]))
 
 
 class Sort(object):
-  def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3):
+  def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3, assignment='hungarian'):
     """
     Sets key parameters for SORT
+    assignment - 'hungarian' or 'greedy' (see associate_detections_to_trackers)
     """
     self.max_age = max_age
     self.min_hits = min_hits
     self.iou_threshold = iou_threshold
+    self.assignment = assignment
     self.trackers = []
     self.frame_count = 0
+    # every track's filter state and bookkeeping, row i belongs to self.trackers[i]
+    self.kf = BatchedKalmanBoxFilter()
+    self._ids = np.empty(0, dtype=np.int64)
+    self._time_since_update = np.empty(0, dtype=np.int64)
+    self._hits = np.empty(0, dtype=np.int64)
+    self._hit_streak = np.empty(0, dtype=np.int64)
+    self._age = np.empty(0, dtype=np.int64)
+    self._score = np.empty(0)
+
+  def _add_tracks(self, dets):
+    count = len(dets)
+    rows = self.kf.add(boxes_to_z(dets))
+    ids = np.arange(KalmanBoxTracker.count, KalmanBoxTracker.count + count)
+    KalmanBoxTracker.count += count
+    zeros = np.zeros(count, dtype=np.int64)
+    self._ids = np.concatenate((self._ids, ids))
+    self._time_since_update = np.concatenate((self._time_since_update, zeros))
+    self._hits = np.concatenate((self._hits, zeros))
+    self._hit_streak = np.concatenate((self._hit_streak, zeros))
+    self._age = np.concatenate((self._age, zeros))
+    self._score = np.concatenate((self._score, dets[:, 4] if dets.shape[1] > 4 else np.ones(count)))
+    self.trackers.extend(Track(int(i), int(row), self) for i, row in zip(ids, rows))
+
+  def _keep_tracks(self, mask):
+    self.kf.keep(mask)
+    self._ids = self._ids[mask]
+    self._time_since_update = self._time_since_update[mask]
+    self._hits = self._hits[mask]
+    self._hit_streak = self._hit_streak[mask]
+    self._age = self._age[mask]
+    self._score = self._score[mask]
+    self.trackers = [trk for trk, keep in zip(self.trackers, mask) if keep]
+    for i, trk in enumerate(self.trackers):
+      trk.index = i
+
+  def _drop_invalid_tracks(self):
+    boxes = self.kf.boxes()
+    valid = ~np.any(np.isnan(boxes), axis=1)
+    if not valid.all():
+      self._keep_tracks(valid)
+      boxes = boxes[valid]
+    return boxes
+
+  def _confirmed_tracks(self):
+    mask = (self._time_since_update < 1) & ((self._hit_streak >= self.min_hits) | (self.frame_count <= self.min_hits))
+    if not mask.any():
+      return np.empty((0,5))
+    ret = np.column_stack((self.kf.boxes()[mask], self._ids[mask] + 1)) # +1 as MOT benchmark requires positive
+    return ret[::-1]
 
   def update(self, dets=np.empty((0, 5))):
     """
@@ -218,113 +341,45 @@ class Sort(object):
     """
     self.frame_count += 1
     # get predicted locations from existing trackers.
-    trks = np.zeros((len(self.trackers), 5))
-    to_del = []
-    ret = []
-    for t, trk in enumerate(trks):
-      pos = self.trackers[t].predict()[0]
-      trk[:] = [pos[0], pos[1], pos[2], pos[3], 0]
-      if np.any(np.isnan(pos)):
-        to_del.append(t)
-    trks = np.ma.compress_rows(np.ma.masked_invalid(trks))
-    for t in reversed(to_del):
-      self.trackers.pop(t)
-    matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets,trks, self.iou_threshold)
+    self.kf.predict()
+    self._age += 1
+    self._hit_streak[self._time_since_update > 0] = 0
+    self._time_since_update += 1
+    trks = self._drop_invalid_tracks()
+    matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets,trks, self.iou_threshold, self.assignment)
 
     # update matched trackers with assigned detections
-    for m in matched:
-      self.trackers[m[1]].update(dets[m[0], :])
+    if len(matched) > 0:
+      rows = matched[:, 1]
+      matched_dets = dets[matched[:, 0]]
+      self.kf.update(rows, boxes_to_z(matched_dets))
+      self._time_since_update[rows] = 0
+      self._hits[rows] += 1
+      self._hit_streak[rows] += 1
+      if dets.shape[1] > 4:
+        self._score[rows] = matched_dets[:, 4]
 
     # create and initialise new trackers for unmatched detections
-    for i in unmatched_dets:
-        trk = KalmanBoxTracker(dets[i,:])
-        self.trackers.append(trk)
-    i = len(self.trackers)
-    for trk in reversed(self.trackers):
-        d = trk.get_state()[0]
-        if (trk.time_since_update < 1) and (trk.hit_streak >= self.min_hits or self.frame_count <= self.min_hits):
-          ret.append(np.concatenate((d,[trk.id+1])).reshape(1,-1)) # +1 as MOT benchmark requires positive
-        i -= 1
-        # remove dead tracklet
-        if(trk.time_since_update > self.max_age):
-          self.trackers.pop(i)
-    if(len(ret)>0):
-      return np.concatenate(ret)
-    return np.empty((0,5))
-
-def parse_args():
-    """Parse input arguments."""
-    parser = argparse.ArgumentParser(description='SORT demo')
-    parser.add_argument('--display', dest='display', help='Display online tracker output (slow) [False]',action='store_true')
-    parser.add_argument("--seq_path", help="Path to detections.", type=str, default='data')
-    parser.add_argument("--phase", help="Subdirectory in seq_path.", type=str, default='train')
-    parser.add_argument("--max_age", 
-                        help="Maximum number of frames to keep alive a track without associated detections.", 
-                        type=int, default=1)
-    parser.add_argument("--min_hits", 
-                        help="Minimum number of associated detections before track is initialised.", 
-                        type=int, default=3)
-    parser.add_argument("--iou_threshold", help="Minimum IOU for match.", type=float, default=0.3)
-    args = parser.parse_args()
-    return args
-
-if __name__ == '__main__':
-  # all train
-  args = parse_args()
-  display = args.display
-  phase = args.phase
-  total_time = 0.0
-  total_frames = 0
-  colours = np.random.rand(32, 3) #used only for display
-  if(display):
-    if not os.path.exists('mot_benchmark'):
-      print('\n\tERROR: mot_benchmark link not found!\n\n    Create a symbolic link to the MOT benchmark\n    (https://motchallenge.net/data/2D_MOT_2015/#download). E.g.:\n\n    $ ln -s /path/to/MOT2015_challenge/2DMOT2015 mot_benchmark\n\n')
-      exit()
-    plt.ion()
-    fig = plt.figure()
-    ax1 = fig.add_subplot(111, aspect='equal')
-
-  if not os.path.exists('output'):
-    os.makedirs('output')
-  pattern = os.path.join(args.seq_path, phase, '*', 'det', 'det.txt')
-  for seq_dets_fn in glob.glob(pattern):
-    mot_tracker = Sort(max_age=args.max_age, 
-                       min_hits=args.min_hits,
-                       iou_threshold=args.iou_threshold) #create instance of the SORT tracker
-    seq_dets = np.loadtxt(seq_dets_fn, delimiter=',')
-    seq = seq_dets_fn[pattern.find('*'):].split(os.path.sep)[0]
-    
-    with open(os.path.join('output', '%s.txt'%(seq)),'w') as out_file:
-      print("Processing %s."%(seq))
-      for frame in range(int(seq_dets[:,0].max())):
-        frame += 1 #detection and frame numbers begin at 1
-        dets = seq_dets[seq_dets[:, 0]==frame, 2:7]
-        dets[:, 2:4] += dets[:, 0:2] #convert to [x1,y1,w,h] to [x1,y1,x2,y2]
-        total_frames += 1
-
-        if(display):
-          fn = os.path.join('mot_benchmark', phase, seq, 'img1', '%06d.jpg'%(frame))
-          im =io.imread(fn)
-          ax1.imshow(im)
-          plt.title(seq + ' Tracked Targets')
-
-        start_time = time.time()
-        trackers = mot_tracker.update(dets)
-        cycle_time = time.time() - start_time
-        total_time += cycle_time
-
-        for d in trackers:
-          print('%d,%d,%.2f,%.2f,%.2f,%.2f,1,-1,-1,-1'%(frame,d[4],d[0],d[1],d[2]-d[0],d[3]-d[1]),file=out_file)
-          if(display):
-            d = d.astype(np.int32)
-            ax1.add_patch(patches.Rectangle((d[0],d[1]),d[2]-d[0],d[3]-d[1],fill=False,lw=3,ec=colours[d[4]%32,:]))
-
-        if(display):
-          fig.canvas.flush_events()
-          plt.draw()
-          ax1.cla()
-
-  print("Total Tracking took: %.3f seconds for %d frames or %.1f FPS" % (total_time, total_frames, total_frames / total_time))
-
-  if(display):
-    print("Note: to get real runtime results run without the option: --display")
+    if len(unmatched_dets) > 0:
+      self._add_tracks(dets[unmatched_dets.astype(int)])
+
+    ret = self._confirmed_tracks()
+    # remove dead tracklet
+    dead = self._time_since_update > self.max_age
+    if dead.any():
+      self._keep_tracks(~dead)
+    return ret
+
+  def predict(self):
+    """
+    Advances every track by one frame without detections (detector skipped on this frame).
+    Returns the same format as update() for the tracks update() would report.
+
+    NOTE: max_age and min_hits keep counting update() calls only, so with the detector run
+    every N frames a track survives roughly N * max_age frames without a match; callers scale
+    them by N (see vision_pipeline.tracker_settings).
+    """
+    self.kf.predict()
+    self._age += 1
+    self._drop_invalid_tracks()
+    return self._confirmed_tracks()
@@ -13,185 +13,124 @@
 * See the License for the specific language governing permissions and
 * limitations under the License.
 '''
-from ultralytics import YOLO
-import cv2
-import numpy as np
 from app.modules import globals
 import time
 import os
 import threading
 from app.utils.sound_utils import play_sound
-from app.modules.tracker.sort import Sort
+from app.modules.camera_config import get_camera_configs
 from app.modules.cloud_sync import post_order_data_to_cloud
+from app.modules.device_commands import PaymentVerified, device_commands
+from app.modules.frame_capture import publish_vision_metrics
+from app.modules.live_view import live_view
+from app.modules.snapshot_store import snapshot_store
+from app.modules.vision_process import VisionProcess
+
+
+def post_unpaid_order(session_id=None):
+    """Post the products taken by the customer who left without paying (session_id: their snapshot)"""
+    order_id = str("HD"+str(int(time.time() * 1000)))
+    shelf_id = os.getenv("SHELF_ID_CLOUD")
+
+    order_details = []
+    total_bill = 0
+
+    for p, qty in zip(globals.get_products_data(), globals.get_taken_quantity()):
+        if qty > 0:
+            total_price = qty * p.get("price", 0)
+            order_details.append({
+                "product_id": p.get("product_id", p.get("_id", "")),
+                "quantity": qty,
+                "price": p.get("price", 0),
+                "total_price": total_price
+            })
+            total_bill += total_price
+
+    order_data = {
+        'status': 'unpaid',
+        'order_code': order_id,
+        'shelf_id': shelf_id,
+        'total_bill': total_bill,
+        'orderDetails': order_details
+    }     
+    post_order_data_to_cloud(order_data, snapshot_store.get_order_image(order_id, session_id))
+
 
 def start_tracking_customer_behavior():
-    customer_id = None  
-    tracker = Sort(max_age=100, iou_threshold=0.10, min_hits = 5)
     customer_frame = None
     sound_file_path_1 = os.path.abspath(os.path.join(__file__, "../../..", "app/static/sounds/camera-connected.mp3"))
     sound_file_path_2 = os.path.abspath(os.path.join(__file__, "../../..", "app/static/sounds/init-model-success.mp3"))
     sound_file_path_3 = os.path.abspath(os.path.join(__file__, "../../..", "app/static/sounds/unpaid_warning.mp3"))
     sound_file_path_4 = os.path.abspath(os.path.join(__file__, "../../..", "app/static/sounds/warning.mp3"))
-    frame_file_path = os.path.abspath(os.path.join(__file__, "../../..", "app/static/img/customer_frame/frame.jpg"))
-    frame_box_file_path = os.path.abspath(os.path.join(__file__, "../../..", "app/static/img/customer_frame/frame_box.jpg"))
-    frame_crop_file_path = os.path.abspath(os.path.join(__file__, "../../..", "app/static/img/customer_frame"))
     
-    roi_x1, roi_y1 = 50, 0
-    roi_x2, roi_y2 = 366, 640
-    ################# PC config #################
-    # model_file_path = os.path.abspath(os.path.join(__file__, "../../..", "app/modules/detector/models/yolo11n-person-416-ver2.pt"))
-    # model = YOLO(model_file_path)
-    # model.overrides['verbose'] = False
-    # cap = cv2.VideoCapture(0)
-    # cap.set(cv2.CAP_PROP_FRAME_WIDTH, 416)
-    # cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 416)
-
-    ################# Jetson nano config #################
-    model_file_path = os.path.abspath(os.path.join(__file__, "../../..", "app/modules/detector/models/yolo11n-person-416-ver2.engine"))
-    model = YOLO(model_file_path)
-    model.overrides['verbose'] = False
-    gst_pipeline = (
-            "nvarguscamerasrc ! "
-            "video/x-raw(memory:NVMM), width=416, height=416, framerate=30/1 ! "
-            "nvvidconv ! "
-            "video/x-raw, format=BGRx ! "
-            "videoconvert ! "
-            "video/x-raw, format=BGR ! appsink"
-        )
-    cap = cv2.VideoCapture(gst_pipeline, cv2.CAP_GSTREAMER)
-    ########################################################
-    if not cap.isOpened():
-        print("Error: Could not open camera.")
-        exit()
-
-    ret, frame = cap.read()
-    if ret:
-        threading.Thread(target=play_sound, args=(sound_file_path_1,)).start()
-        # init the model (load weights)
-        model(frame)
-        threading.Thread(target=play_sound, args=(sound_file_path_2,)).start()
-
-    alert = 0
+    # VISION_CAMERAS: comma separated camera names from database/cameras.json, empty = all cameras
+    camera_names = [name.strip() for name in os.getenv("VISION_CAMERAS", "").split(",") if name.strip()]
+    cameras = get_camera_configs(camera_names)
+    # Detector backend and model come from DETECTOR_BACKEND / DETECTOR_MODEL (see app/modules/detector)
+    # PC: DETECTOR_BACKEND=ultralytics DETECTOR_MODEL=yolo11n-person-416-ver2.pt
+    # CPU-only box: DETECTOR_BACKEND=onnxruntime (or opencv_dnn) DETECTOR_MODEL=yolo11n-person-416-ver2.onnx
+    # Each camera comes from the "source" of its camera config:
+    # Jetson nano: "gstreamer", PC: "v4l2:0", recorded session: "file:<video>" or "images:<dir>"
+    # Capture, detection and tracking run in their own process (VISION_PROCESS=false keeps them in a thread)
+    use_process = os.getenv("VISION_PROCESS", "true").lower() == "true"
+    # With several cameras the worker batches their frames into one detector call
+    vision = VisionProcess(cameras, use_process=use_process).start()
+    # /api/debug/live-view reads frames straight from the vision rings, only while someone watches
+    live_view.attach(vision)
+
+    tracking = None
     while True:
-        if not globals.get_is_tracking():
-            # temporary
-            customer_id = None
-            alert = 0
-            customer_frame = None
-
-            time.sleep(1)
-            continue
-        
-        time.sleep(0.05)  # Add a small delay to reduce CPU usage
-        ret, frame = cap.read()
-        # frame = cv2.resize(frame, (416, 416))
+        is_tracking = globals.get_is_tracking()
+        if is_tracking != tracking:
+            vision.set_tracking(is_tracking)
+            tracking = is_tracking
+            if not is_tracking:
+                # temporary
+                customer_frame = None
+                globals.set_customer_session_id(None)
 
-        if not ret:
-            print("Error: Can't read frame!")
+        event = vision.get_event(timeout=0.2)
+        if event is None:
+            if not vision.is_alive():
+                print("Error: Vision worker exited.")
+                break
             continue
-    
-        results = model(frame)
-
-        person_detected = False  
-        detections = []
-
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                cls = int(box.cls[0].cpu().numpy())
-                conf = float(box.conf[0])
-                if conf > 0.5 and cls == 0:  
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    detections.append([x1, y1, x2, y2, conf])
-
-        # update tracker
-        if len(detections) == 0:
-            detections = np.empty((0, 4))
-
-        tracked_objects = tracker.update(np.array(detections))
-
-        for x1, y1, x2, y2, obj_id in tracked_objects:
-            cx = (x1 + x2) / 2
-            cy = (y1 + y2) / 2
-
-            if customer_id is None:
-                customer_id = int(obj_id)
-                print(f"Assigned customer_id = {customer_id}")
 
-            if int(obj_id) == customer_id:
-                if roi_x1 <= cx <= roi_x2 and roi_y1 <= cy <= roi_y2:
-                    person_detected = True
-                    alert = 0
-                    print(f"[IN ROI] Customer {customer_id}")
-
-                    if customer_frame is None:
-                        customer_frame = frame.copy()
-                        customer_frame_box = frame.copy()
-
-                        label = str("Customer " + str(customer_id))
-                        x1, y1, x2, y2 = map(int, [x1, y1, x2, y2])
-                        cv2.rectangle(customer_frame_box, (x1, y1), (x2, y2), (0, 255, 0), 2)              
-                        cv2.putText(customer_frame_box, label, (x1, y1 - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-                        obj = customer_frame_box[y1:y2, x1:x2]
-                        cv2.imwrite(f"{frame_crop_file_path}/Customer.jpg", obj)
-                        cv2.imwrite(frame_file_path, customer_frame)
-                        cv2.imwrite(frame_box_file_path, customer_frame_box)
-
-                else:
-                    print(f"[OUTSIDE ROI] Customer {customer_id}")
-
-
-        if not person_detected:
-            print("⚠️  Warning: No person detected.")
-            alert += 1
-            if alert == 20:
-                threading.Thread(target=play_sound, args=(sound_file_path_3,)).start()
-            if alert == 60:
-                threading.Thread(target=play_sound, args=(sound_file_path_3,)).start()
-            if alert == 100:
-                threading.Thread(target=play_sound, args=(sound_file_path_4,)).start()
-                globals.set_unpaid_customer_warning(True)
-
-                # post order data with unpaid status
-                order_id = str("HD"+str(int(time.time() * 1000)))
-                shelf_id = os.getenv("SHELF_ID_CLOUD")
-
-                order_details = []
-                total_bill = 0
-
-                for p, qty in zip(globals.get_products_data(), globals.get_taken_quantity()):
-                    if qty > 0:
-                        total_price = qty * p.get("price", 0)
-                        order_details.append({
-                            "product_id": p.get("product_id", p.get("_id", "")),
-                            "quantity": qty,
-                            "price": p.get("price", 0),
-                            "total_price": total_price
-                        })
-                        total_bill += total_price
-
-                order_data = {
-                    'status': 'unpaid',
-                    'order_code': order_id,
-                    'shelf_id': shelf_id,
-                    'total_bill': total_bill,
-                    'orderDetails': order_details
-                }     
-                post_order_data_to_cloud(order_data)
+        if event['type'] == 'metrics':
+            publish_vision_metrics(event['metrics'])
+        elif event['type'] == 'camera_ready':
+            threading.Thread(target=play_sound, args=(sound_file_path_1,)).start()
+        elif event['type'] == 'model_ready':
+            threading.Thread(target=play_sound, args=(sound_file_path_2,)).start()
+        elif event['type'] == 'error':
+            print(f"Error: {event['message']}")
+            break
+        elif event['type'] == 'assigned':
+            print(f"Assigned customer_id = {event['customer_id']} ({event['camera']})")
+        elif event['type'] == 'enter' and customer_frame is None:
+            frame = vision.read_frame(event['seq'], event['camera'])
+            if frame is None:
+                # Overwritten already, the newest frame is a few milliseconds later
+                frame = vision.read_frame(camera=event['camera'])
+            if frame is not None:
+                # Encoded (and written to disk, if enabled) on the snapshot store's worker thread
+                customer_frame = snapshot_store.capture(frame, event['box'], event['customer_id'])
+                # Orders of this customer attach to this snapshot, not to whichever is the latest
+                globals.set_customer_session_id(customer_frame)
+        elif event['type'] == 'warning':
+            threading.Thread(target=play_sound, args=(sound_file_path_3,)).start()
+        elif event['type'] == 'unpaid':
+            threading.Thread(target=play_sound, args=(sound_file_path_4,)).start()
+            globals.set_unpaid_customer_warning(True)
+
+            # post order data with unpaid status
+            post_unpaid_order(customer_frame)
 
-                customer_id = None
-                alert = 0
-                customer_frame = None
+            customer_frame = None
+            globals.set_customer_session_id(None)
   
-                globals.set_is_tracking(False)
-                globals.set_payment_verified(True)
-
-        # cv2.imshow("Detection", frame)
-        
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            globals.set_is_tracking(False)
+            device_commands.post(PaymentVerified())
 
-    cap.release()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    live_view.detach()
+    vision.stop()
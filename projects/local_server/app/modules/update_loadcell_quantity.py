@@ -22,13 +22,24 @@ from datetime import datetime
 
 import numpy as np
 from dotenv import load_dotenv
-from bleak import BleakClient, BleakError
+from app.modules.ble_sim import BLE_SIMULATION
+if BLE_SIMULATION:
+    # Fake loadcells instead of the BGM220 boards
+    from app.modules.ble_sim import BleakClient, BleakError, setup_simulation
+    setup_simulation()
+else:
+    from bleak import BleakClient, BleakError
 import paho.mqtt.client as mqtt
 from app.modules import globals
+from app.modules.loadcell_events import LoadcellEvent, loadcell_events
+from app.modules.cart_model import cart_model
+from app.modules.ble_outbox import BleOutbox
+from app.modules.ble_runtime import ble_runtime
+from app.modules.ble_trace import ble_trace
+from app.modules.device_commands import PaymentVerified, RfidStateChanged, device_commands
 from app.utils.loadcell_ws_utils import emit_connected_status
+from app.utils.loadcell_utils import get_loadcell_analysis
 from app.utils.websocket_utils import emit_loadcell_update
-from app.utils.database_utils import load_products_from_json
-from app.utils.loadcell_utils import update_cart_with_combo_pricing
 from app.utils.file_utils import write_file
 from app.utils.sound_utils import play_sound, speech_text
 
@@ -52,16 +63,26 @@ CHAR_UUID_WRITE_SAVE_QUANTITY = os.getenv("CHAR_UUID_WRITE_SAVE_QUANTITY")
 CHAR_UUID_PRODUCT_NAME = os.getenv("CHAR_UUID_PRODUCT_NAME")
 CHAR_UUID_PRODUCT_PRICE = os.getenv("CHAR_UUID_PRODUCT_PRICE")
 
+# Notifications closer together than this (from either loadcell) are merged into one update
+LOADCELL_COALESCE_WINDOW = float(os.getenv("LOADCELL_COALESCE_MS", "80")) / 1000
+# (loadcell quantity, verified quantity) of the last update sent to the cart/MQTT
+last_emitted_state = None
+
+# Pending writes are flushed in the order the firmware always received them: weight, save quantity, name, price
+LOADCELL_WRITE_ORDER = [CHAR_UUID_WRITE_WEIGHT, CHAR_UUID_WRITE_SAVE_QUANTITY, CHAR_UUID_PRODUCT_NAME, CHAR_UUID_PRODUCT_PRICE]
+# Save quantity is an edge-triggered command: every write is sent, none is coalesced
+LOADCELL_WRITE_COMMANDS = [CHAR_UUID_WRITE_SAVE_QUANTITY]
+
 # Device addresses
 DEVICES = {
     "Loadcell_1": {
         "address": BGM220_LOADCELL_1_ADDRESS,
-        "queue": None
+        "outbox": BleOutbox("Loadcell_1", LOADCELL_WRITE_ORDER, LOADCELL_WRITE_COMMANDS)
     }
     ,
     "Loadcell_2": {
         "address": BGM220_LOADCELL_2_ADDRESS,
-        "queue": None
+        "outbox": BleOutbox("Loadcell_2", LOADCELL_WRITE_ORDER, LOADCELL_WRITE_COMMANDS)
     }
 }
 def send_mqtt_data():
@@ -102,121 +123,140 @@ def send_mqtt_data():
             client.disconnect()
 
 def notification_handler_factory(device_name):
+    stats = ble_runtime.device(device_name)
     def handler(sender, data):
-        # Flag to reload shopping cart page when loadcell data changes
-        globals.set_quantity_change_flag(True)
-        new_data = globals.get_loadcell_quantity_snapshot()
-        if device_name == "Loadcell_1":
-            new_data[:globals.LOADCELL_NUM_1] = list(data)
-            globals.set_loadcell_quantity(new_data)
+        # Runs on the BLE loop: decode and hand off, everything else happens in consume_loadcell_events
+        stats.count('notifications')
+        if ble_trace.active:
+            ble_trace.notify(device_name, LOADCELL_UUID, data)
+        loadcell_events.put(LoadcellEvent(device_name, sender, list(data)))
+    return handler
 
+def handle_loadcell_events(events):
+    """
+    Apply a coalesced batch of loadcell notifications as one state transition: taken quantity, cart,
+    pricing, WebSocket emit and MQTT. Returns False (nothing emitted) when the batch settled on the
+    state that was already emitted.
+    """
+    global last_emitted_state
+    new_data = globals.get_loadcell_quantity_snapshot()
+    for event in events:
+        # Every notification carries all slots of its device, the latest one wins
+        if event.device_name == "Loadcell_1":
+            new_data[:globals.LOADCELL_NUM_1] = event.values[:globals.LOADCELL_NUM_1]
         else:
-            new_data[globals.LOADCELL_NUM_1:globals.LOADCELL_NUM_TOTAL] = list(data)[:globals.LOADCELL_NUM_2]
-            globals.set_loadcell_quantity(new_data)
+            new_data[globals.LOADCELL_NUM_1:globals.LOADCELL_NUM_TOTAL] = event.values[:globals.LOADCELL_NUM_2]
+    globals.set_loadcell_quantity(new_data)
 
-        loadcell_error_indexes = [i + 1 for i, v in enumerate(globals.get_loadcell_quantity_snapshot()) if v == 200 or v == 222]
-        if loadcell_error_indexes:
-            loadcell_error_indexes_str = " và ngăn ".join(map(str, loadcell_error_indexes))
-            text = "Cảnh báo sản phẩm đặt tại ngăn thứ " + loadcell_error_indexes_str + " không đúng. Vui lòng đặt sản phẩm lại đúng vị trí."
-            speech_text(text)
-        # Overite taken quantity when loadcell data changes
-        taken_quantity = np.array(globals.get_verified_quantity()) - np.array(globals.get_loadcell_quantity_snapshot())
-        
-        taken_quantity[taken_quantity < 0] = 0
-        # Update taken quantity in globals - convert to regular int list
-        taken_quantity_list = [int(x) for x in taken_quantity]
-        globals.set_taken_quantity(taken_quantity_list)
-        if np.any(taken_quantity > 0):
-            globals.is_tracking = True
-        else:
-            globals.is_tracking = False
+    state = (tuple(new_data), tuple(globals.get_verified_quantity()))
+    if state == last_emitted_state:
+        return False
+    last_emitted_state = state
+    device_name = "+".join(sorted({event.device_name for event in events}))
+    # Flag to reload shopping cart page when loadcell data changes
+    globals.set_quantity_change_flag(True)
+
+    # Analysed once here for this update; the routes and emits reuse it until the next one
+    loadcell_error_indexes = [i + 1 for i in get_loadcell_analysis().placement_errors]
+    if loadcell_error_indexes:
+        loadcell_error_indexes_str = " và ngăn ".join(map(str, loadcell_error_indexes))
+        text = "Cảnh báo sản phẩm đặt tại ngăn thứ " + loadcell_error_indexes_str + " không đúng. Vui lòng đặt sản phẩm lại đúng vị trí."
+        # Network TTS, never wait for it
+        threading.Thread(target=speech_text, args=(text,), daemon=True).start()
+    # Overite taken quantity when loadcell data changes
+    taken_quantity = np.array(globals.get_verified_quantity()) - np.array(globals.get_loadcell_quantity_snapshot())
+    
+    taken_quantity[taken_quantity < 0] = 0
+    # Update taken quantity in globals - convert to regular int list
+    taken_quantity_list = [int(x) for x in taken_quantity]
+    globals.set_taken_quantity(taken_quantity_list)
+    if np.any(taken_quantity > 0):
+        globals.is_tracking = True
+    else:
+        globals.is_tracking = False
 
-        print(f"[{device_name}] Received from {sender}: {list(data)}")
-        print("Verified Quantity:", globals.get_verified_quantity())
-        print("Current Loadcell Data:", new_data)
-        print("Taken Quantity:", taken_quantity_list)
-        print("Is Tracking:", globals.is_tracking)
+    print(f"[{device_name}] {len(events)} notification(s), last from {events[-1].sender}: {events[-1].values}")
+    print("Verified Quantity:", globals.get_verified_quantity())
+    print("Current Loadcell Data:", new_data)
+    print("Taken Quantity:", taken_quantity_list)
+    print("Is Tracking:", globals.is_tracking)
 
-        # Emit WebSocket update immediately after calculating taken_quantity
+    # Emit WebSocket update immediately after calculating taken_quantity
+    try:
+        # Import socketio_instance dynamically to avoid import timing issues
+        from app.utils.loadcell_ws_utils import get_socketio_instance
+        socketio_instance = get_socketio_instance()
+        if socketio_instance:
+            # Update only the cart lines and combos of the slots that changed
+            changes = cart_model.update(taken_quantity_list)
+            cart_with_combo = cart_model.get_cart()
+            
+            # Log combo application
+            if changes['combos_applied'] or changes['combos_removed']:
+                applied_combos = cart_model.get_applied_combos()
+                print(f"Combo applied! {len(applied_combos)} combo(s) detected:")
+                for combo in applied_combos:
+                    print(f"  - {combo.get('combo_name')}: {combo.get('savings', 0):,.0f}đ saved")
+            
+            # Emit the update with combo-applied cart
+            emit_loadcell_update(socketio_instance, taken_quantity_list, cart_with_combo, changes)
+            print(f"WebSocket emitted: taken_quantity={taken_quantity_list}, cart_items={len(cart_with_combo)}, changed positions={changes['added'] + changes['updated'] + changes['removed']}")
+            
+            # Also update app cart config for API consistency
+            try:
+                from flask import current_app
+                current_app.config['cart'] = [dict(line) for line in cart_with_combo]  # routes edit cart items in place
+            except:
+                pass  # No app context available
+                
+        else:
+            print("SocketIO instance not available for WebSocket emit")
+    except Exception as e:
+        print(f"WebSocket emit error: {e}")
+        # Fallback to original logic
         try:
-            # Import socketio_instance dynamically to avoid import timing issues
             from app.utils.loadcell_ws_utils import get_socketio_instance
             socketio_instance = get_socketio_instance()
             if socketio_instance:
-                # Create cart data based on taken_quantity
                 cart = []
-                products = load_products_from_json()
-                
                 for i, qty in enumerate(taken_quantity_list):
-                    if qty > 0 and i < len(products):
-                        product = products[i]
+                    if qty > 0:
                         cart.append({
                             'position': i,
-                            'quantity': qty,
-                            'product_id': product.get('product_id'),
-                            'product_name': product.get('product_name'),
-                            'price': product.get('price'),
-                            'img_url': product.get('img_url'),
-                            'weight': product.get('weight')
+                            'quantity': qty
                         })
-                
-                # Apply combo pricing to cart
-                cart_with_combo, applied_combos = update_cart_with_combo_pricing(cart)
-                
-                # Log combo application
-                if applied_combos:
-                    print(f"Combo applied! {len(applied_combos)} combo(s) detected:")
-                    for combo in applied_combos:
-                        print(f"  - {combo.get('combo_name')}: {combo.get('savings', 0):,.0f}đ saved")
-                
-                # Emit the update with combo-applied cart
-                emit_loadcell_update(socketio_instance, taken_quantity_list, cart_with_combo)
-                print(f"WebSocket emitted: taken_quantity={taken_quantity_list}, cart_items={len(cart_with_combo)}")
-                
-                # Also update app cart config for API consistency
-                try:
-                    from flask import current_app
-                    current_app.config['cart'] = cart_with_combo
-                except:
-                    pass  # No app context available
-                    
-            else:
-                print("SocketIO instance not available for WebSocket emit")
-        except Exception as e:
-            print(f"WebSocket emit error: {e}")
-            # Fallback to original logic
-            try:
-                from app.utils.loadcell_ws_utils import get_socketio_instance
-                socketio_instance = get_socketio_instance()
-                if socketio_instance:
-                    cart = []
-                    for i, qty in enumerate(taken_quantity_list):
-                        if qty > 0:
-                            cart.append({
-                                'position': i,
-                                'quantity': qty
-                            })
-                    emit_loadcell_update(socketio_instance, taken_quantity_list, cart)
-                    print(f"Fallback WebSocket emitted: taken_quantity={taken_quantity_list}, cart={cart}")
-            except Exception as fallback_e:
-                print(f"Fallback WebSocket emit error: {fallback_e}")
+                emit_loadcell_update(socketio_instance, taken_quantity_list, cart)
+                print(f"Fallback WebSocket emitted: taken_quantity={taken_quantity_list}, cart={cart}")
+        except Exception as fallback_e:
+            print(f"Fallback WebSocket emit error: {fallback_e}")
 
-        # Send mqtt data to broker
+    # Send mqtt data to broker
+    try:
+        mqtt_data = {
+            "id": os.getenv("SHELF_ID"),
+            "values": new_data if isinstance(new_data, list) else [int(x) for x in new_data]
+        }
+        payload = json.dumps(mqtt_data)
+        client.publish(os.getenv("MQTT_LOADCELL_TOPIC"), payload)
+        print(f"Send: {payload}")
+    except Exception as e:
+        print("Stop send mqtt data.")
+        client.disconnect()
+
+
+def consume_loadcell_events():
+    """Consumer stage: coalesce bursts of loadcell events and process each settled state once, off the BLE loop"""
+    while True:
+        events = loadcell_events.get_batch(LOADCELL_COALESCE_WINDOW)
+        changed = False
         try:
-            mqtt_data = {
-                "id": os.getenv("SHELF_ID"),
-                "values": new_data if isinstance(new_data, list) else [int(x) for x in new_data]
-            }
-            payload = json.dumps(mqtt_data)
-            client.publish(os.getenv("MQTT_LOADCELL_TOPIC"), payload)
-            print(f"Send: {payload}")
+            changed = handle_loadcell_events(events)
         except Exception as e:
-            print("Stop send mqtt data.")
-            client.disconnect()
-
-    return handler
+            print(f"[{events[-1].device_name}] Loadcell event error: {e}")
+        loadcell_events.record_batch(events, changed)
 
-async def connect_and_listen(device_name, address, send_queue):
+async def connect_and_listen(device_name, address, outbox):
+    stats = ble_runtime.device(device_name)
     while True:
         print(f"[{device_name}] Connecting to {address}...")
         await asyncio.sleep(1)
@@ -224,6 +264,7 @@ async def connect_and_listen(device_name, address, send_queue):
             async with BleakClient(address, timeout=30.0) as client:
                 if client.is_connected:
                     print(f"[{device_name}] Connected successfully.")
+                    stats.set_connected(True)
                     if device_name == "Loadcell_1":
                         globals.bgm_220_1_connection = True
                         threading.Thread(target=play_sound, args=(os.path.abspath(os.path.join(__file__, "../../..", "app/static/sounds/connected_loadcell_1.mp3")),)).start()
@@ -236,23 +277,38 @@ async def connect_and_listen(device_name, address, send_queue):
                     except Exception as e:
                         print(f"[WARN] Could not emit loadcell_connected event: {e}")
                     await client.start_notify(LOADCELL_UUID, notification_handler_factory(device_name))
+                    # Flush what is pending (latest value per characteristic), then wait for new writes
                     while client.is_connected:
+                        pending = outbox.next_write()
+                        if pending is None:
+                            await outbox.wait(timeout=10)
+                            continue
+                        char_uuid, data, seq = pending
                         try:
-                            char_uuid, data = await asyncio.wait_for(send_queue.get(), timeout=10)
+                            if ble_trace.active:
+                                ble_trace.write(device_name, char_uuid, data)
                             await client.write_gatt_char(char_uuid, bytearray(data), response=True)
+                            outbox.ack(char_uuid, seq)
+                            stats.count('writes')
                             # print(f"[{device_name}] Sent to {char_uuid}: {data}")
-                        except asyncio.TimeoutError:
-                            pass
                         except Exception as e:
                             print(f"[{device_name}] Write failed: {e}")
-                            await send_queue.put((char_uuid, data))  # Retry
+                            outbox.fail(char_uuid, seq)  # Stays pending for the next connection
+                            stats.count('errors')
                             break
         except asyncio.TimeoutError:
             print(f"[{device_name}] Timeout when connecting to {address}")
         except asyncio.CancelledError:
+            # ble_runtime.stop(): leave the loop, the supervisor marks the device disconnected
             print(f"[{device_name}] Connection to {address} was cancelled")
+            if device_name == "Loadcell_1":
+                globals.bgm_220_1_connection = False
+            elif device_name == "Loadcell_2":
+                globals.bgm_220_2_connection = False
+            raise
         except (BleakError, OSError) as e:
             print(f"[{device_name}] Connection error: {e}")
+            stats.count('errors')
         # finally:
         #     if client and client.is_connected:
         #         try:
@@ -261,139 +317,107 @@ async def connect_and_listen(device_name, address, send_queue):
         #         except Exception as e:
         #             print(f"[{device_name}] Error on disconnect: {e}")
         print(f"[{device_name}] Reconnecting in 5 seconds...")
+        stats.set_connected(False)
         if device_name == "Loadcell_1":
             globals.bgm_220_1_connection = False
         elif device_name == "Loadcell_2":
             globals.bgm_220_2_connection = False
         await asyncio.sleep(5)
 
-async def main():
-    # tasks = []
-    # for name, info in DEVICES.items():
-    #     queue = info["queue"]
-    #     tasks.append(asyncio.create_task(connect_and_listen(name, info["address"], queue)))
-    # await asyncio.gather(*tasks)
-    
-    # fix "Future attached to a different loop" bug
-    loop = asyncio.get_running_loop()  
-    tasks = []
+def start_ble_clients():
+    # Loadcell tasks run on the shared BLE runtime loop; outboxes wake them there
+    loop = ble_runtime.start()
+    ble_trace.start_from_env()
     for name, info in DEVICES.items():
-        queue = info["queue"]
-        tasks.append(loop.create_task(connect_and_listen(name, info["address"], queue)))
-    await asyncio.gather(*tasks)
+        info["outbox"].attach(loop)
+        ble_runtime.add_device(name, connect_and_listen, name, info["address"], info["outbox"])
 
-def start_ble_clients(loop):
-    asyncio.set_event_loop(loop)
-    # Assign the correct queue to the loop
-    for name in DEVICES:
-        DEVICES[name]["queue"] = asyncio.Queue()
-    loop.run_until_complete(main())
-    # fix "Future attached to a different loop" bug
-    loop.close()
+def handle_payment_verified(command):
+    """Payment done: verified quantity = loadcell quantity, then tell both loadcells to save it"""
+    # Overwrite verified quantity with loadcell quantity
+    verified_quantity = globals.get_verified_quantity()
+    loadcell_quantity = globals.get_loadcell_quantity_snapshot()
+    for i, q in enumerate(loadcell_quantity):
+        if q < 200:
+            verified_quantity[i] = q
+    globals.set_verified_quantity(verified_quantity)
+    verified_quantity_data = {
+        "name": "verified_quantity",
+        "values": verified_quantity
+    }
+    if isinstance(verified_quantity_data["values"], np.ndarray):
+        verified_quantity_data["values"] = verified_quantity_data["values"].tolist()
+    loadcell_file_path = os.path.abspath(os.path.join(__file__, "../../..", "database/loadcell.json"))
+    write_file(loadcell_file_path, verified_quantity_data)
 
-# Function to send data to devices based on RFID state
-def send_data_to_devices(loop):
-    while True:
-        time.sleep(1)
-        # Update verified quantity when payment is verified
-        if globals.get_payment_verified():
-            globals.set_payment_verified(False)
-            # Overwrite verified quantity with loadcell quantity
-            verified_quantity = globals.get_verified_quantity()
-            loadcell_quantity = globals.get_loadcell_quantity_snapshot()
-            for i, q in enumerate(loadcell_quantity):
-                if q < 200:
-                    verified_quantity[i] = q
-            globals.set_verified_quantity(verified_quantity)
-            verified_quantity_data = {
-                "name": "verified_quantity",
-                "values": verified_quantity
-            }
-            if isinstance(verified_quantity_data["values"], np.ndarray):
-                verified_quantity_data["values"] = verified_quantity_data["values"].tolist()
-            loadcell_file_path = os.path.abspath(os.path.join(__file__, "../../..", "database/loadcell.json"))
-            write_file(loadcell_file_path, verified_quantity_data)
-            
-            globals.reset_taken_quantity()
-            globals.set_is_tracking(False)
-            # Save verified quantity to loadcel.json
-            data = {
-                "name": "verified_quantity",
-                "values": globals.get_loadcell_quantity_snapshot()
-                }
-            if isinstance(data["values"], np.ndarray):
-                data["values"] = data["values"].tolist()
-            file_path = os.path.abspath(os.path.join(__file__,  "../../..","database/loadcell.json"))
-            with open(file_path, "w") as f:
-                json.dump(data, f, indent=4)    
+    globals.reset_taken_quantity()
+    globals.set_is_tracking(False)
+    # Save verified quantity to loadcel.json
+    data = {
+        "name": "verified_quantity",
+        "values": globals.get_loadcell_quantity_snapshot()
+        }
+    if isinstance(data["values"], np.ndarray):
+        data["values"] = data["values"].tolist()
+    file_path = os.path.abspath(os.path.join(__file__,  "../../..","database/loadcell.json"))
+    with open(file_path, "w") as f:
+        json.dump(data, f, indent=4)    
 
-            for name, dev in DEVICES.items(): 
-                    future = asyncio.run_coroutine_threadsafe(
-                        dev["queue"].put((CHAR_UUID_WRITE_SAVE_QUANTITY, [0])), loop)
-                    try:
-                        future.result(timeout=10)
-                        print(f"[{name}] Queued: {0} to {CHAR_UUID_WRITE_SAVE_QUANTITY}")
-                    except Exception as e:
-                        print(f"[{name}] Failed to queue: {e}")
-        # Update weight of one and verified quantity when employee add products
-        if globals.bool_rfid: # RFID Valid
-            globals.bool_rfid = False
-            if globals.rfid_state == 0: # Added
-                # Overwrite verified quantity with loadcell quantity
-                globals.is_tracking = False
-                for name, dev in DEVICES.items(): 
-                    future = asyncio.run_coroutine_threadsafe(
-                        dev["queue"].put((CHAR_UUID_WRITE_SAVE_QUANTITY, [globals.rfid_state])), loop)
-                    try:
-                        future.result(timeout=10)
-                        print(f"[{name}] Queued: {globals.rfid_state} to {CHAR_UUID_WRITE_SAVE_QUANTITY}")
-                    except Exception as e:
-                        print(f"[{name}] Failed to queue: {e}")
-            else: # Adding
-                globals.set_is_tracking(False)
-                for name, dev in DEVICES.items():
-                    if name == "Loadcell_1":
-                        weight_of_one = globals.weight_of_one[:globals.LOADCELL_NUM_1]
-                        products_name = globals.products_name_decimal[:globals.products_name_char_count]
-                        products_price = globals.products_price[:globals.LOADCELL_NUM_1]
-                    else:
-                        weight_of_one = globals.weight_of_one[globals.LOADCELL_NUM_1:globals.LOADCELL_NUM_TOTAL]
-                        products_name = globals.products_name_decimal[globals.products_name_char_count:]
-                        products_price = globals.products_price[globals.LOADCELL_NUM_1:globals.LOADCELL_NUM_TOTAL]
-                    future = asyncio.run_coroutine_threadsafe(
-                        dev["queue"].put((CHAR_UUID_WRITE_WEIGHT, weight_of_one)), loop)
-                    future2 = asyncio.run_coroutine_threadsafe(
-                        dev["queue"].put((CHAR_UUID_WRITE_SAVE_QUANTITY, [globals.rfid_state])), loop)
-                    future3 = asyncio.run_coroutine_threadsafe(
-                        dev["queue"].put((CHAR_UUID_PRODUCT_NAME, products_name)), loop)
-                    future4 = asyncio.run_coroutine_threadsafe(
-                        dev["queue"].put((CHAR_UUID_PRODUCT_PRICE, products_price)), loop)
+    for name, dev in DEVICES.items(): 
+        dev["outbox"].put(CHAR_UUID_WRITE_SAVE_QUANTITY, [0])
+        print(f"[{name}] Queued: {0} to {CHAR_UUID_WRITE_SAVE_QUANTITY}")
 
-                    try:
-                        future.result(timeout=10)
-                        #print(f"[{name}] Queued weight of one: {weight_of_one} to {CHAR_UUID_WRITE_WEIGHT}")
-                    except Exception as e:
-                        print(f"[{name}] Failed to queue: {e}")
-                    try:
-                        future2.result(timeout=10)
-                        print(f"[{name}] Queued RFID state: {globals.rfid_state} to {CHAR_UUID_WRITE_SAVE_QUANTITY}")
-                    except Exception as e:
-                        print(f"[{name}] Failed to queue RFID: {e}")
-                    try:
-                        future3.result(timeout=10)
-                        #print(f"[{name}] Queued product names: {products_name} to {CHAR_UUID_PRODUCT_NAME}")
-                    except Exception as e:
-                        print(f"[{name}] Failed to queue product names: {e}")
-                    try:
-                        future4.result(timeout=10)
-                        #print(f"[{name}] Queued product prices: {products_price} to {CHAR_UUID_PRODUCT_PRICE}")
-                    except Exception as e:
-                        print(f"[{name}] Failed to queue product prices: {e}")
+def handle_rfid_state_changed(command):
+    """Employee tap: push the catalog when adding, save quantity when added"""
+    if command.rfid_state == 0: # Added
+        # Overwrite verified quantity with loadcell quantity
+        globals.is_tracking = False
+        for name, dev in DEVICES.items(): 
+            dev["outbox"].put(CHAR_UUID_WRITE_SAVE_QUANTITY, [command.rfid_state])
+            print(f"[{name}] Queued: {command.rfid_state} to {CHAR_UUID_WRITE_SAVE_QUANTITY}")
+    else: # Adding
+        globals.set_is_tracking(False)
+        weight_of_one_all = globals.get_products_weight()
+        products_price_all = globals.get_products_price()
+        products_name_decimal_all = globals.get_products_name_decimal()
+        products_name_char_count = globals.get_products_name_char_count()
+        for name, dev in DEVICES.items():
+            if name == "Loadcell_1":
+                weight_of_one = weight_of_one_all[:globals.LOADCELL_NUM_1]
+                products_name = products_name_decimal_all[:products_name_char_count]
+                products_price = products_price_all[:globals.LOADCELL_NUM_1]
+            else:
+                weight_of_one = weight_of_one_all[globals.LOADCELL_NUM_1:globals.LOADCELL_NUM_TOTAL]
+                products_name = products_name_decimal_all[products_name_char_count:]
+                products_price = products_price_all[globals.LOADCELL_NUM_1:globals.LOADCELL_NUM_TOTAL]
+            # Pending values of an earlier tap are replaced, not sent twice
+            outbox = dev["outbox"]
+            outbox.put(CHAR_UUID_WRITE_WEIGHT, weight_of_one)
+            outbox.put(CHAR_UUID_WRITE_SAVE_QUANTITY, [command.rfid_state])
+            outbox.put(CHAR_UUID_PRODUCT_NAME, products_name)
+            outbox.put(CHAR_UUID_PRODUCT_PRICE, products_price)
+            print(f"[{name}] Queued RFID state: {command.rfid_state} to {CHAR_UUID_WRITE_SAVE_QUANTITY}")
+
+DEVICE_COMMAND_HANDLERS = {
+    PaymentVerified: handle_payment_verified,
+    RfidStateChanged: handle_rfid_state_changed,
+}
+
+# Send data to devices when payment or RFID code posts a command
+def send_data_to_devices():
+    while True:
+        command = device_commands.get()
+        try:
+            DEVICE_COMMAND_HANDLERS[type(command)](command)
+        except Exception as e:
+            print(f"Device command {type(command).__name__} failed: {e}")
+        device_commands.record(command)
 
 def start_update_loadcell_quantity():
-    loop = asyncio.new_event_loop()
-    # Start BLE clients in separate thread
-    threading.Thread(target=start_ble_clients, args=(loop,), daemon=True).start()
+    # BLE clients on the shared BLE runtime
+    start_ble_clients()
+    # Cart, pricing, emits and MQTT for every loadcell notification
+    threading.Thread(target=consume_loadcell_events, daemon=True).start()
     threading.Thread(target=send_mqtt_data, daemon=True).start()
-    # Listen rfid to send data to devices
-    send_data_to_devices(loop)
\ No newline at end of file
+    # Payment/RFID commands to the devices
+    send_data_to_devices()
\ No newline at end of file
@@ -0,0 +1,134 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Vision Pipeline - motion gate, detector, SORT tracking and customer ROI/alert logic for one camera
+
+Shared by the live tracking loop and the offline replay benchmark, so both run the exact same code.
+"""
+import math
+import time
+
+import numpy as np
+
+from app.modules.customer_session import CustomerSession
+from app.modules.detector import create_detector
+from app.modules.detector.roi import RoiCroppedDetector
+from app.modules.frame_capture import VisionMetrics
+from app.modules.motion_gate import MotionGate
+from app.modules.tracker.scheduler import DetectionScheduler
+from app.modules.tracker.sort import Sort
+
+# SORT settings for customers walking up to the shelf, in frames with a detector run on every frame
+TRACKER_MAX_AGE = 100
+TRACKER_MIN_HITS = 5
+TRACKER_IOU_THRESHOLD = 0.10
+
+
+def tracker_settings(detect_interval):
+    """
+    (max_age, min_hits) for a detector run every detect_interval frames: Sort counts both in
+    update() calls, so they are divided by the interval to keep track expiry and confirmation
+    at about the same number of frames
+    """
+    interval = max(1, int(detect_interval))
+    return max(1, round(TRACKER_MAX_AGE / interval)), max(1, math.ceil(TRACKER_MIN_HITS / interval))
+
+
+class VisionPipeline:
+    """Process frames one by one; per-stage timings of the last frame are kept in last_timings"""
+
+    def __init__(self, detector, camera, metrics=None):
+        self.camera = camera
+        self.detector = detector
+        self.metrics = metrics if metrics is not None else VisionMetrics()
+        max_age, min_hits = tracker_settings(camera["detect_interval"])
+        self.tracker = Sort(max_age=max_age, iou_threshold=TRACKER_IOU_THRESHOLD, min_hits=min_hits)
+        self.motion_gate = None
+        if camera["motion_gate"]:
+            self.motion_gate = MotionGate(camera["motion_pixel_threshold"], camera["motion_min_area"],
+                                          camera["motion_keepalive_frames"])
+        self.scheduler = DetectionScheduler(camera["detect_interval"], camera["track_min_score"],
+                                            camera["track_max_uncertainty"])
+        self.session = CustomerSession(camera["roi"])
+        self.tracked_objects = np.empty((0, 5))
+        self.last_timings = {}
+
+    def warmup(self, frame):
+        self.detector.warmup(frame)
+
+    def reset(self):
+        """Start a new shopping session (the tracker itself keeps running)"""
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self.scheduler.reset()
+        self.session.reset()
+
+    def process(self, frame, frame_time=None, session_time=None):
+        """
+        Run one frame through the pipeline.
+        frame_time is the time.monotonic() the frame was grabbed, used for the frame age metric.
+        session_time (default frame_time) times the customer's absence from the ROI; a replay passes
+        the recording's time so alerts fire after the same seconds of video, however fast it runs.
+        Returns (tracked_objects, events).
+        """
+        frame_time = time.monotonic() if frame_time is None else frame_time
+        session_time = frame_time if session_time is None else session_time
+        timings = {}
+
+        start = time.perf_counter()
+        static = self.motion_gate is not None and not self.motion_gate.should_infer(frame)
+        if self.motion_gate is not None:
+            timings['motion'] = time.perf_counter() - start
+
+        if static:
+            # Static scene: no model run, the Kalman filters still carry the tracks forward
+            start = time.perf_counter()
+            self.tracked_objects = self.tracker.predict()
+            timings['predict'] = time.perf_counter() - start
+            self.metrics.record_skipped()
+        elif self.scheduler.should_detect(self.tracker):
+            start = time.perf_counter()
+            detections = self.detector.detect(frame)
+            timings['detect'] = time.perf_counter() - start
+            self.metrics.record_inference(frame_time)
+
+            start = time.perf_counter()
+            self.tracked_objects = self.tracker.update(detections)
+            timings['track'] = time.perf_counter() - start
+        else:
+            # Between detector runs the Kalman filters carry the tracks forward
+            start = time.perf_counter()
+            self.tracked_objects = self.tracker.predict()
+            timings['predict'] = time.perf_counter() - start
+            self.metrics.record_predicted()
+
+        start = time.perf_counter()
+        # Alerts follow the clock, so gated and predict-only frames don't make them fire sooner
+        events = self.session.update(self.tracked_objects, session_time)
+        timings['logic'] = time.perf_counter() - start
+
+        self.last_timings = timings
+        return self.tracked_objects, events
+
+
+def create_vision_pipeline(camera, detector=None, metrics=None):
+    """Build the pipeline for a camera config; detector defaults to create_detector() (.env settings)"""
+    detector = detector if detector is not None else create_detector()
+    if camera["roi_crop"]:
+        # Only the customer region (plus margin) goes through the model
+        detector = RoiCroppedDetector(detector, camera["roi"], camera["roi_margin"])
+        print(f"ROI-cropped inference enabled for camera {camera['name']}: {detector}")
+    return VisionPipeline(detector, camera, metrics)
@@ -0,0 +1,326 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Vision Process - camera capture, detection, tracking and customer ROI logic outside the web process
+
+The worker runs one CameraChannel per configured camera (own frame source, ROI, tracker and
+metrics, each in its own thread). With several cameras the channels share one detector through a
+BatchInferenceWorker, which batches their frames into one model call.
+
+Every processed frame and its tracked objects go into that camera's shared memory rings, and small
+event dicts (customer events, metrics, status) come back over a queue. The web process only
+copies what it needs, so inference never holds its GIL.
+
+Messages on the event queue:
+    camera_ready / model_ready / error   worker status
+    metrics                              per-camera metrics and batching stats, about once per second
+    assigned / enter / leave             CustomerSession events, with 'camera' and the 'seq' of the
+                                         frame in that camera's ring
+    warning / unpaid                     ShelfPresence events (customer in no camera's ROI), with the
+                                         'camera' and 'seq' of the frame that raised them
+An 'error' with 'camera' is sent when a camera thread stops on an error.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+
+import numpy as np
+
+from app.modules.shm_ring import SharedRingBuffer
+
+FRAME_SLOTS = 8
+TRACK_SLOTS = 32
+MAX_TRACKS = 64
+METRICS_INTERVAL = 1.0
+
+
+def _attach(ring):
+    """Rings are passed as specs to a child process and as objects to a thread"""
+    if isinstance(ring, dict):
+        return SharedRingBuffer(**ring, create=False), True
+    return ring, False
+
+
+class CameraChannel:
+    """One camera inside the vision worker: frame source, capture thread, pipeline (ROI, tracker) and metrics"""
+
+    def __init__(self, camera, frame_ring, track_ring, presence, log_prefix=""):
+        from app.modules.frame_capture import VisionMetrics
+
+        self.camera = camera
+        self.name = camera["name"]
+        self.frame_ring, self._close_frame_ring = _attach(frame_ring)
+        self.track_ring, self._close_track_ring = _attach(track_ring)
+        self.metrics = VisionMetrics()
+        self.presence = presence
+        self.log_prefix = log_prefix
+        self.source = None
+        self.capture = None
+        self.pipeline = None
+        self.first_frame = None
+
+    def open(self):
+        """Open the frame source and grab a first frame, False if the camera can't be opened"""
+        from app.modules.frame_source import create_frame_source
+
+        camera = self.camera
+        self.source = create_frame_source(camera["source"], camera["frame_size"], camera["fps"], realtime=True, loop=True)
+        if not self.source.isOpened():
+            return False
+        ret, frame = self.source.read()
+        self.first_frame = frame if ret else None
+        return True
+
+    def start(self, detector):
+        """Build the pipeline around detector and start grabbing frames in a separate thread"""
+        from app.modules.frame_capture import FrameCapture
+        from app.modules.vision_pipeline import create_vision_pipeline
+
+        self.pipeline = create_vision_pipeline(self.camera, detector=detector, metrics=self.metrics)
+        # Warning/unpaid come from the presence shared by all cameras
+        self.pipeline.session.alerts = False
+        # The loop below always gets the newest frame
+        self.capture = FrameCapture(self.source, buffer_size=3, metrics=self.metrics).start()
+
+    def run(self, event_queue, tracking_event, stop_event):
+        """Process frames while a shopping session is active, until stop_event; an error event if it fails"""
+        try:
+            self._run(event_queue, tracking_event, stop_event)
+        except Exception as e:
+            print(f"{self.log_prefix}Camera thread error: {e}")
+            event_queue.put({'type': 'error', 'camera': self.name, 'message': f"Camera {self.name} stopped: {e}"})
+        finally:
+            # A stopped camera must not hold back the shared unpaid alert
+            self.presence.remove(self.name)
+
+    def _run(self, event_queue, tracking_event, stop_event):
+        import cv2
+
+        session = self.pipeline.session
+        ring_height, ring_width = self.frame_ring.shape[:2]
+        tracking = False
+        while not stop_event.is_set():
+            if not tracking_event.is_set():
+                tracking = False
+                self.capture.skip_pending()
+                tracking_event.wait(timeout=1.0)
+                continue
+            if not tracking:
+                # New shopping session
+                self.pipeline.reset()
+                self.presence.reset(self.name)
+                tracking = True
+
+            ret, frame, frame_time = self.capture.read(timeout=1.0)
+            if not ret:
+                print(f"{self.log_prefix}Error: Can't read frame!")
+                continue
+
+            tracked_objects, events = self.pipeline.process(frame, frame_time)
+            events += self.presence.update(self.name, session.in_roi, session.customer_id, frame_time)
+            if frame.shape[:2] != (ring_height, ring_width):
+                frame = cv2.resize(frame, (ring_width, ring_height))
+            seq = self.frame_ring.write(frame, frame_time)
+            self.track_ring.write(tracked_objects, frame_time)
+
+            if session.customer_in_roi:
+                print(f"{self.log_prefix}[IN ROI] Customer {session.customer_id}")
+            elif session.customer_in_roi is False:
+                print(f"{self.log_prefix}[OUTSIDE ROI] Customer {session.customer_id}")
+            if not session.in_roi:
+                print(f"{self.log_prefix}⚠️  Warning: No person detected.")
+
+            for event in events:
+                event['camera'] = self.name
+                event['seq'] = seq
+                if 'box' in event:
+                    event['box'] = tuple(float(v) for v in event['box'])
+                event_queue.put(event)
+                if event['type'] == 'unpaid':
+                    # Every camera stays idle until the web process starts the next session
+                    tracking_event.clear()
+
+    def metrics_snapshot(self):
+        snapshot = self.metrics.snapshot()
+        snapshot['queue_depth'] = self.capture.pending() if self.capture is not None else 0
+        return snapshot
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.stop()
+        if self.source is not None:
+            self.source.release()
+        if self._close_frame_ring:
+            self.frame_ring.close()
+        if self._close_track_ring:
+            self.track_ring.close()
+
+
+def run_vision_worker(camera_names, frame_rings, track_rings, event_queue, tracking_event, stop_event):
+    """Worker entry point (child process or thread); rings are dicts keyed by camera name"""
+    # Imported here so the web process never loads OpenCV/detector code for the worker's sake
+    from app.modules.camera_config import get_camera_config
+    from app.modules.customer_session import ShelfPresence
+    from app.modules.detector import create_detector
+    from app.modules.detector.batch import BatchInferenceWorker, BatchedDetector
+
+    channels = []
+    inference = None
+    try:
+        multi_camera = len(camera_names) > 1
+        presence = ShelfPresence(camera_names)
+        for name in camera_names:
+            channels.append(CameraChannel(get_camera_config(name), frame_rings[name], track_rings[name], presence,
+                                          log_prefix=f"[{name}] " if multi_camera else ""))
+
+        for channel in channels:
+            if not channel.open():
+                print(f"Error: Could not open camera {channel.camera['source']}.")
+                event_queue.put({'type': 'error', 'message': f"Could not open camera {channel.camera['source']}"})
+                return
+
+        first_frames = [channel.first_frame for channel in channels if channel.first_frame is not None]
+        if first_frames:
+            event_queue.put({'type': 'camera_ready'})
+        # init the model (load weights)
+        detector = create_detector()
+        if first_frames:
+            detector.warmup(first_frames[0])
+        if multi_camera:
+            # One model call for the frames of all cameras
+            # Cameras are not frame-synchronized: a batch waits up to DETECTOR_BATCH_WAIT_MS for the others
+            inference = BatchInferenceWorker(detector, max_batch=len(channels),
+                                             max_wait=float(os.getenv("DETECTOR_BATCH_WAIT_MS", "10")) / 1000).start()
+        for channel in channels:
+            channel.start(BatchedDetector(inference, channel.name) if inference else detector)
+        event_queue.put({'type': 'model_ready'})
+
+        threads = [threading.Thread(target=channel.run, args=(event_queue, tracking_event, stop_event),
+                                    name=f"camera-{channel.name}", daemon=True) for channel in channels]
+        for thread in threads:
+            thread.start()
+
+        while not stop_event.is_set() and any(thread.is_alive() for thread in threads):
+            event_queue.put({'type': 'metrics', 'metrics': {
+                'cameras': {channel.name: channel.metrics_snapshot() for channel in channels},
+                'inference': inference.stats() if inference else None,
+            }})
+            stop_event.wait(METRICS_INTERVAL)
+        for thread in threads:
+            thread.join(timeout=2)
+    except Exception as e:
+        print(f"Vision worker error: {e}")
+        event_queue.put({'type': 'error', 'message': str(e)})
+        raise
+    finally:
+        if inference is not None:
+            inference.stop()
+        for channel in channels:
+            channel.close()
+
+
+class VisionProcess:
+    """Owns the shared memory rings of every camera and runs run_vision_worker in a child process (or a thread)"""
+
+    def __init__(self, cameras, use_process=True):
+        self.cameras = {camera["name"]: camera for camera in cameras}
+        # Readers that don't name a camera get the first one
+        self.camera = cameras[0]
+        self.use_process = use_process
+        self.frame_rings = {}
+        self.track_rings = {}
+        for camera in cameras:
+            width, height = camera["frame_size"]
+            self.frame_rings[camera["name"]] = SharedRingBuffer((height, width, 3), np.uint8, slots=FRAME_SLOTS)
+            self.track_rings[camera["name"]] = SharedRingBuffer((MAX_TRACKS, 5), np.float64, slots=TRACK_SLOTS)
+        names = list(self.cameras)
+
+        if use_process:
+            # spawn: the child must not inherit the web server's threads, sockets or BLE loops
+            ctx = multiprocessing.get_context('spawn')
+            self.events = ctx.Queue()
+            self.tracking_event = ctx.Event()
+            self.stop_event = ctx.Event()
+            self.worker = ctx.Process(
+                target=run_vision_worker,
+                args=(names, {name: ring.spec() for name, ring in self.frame_rings.items()},
+                      {name: ring.spec() for name, ring in self.track_rings.items()},
+                      self.events, self.tracking_event, self.stop_event),
+                name="vision", daemon=True
+            )
+        else:
+            self.events = queue.Queue()
+            self.tracking_event = threading.Event()
+            self.stop_event = threading.Event()
+            self.worker = threading.Thread(
+                target=run_vision_worker,
+                args=(names, self.frame_rings, self.track_rings, self.events, self.tracking_event, self.stop_event),
+                name="vision", daemon=True
+            )
+
+    def start(self):
+        self.worker.start()
+        print(f"Vision worker started ({'process' if self.use_process else 'thread'}) "
+              f"for camera(s) {', '.join(self.cameras)}")
+        return self
+
+    def stop(self):
+        """Stop the worker and free the shared memory"""
+        self.stop_event.set()
+        self.tracking_event.set()  # wake it up if idle
+        self.worker.join(timeout=5)
+        if self.use_process and self.worker.is_alive():
+            self.worker.terminate()
+            self.worker.join(timeout=1)
+        for ring in list(self.frame_rings.values()) + list(self.track_rings.values()):
+            ring.close()
+        print("Vision worker stopped")
+
+    def is_alive(self):
+        return self.worker.is_alive()
+
+    def set_tracking(self, enabled):
+        """Start or end a shopping session in the worker (all cameras)"""
+        if enabled:
+            self.tracking_event.set()
+        else:
+            self.tracking_event.clear()
+
+    def get_event(self, timeout=None):
+        """Next message from the worker, None after timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def latest_seq(self, camera=None):
+        """Seq of the newest processed frame of a camera, 0 before the first one"""
+        return self.frame_rings[camera or self.camera["name"]].latest_seq
+
+    def read_frame(self, seq=None, camera=None):
+        """Copy of frame seq (newest if None), None if it was already overwritten"""
+        latest = self.frame_rings[camera or self.camera["name"]].read(seq)
+        return None if latest is None else latest[1]
+
+    def latest_tracks(self, camera=None):
+        """(seq, [[x1, y1, x2, y2, id], ...], frame_timestamp) of the newest processed frame, or None"""
+        return self.track_rings[camera or self.camera["name"]].read()
+
+    def read_tracks(self, seq, camera=None):
+        """Tracked objects of frame seq (both rings are written once per frame), None if overwritten"""
+        tracks = self.track_rings[camera or self.camera["name"]].read(seq)
+        return None if tracks is None else tracks[1]
@@ -14,17 +14,27 @@
 * limitations under the License.
 '''
 import asyncio
-from bleak import BleakClient, BleakScanner, BleakError
+from app.modules.ble_sim import BLE_SIMULATION
+if BLE_SIMULATION:
+    # Fake XG26 sensor instead of the board
+    from app.modules.ble_sim import BleakClient, BleakScanner, BleakError, setup_simulation
+    setup_simulation()
+else:
+    from bleak import BleakClient, BleakScanner, BleakError
 import struct
 import os
 from dotenv import load_dotenv
 from app.modules import globals
 from app.utils.sound_utils import play_sound
+from app.modules.ble_runtime import ble_runtime
+from app.modules.ble_trace import ble_trace
 import threading
 from collections import deque
 # Load environment variables
 load_dotenv()
 
+DEVICE_NAME = "XG26_Sensor"
+
 # BLE address of the XG26 sensor device
 XG26_SENSOR_ADDRESS = os.getenv("XG26_SENSOR_ADDRESS")
 
@@ -110,7 +120,11 @@ def imu_processing(x,y,z):
 
 # Create handler to receive IMU notifications
 def create_notify_handler(uuid):
+    stats = ble_runtime.device(DEVICE_NAME)
     def handler(sender, data):
+        stats.count('notifications')
+        if ble_trace.active:
+            ble_trace.notify(DEVICE_NAME, uuid, data)
         if uuid == IMU_UUID and len(data) == 6:
             x, y, z = struct.unpack("<hhh", data)
             if globals.get_imu_data_init() is None:
@@ -121,8 +135,32 @@ def create_notify_handler(uuid):
                 imu_processing(x, y, z)
     return handler
 
+# Decode a polled sensor characteristic into globals
+def apply_sensor_reading(uuid, data):
+    label, fmt, scale, _ = CHAR_MAP[uuid]
+    if len(data) == struct.calcsize(fmt):
+        value = struct.unpack(fmt, data)[0] / scale
+        #print(f"{label}: {round(value, 2)}")
+
+        # Assign to global variable
+        if uuid == CHAR_UUID_PRESSURE:
+            globals.set_pressure(value)
+        elif uuid == CHAR_UUID_TEMPERATURE:
+            globals.set_temperature(value)
+        elif uuid == CHAR_UUID_HUMIDITY:
+            globals.set_humidity(value)
+        elif uuid == CHAR_UUID_LIGHT:
+            globals.set_light(value)
+        elif uuid == CHAR_UUID_SOUND:
+            globals.set_sound(value)
+        elif uuid == CHAR_UUID_MAGNETIC:
+            globals.set_magnetic(value)
+    else:
+        print(f"{label}: Invalid data length.")
+
 # Main BLE connection and reading loop
 async def connect_and_monitor():
+    stats = ble_runtime.device(DEVICE_NAME)
     while True:
         try:
             print("Searching for xg26 sensor device...")
@@ -134,6 +172,7 @@ async def connect_and_monitor():
 
             async with BleakClient(device, disconnected_callback=lambda c: print("Disconnected xg26 sensor device.")) as client:
                 print("Connected to xg26 sensor device.")
+                stats.set_connected(True)
                 sound_file_path = os.path.abspath(os.path.join(__file__, "../../..", "app/static/sounds/connect-sensor.mp3"))
                 threading.Thread(target=play_sound, args=(sound_file_path,)).start()
                 globals.set_imu_data_init(None)  # Reset IMU initial data on new connection
@@ -156,38 +195,29 @@ async def connect_and_monitor():
                         else:
                             try:
                                 data = await client.read_gatt_char(uuid)
-                                if len(data) == struct.calcsize(fmt):
-                                    value = struct.unpack(fmt, data)[0] / scale
-                                    #print(f"{label}: {round(value, 2)}")
-
-                                    # Assign to global variable
-                                    if uuid == CHAR_UUID_PRESSURE:
-                                        globals.set_pressure(value)
-                                    elif uuid == CHAR_UUID_TEMPERATURE:
-                                        globals.set_temperature(value)
-                                    elif uuid == CHAR_UUID_HUMIDITY:
-                                        globals.set_humidity(value)
-                                    elif uuid == CHAR_UUID_LIGHT:
-                                        globals.set_light(value)
-                                    elif uuid == CHAR_UUID_SOUND:
-                                        globals.set_sound(value)
-                                    elif uuid == CHAR_UUID_MAGNETIC:
-                                        globals.set_magnetic(value)
-                                else:
-                                    print(f"{label}: Invalid data length.")
+                                stats.count('reads')
+                                if ble_trace.active:
+                                    ble_trace.read(DEVICE_NAME, uuid, data)
+                                apply_sensor_reading(uuid, data)
                             except Exception as e:
                                 print(f"{label}: Read error - {e}")
+                                stats.count('errors')
                     
                     # Print values for debug
                     # print(f"\n[DEBUG] Pressure: {globals.pressure}, Temp: {globals.temperature}, Humidity: {globals.humidity}")
                     # print(f"[DEBUG] Light: {globals.light}, Sound: {globals.sound}, Magnetic: {globals.magnetic}")
                     # print(f"[DEBUG] IMU: {globals.imu_data}")
                     await asyncio.sleep(5) # Delay between reads
+            stats.set_connected(False)
 
         except (BleakError, OSError) as e:
+            stats.set_connected(False)
+            stats.count('errors')
             print(f"Xg26 sensor connection error: {e}")
             print("Reconnecting xg26 sensor in 10 seconds...")
             await asyncio.sleep(10)
 def start_xg26_sensor():
-    # Start the async event loop
-    asyncio.run(connect_and_monitor())
\ No newline at end of file
+    # Runs as a task on the shared BLE runtime loop, no thread of its own
+    ble_runtime.start()
+    ble_trace.start_from_env()
+    ble_runtime.add_device(DEVICE_NAME, connect_and_monitor)
\ No newline at end of file
@@ -21,7 +21,7 @@ import time
 from flask import Blueprint, request, jsonify, current_app
 
 from app.modules import globals
-from app.utils.loadcell_utils import update_cart_quantities
+from app.utils.loadcell_utils import update_cart_quantities, get_loadcell_analysis
 from app.utils.database_utils import (
     load_products_from_json, 
     load_combos_from_json, 
@@ -38,7 +38,7 @@ import time
 from flask import Blueprint, request, jsonify, current_app
 
 from app.modules import globals
-from app.utils.loadcell_utils import update_cart_quantities
+from app.utils.loadcell_utils import update_cart_quantities, get_loadcell_analysis
 from app.utils.database_utils import (
     load_products_from_json, 
     load_combos_from_json, 
@@ -93,18 +93,13 @@ def api_loadcell_data():
 def api_loadcell_total():
     """Get total number of products currently on shelf from loadcell"""
     try:
-        loadcell_data = globals.get_loadcell_quantity_snapshot()
-        
-        # Calculate total products on shelf (exclude 255 values which indicate no sensor/empty)
-        total_products = 0
-        for value in loadcell_data:
-            if value != 255 and value > 0:  # 255 indicates no sensor, 0 means empty
-                total_products += value
+        analysis = get_loadcell_analysis()
         
+        # Total products on shelf: slots reporting an error code (200/222/255) are not counted
         return jsonify({
             'success': True,
-            'total_products': total_products,
-            'loadcell_data': loadcell_data
+            'total_products': analysis.shelf_total,
+            'loadcell_data': analysis.values
         })
         
     except Exception as e:
@@ -330,7 +325,7 @@ def process_cart():
                     'valid_items_count': len(valid_items),
                     'invalid_items': invalid_items,
                     'total_items': len(cart),
-                    'loadcell_data': list(globals.loadcell_quantity[:5])
+                    'loadcell_data': get_loadcell_analysis().values[:5]
                 },
                 'suggestions': [
                     'Check if loadcell is working',
@@ -340,13 +335,9 @@ def process_cart():
             }), 200  # Return 200 with helpful message instead of 400
         
         # Check for any loadcell errors that might affect checkout
-        error_positions = []
-        warning_positions = []
-        for i, val in enumerate(globals.loadcell_quantity):
-            if val == 255:  # Loadcell error
-                error_positions.append(i)
-            elif val in [200, 222]:  # Placement warnings
-                warning_positions.append(i)
+        analysis = get_loadcell_analysis()
+        error_positions = analysis.loadcell_errors  # Loadcell error (255)
+        warning_positions = analysis.placement_errors  # Placement warnings (200/222)
         
         # Return processed cart data with combo information
         result = {
@@ -432,6 +423,7 @@ def validate_cart():
             'total_value': 0
         }
         
+        analysis = get_loadcell_analysis()
         for idx, item in enumerate(cart):
             qty = item.get('qty', 0)
             price = item.get('product_price', 0)
@@ -447,12 +439,11 @@ def validate_cart():
                 validation_result['valid'] = False
             
             # Check against loadcell data if available
-            if idx < len(globals.loadcell_quantity):
-                loadcell_val = globals.loadcell_quantity[idx]
-                if loadcell_val == 255:
-                    validation_result['warnings'].append(f'Loadcell at position {idx} error - manual check required')
-                elif loadcell_val in [200, 222]:
-                    validation_result['warnings'].append(f'Product at position {idx} not placed correctly')
+            error_status = analysis.error_status(idx)
+            if error_status == "LOADCELL_ERROR":
+                validation_result['warnings'].append(f'Loadcell at position {idx} error - manual check required')
+            elif error_status == "PLACEMENT_ERROR":
+                validation_result['warnings'].append(f'Product at position {idx} not placed correctly')
             
             validation_result['total_value'] += qty * price
         
@@ -477,13 +468,9 @@ def cart_status():
         total_value = sum(item.get('qty', 0) * item.get('product_price', 0) for item in cart)
         
         # Check loadcell status
-        loadcell_errors = []
-        loadcell_warnings = []
-        for i, val in enumerate(globals.loadcell_quantity):
-            if val == 255:
-                loadcell_errors.append(i)
-            elif val in [200, 222]:
-                loadcell_warnings.append(i)
+        analysis = get_loadcell_analysis()
+        loadcell_errors = analysis.loadcell_errors
+        loadcell_warnings = analysis.placement_errors
         
         # Check if cart is ready for checkout
         ready_for_checkout = (
@@ -22,13 +22,22 @@ import requests
 import time
 from datetime import datetime
 
-from flask import Blueprint, jsonify, current_app, request
+from flask import Blueprint, Response, jsonify, current_app, request, stream_with_context
 
 from app.modules import globals
+from app.modules.frame_capture import get_vision_metrics
+from app.modules.live_view import live_view, BOUNDARY
+from app.modules.loadcell_events import loadcell_events
+from app.modules.product_catalog import product_catalog
+from app.modules.cart_model import cart_model
+from app.modules.ble_outbox import get_outbox_stats
+from app.modules.ble_runtime import ble_runtime
+from app.modules.ble_sim import BLE_SIMULATION, sim_adapter
+from app.modules.ble_trace import ble_trace
+from app.modules.device_commands import PaymentVerified, device_commands
 from app.utils.loadcell_utils import (
-    has_real_data, 
-    has_any_data, 
-    get_error_codes_info
+    get_error_codes_info,
+    get_loadcell_analysis
 )
 # from app.webserver import socketio
 from app.utils.websocket_utils import emit_loadcell_update
@@ -55,9 +64,10 @@ def get_loadcell_status():
 def api_debug():
     """Debug endpoint to check current state"""
     cart = get_cart()
+    analysis = get_loadcell_analysis()
     
     debug_info = {
-        'loadcell_quantity': globals.loadcell_quantity,
+        'loadcell_quantity': analysis.values,
         'cart_length': len(cart),
         'cart_with_qty': [],
         'error_codes': get_error_codes_info(),
@@ -69,13 +79,8 @@ def api_debug():
     }
     
     for idx, p in enumerate(cart):
-        loadcell_val = globals.loadcell_quantity[idx] if idx < len(globals.loadcell_quantity) else 'N/A'
-        error_status = ""
-        
-        if loadcell_val == 255:
-            error_status = "LOADCELL_ERROR"
-        elif loadcell_val == 222 or loadcell_val == 200:
-            error_status = "PLACEMENT_ERROR"
+        loadcell_val = analysis.values[idx] if idx < len(analysis.values) else 'N/A'
+        error_status = analysis.error_status(idx)
         
         debug_info['cart_with_qty'].append({
             'index': idx,
@@ -92,19 +97,15 @@ def api_debug():
 def debug_connection_status():
     """Debug endpoint to check detailed connection status"""
     loadcell_connected, loadcell_connection_status = get_loadcell_status()
+    analysis = get_loadcell_analysis()
     
     return jsonify({
         'loadcell_connected': loadcell_connected,
         'loadcell_connection_status': loadcell_connection_status,
-        'current_data': globals.get_loadcell_quantity_snapshot(),
-        'has_real_data': has_real_data(),
-        'has_any_data': has_any_data(),
-        'data_summary': {
-            'total_slots': len(globals.get_loadcell_quantity_snapshot()),
-            'non_zero_slots': sum(1 for val in globals.get_loadcell_quantity_snapshot() if val != 0),
-            'error_slots': sum(1 for val in globals.get_loadcell_quantity_snapshot() if val in [200, 222, 255]),
-            'valid_data_slots': sum(1 for val in globals.get_loadcell_quantity_snapshot() if val > 0 and val not in [200, 222, 255])
-        },
+        'current_data': analysis.values,
+        'has_real_data': analysis.has_real_data,
+        'has_any_data': analysis.has_any_data,
+        'data_summary': analysis.data_summary(),
         'timestamp': time.time()
     })
 
@@ -112,9 +113,10 @@ def debug_connection_status():
 def debug_current_state():
     """Debug endpoint to check current application state"""
     cart = get_cart()
+    analysis = get_loadcell_analysis()
     
     state_info = {
-        'loadcell_quantity': globals.loadcell_quantity,
+        'loadcell_quantity': analysis.values,
         'cart_length': len(cart),
         'cart_with_qty': [
             {
@@ -122,17 +124,92 @@ def debug_current_state():
                 'product_name': p.get('product_name', 'Unknown')[:30],
                 'qty': p.get('qty', 0),
                 'price': p.get('price', 0),
-                'loadcell_val': globals.loadcell_quantity[idx] if idx < len(globals.loadcell_quantity) else 'N/A'
+                'loadcell_val': analysis.values[idx] if idx < len(analysis.values) else 'N/A'
             }
             for idx, p in enumerate(cart[:10])  # First 10 items only
         ],
         'error_codes': get_error_codes_info(),
-        'has_real_data': has_real_data(),
-        'has_any_data': has_any_data()
+        'has_real_data': analysis.has_real_data,
+        'has_any_data': analysis.has_any_data
     }
     
     return jsonify(state_info)
 
+@debug_bp.route('/debug/vision-metrics')
+def debug_vision_metrics():
+    """Debug endpoint to check per-camera capture/inference FPS, frame age, queue depth and batch occupancy"""
+    return jsonify(get_vision_metrics())
+
+@debug_bp.route('/debug/loadcell-events')
+def debug_loadcell_events():
+    """Debug endpoint to check the BLE notification queue: received/processed counts and hand-off delay"""
+    return jsonify(loadcell_events.snapshot())
+
+@debug_bp.route('/debug/product-catalog')
+def debug_product_catalog():
+    """Debug endpoint to check the in-memory product catalog: version, file reads and reloads"""
+    return jsonify(product_catalog.stats())
+
+@debug_bp.route('/debug/cart-model')
+def debug_cart_model():
+    """Debug endpoint to check the incremental cart: updates, changed slots and re-priced combos"""
+    return jsonify(cart_model.stats())
+
+@debug_bp.route('/debug/ble-outbox')
+def debug_ble_outbox():
+    """Debug endpoint to check pending BLE writes per device and writes saved by coalescing"""
+    return jsonify(get_outbox_stats())
+
+@debug_bp.route('/debug/ble-runtime')
+def debug_ble_runtime():
+    """Debug endpoint to check the shared BLE loop (lag) and per-device connects, notifications, reads and writes"""
+    return jsonify(ble_runtime.stats())
+
+@debug_bp.route('/debug/ble-sim')
+def debug_ble_sim():
+    """Debug endpoint to check the simulated BLE peripherals (only with BLE_SIMULATION = "true")"""
+    if not BLE_SIMULATION:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, 'peripherals': sim_adapter.stats()})
+
+@debug_bp.route('/debug/ble-trace', methods=['GET', 'POST'])
+def debug_ble_trace():
+    """Debug endpoint to check the BLE trace recorder; POST {"action": "start", "path": "..."} or {"action": "stop"}"""
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        action = data.get('action')
+        if action == 'start':
+            path = data.get('path') or os.getenv("BLE_TRACE_FILE") or "logs/ble_trace.bin"
+            try:
+                ble_trace.start(path)
+            except (OSError, ValueError) as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+        elif action == 'stop':
+            ble_trace.stop()
+        else:
+            return jsonify({'success': False, 'message': 'action must be start or stop'}), 400
+    return jsonify(ble_trace.stats())
+
+@debug_bp.route('/debug/device-commands')
+def debug_device_commands():
+    """Debug endpoint to check payment/RFID commands to the loadcells and their dispatch latency"""
+    return jsonify(device_commands.snapshot())
+
+@debug_bp.route('/debug/live-view')
+def debug_live_view():
+    """MJPEG stream of a tracking camera with ROI and tracked boxes (?camera=name&fps=N, capped by LIVE_VIEW_MAX_FPS)"""
+    camera = request.args.get('camera')
+    fps = request.args.get('fps', type=float)
+    if fps is not None and not fps > 0:
+        return jsonify({'success': False, 'message': 'fps must be greater than 0'}), 400
+    return Response(stream_with_context(live_view.stream(camera, fps)),
+                    mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+
+@debug_bp.route('/debug/live-view/status')
+def debug_live_view_status():
+    """Number of live view viewers and frames encoded so far"""
+    return jsonify(live_view.status())
+
 @debug_bp.route('/debug/sepay-status')
 def sepay_status():
     """Check SEPAY token status"""
@@ -396,8 +473,8 @@ def trigger_payment_success(order_id):
             'message': f'Payment thành công cho đơn hàng {order_id}!'
         })
         
-        # Set payment verified to True
-        globals.set_payment_verified(True)
+        # Payment verified: loadcells save the new quantities
+        device_commands.post(PaymentVerified())
         globals.set_update_verified_quantity(True)
         
         return jsonify({
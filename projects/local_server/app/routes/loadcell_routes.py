@@ -27,6 +27,7 @@ from app.utils.loadcell_utils import (
     has_any_data, 
     get_error_messages, 
     get_error_codes_info,
+    get_loadcell_analysis,
     has_recent_data_reception
 )
 from app.utils.status_utils import get_status_message
@@ -100,14 +101,11 @@ def api_loadcell_status_detailed():
     """API endpoint to check detailed loadcell connection status matching BGM220 data format"""
     loadcell_connected, loadcell_connection_status = get_loadcell_status()
     
-    # Get thread-safe snapshot of loadcell data
-    loadcell_snapshot = globals.get_loadcell_quantity_snapshot()
-    
-    # Check if we're receiving real data using utility function
-    has_real_data_val = has_real_data()
-    
-    # Check if we have any data (even error codes) using utility function
-    has_any_data_val = has_any_data()
+    # Error codes and valid slots of the current loadcell data (cached per update)
+    analysis = get_loadcell_analysis()
+    loadcell_snapshot = analysis.values
+    has_real_data_val = analysis.has_real_data
+    has_any_data_val = analysis.has_any_data
     
     # Check if we have recent data reception using utility function
     has_recent_reception = has_recent_data_reception()
@@ -117,12 +115,7 @@ def api_loadcell_status_detailed():
     
     return jsonify({
         'current_data': loadcell_snapshot,
-        'data_summary': {
-            'total_slots': len(loadcell_snapshot),
-            'non_zero_slots': sum(1 for val in loadcell_snapshot if val != 0),
-            'error_slots': sum(1 for val in loadcell_snapshot if val in [200, 222, 255]),
-            'valid_data_slots': sum(1 for val in loadcell_snapshot if val > 0 and val not in [200, 222, 255])
-        },
+        'data_summary': analysis.data_summary(),
         'has_any_data': has_any_data_val,
         'has_real_data': has_real_data_val,
         'has_recent_reception': has_recent_reception,
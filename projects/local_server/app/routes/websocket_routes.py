@@ -29,6 +29,8 @@ from app.services.vietqr_payment_service import VietQRPaymentAPI
 from app.utils.database_utils import save_order, save_order_details, load_products_from_json
 from app.utils.websocket_utils import emit_loadcell_update
 from app.modules.cloud_sync import post_order_data_to_cloud
+from app.modules.device_commands import PaymentVerified, device_commands
+from app.modules.snapshot_store import snapshot_store
 from app.utils.sound_utils import speech_text, play_sound
 from app.utils.string_utils import remove_accents
 
@@ -201,6 +203,9 @@ def register_websocket_handlers(socketio, get_cart_func):
     
     def create_payment_monitoring_task(socketio, order_id, total, products, stop_flag, monitoring_type="auto"):
         """Create a payment monitoring task function"""
+        # Snapshot of the customer who placed the order, taken now: a new customer may be at the shelf by the time it is paid
+        session_id = globals.get_customer_session_id()
+
         def payment_monitoring_task():
             print(f'Starting {monitoring_type} payment monitoring for order {order_id}, total {total}')
             
@@ -281,8 +286,8 @@ def register_websocket_handlers(socketio, get_cart_func):
                     }       
                     print(f'{monitoring_type} payment successful! Order {order_id}, transaction: {tx.get("id", "N/A")}')
                     
-                    # Set payment verified to True
-                    globals.set_payment_verified(True)
+                    # Payment verified: loadcells save the new quantities
+                    device_commands.post(PaymentVerified())
                     
                     # Clean up monitoring thread
                     if order_id in payment_monitoring_threads:
@@ -309,7 +314,7 @@ def register_websocket_handlers(socketio, get_cart_func):
                     ### Send order data to cloud ###
                     print(order_data)
                     print("Send order data to cloud")
-                    post_order_data_to_cloud(order_data)
+                    post_order_data_to_cloud(order_data, snapshot_store.get_order_image(order_id, session_id))
                     
                     ### Print bill ###
                     if globals.get_print_bill():
@@ -20,6 +20,8 @@ import os
 import json
 from datetime import datetime
 
+from app.modules.product_catalog import product_catalog
+
 
 def save_order(order_data):
     """Save order data to orders.json"""
@@ -52,13 +54,8 @@ def save_order_details(order_details):
     except Exception as e:
         pass
 def load_products_from_json():
-    """Load products from products.json"""
-    json_path = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'products.json')
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        return []
+    """Products of products.json from the in-memory product catalog (shared list, do not modify)"""
+    return product_catalog.get_products()
 
 
 def load_combos_from_json():
@@ -109,6 +106,142 @@ def load_all_combos_from_json():
         return []
 
 
+def combo_product_ids(combo):
+    """Product ids whose cart quantity decides whether/how a combo applies"""
+    if combo.get('type', 'regular') == 'buy_x_get_y':
+        return [str(combo.get('promotion', {}).get('product_id', ''))]
+    return [str(pid) for pid in combo.get('products', [])]
+
+
+def evaluate_combo(combo, cart_by_product_id, product_lookup):
+    """
+    Price one combo against the cart items (keyed by product_id as str)
+    Returns (combo_info, overrides), overrides being [(product_id, fields)] to apply to the
+    first cart item of that product, or (None, []) when the combo does not apply
+    """
+    combo_type = combo.get('type', 'regular')
+    combo_products = combo.get('products', [])
+    combo_products_set = set(str(pid) for pid in combo_products)
+    
+    # Handle different combo types
+    if combo_type == 'buy_x_get_y':
+        # Handle buy X get Y free promotion
+        promotion = combo.get('promotion', {})
+        buy_quantity = promotion.get('buy_quantity', 2)
+        get_quantity = promotion.get('get_quantity', 1)
+        promo_product_id = str(promotion.get('product_id', ''))
+        
+        # Check if the promotion product is in cart
+        if promo_product_id not in cart_by_product_id:
+            return None, []
+        cart_item = cart_by_product_id[promo_product_id]
+        current_qty = cart_item.get('qty', cart_item.get('quantity', 0))
+        
+        # Calculate how many free items customer gets
+        eligible_sets = current_qty // buy_quantity
+        free_items = eligible_sets * get_quantity
+        if eligible_sets <= 0:
+            return None, []
+        
+        # Calculate pricing
+        product_price = product_lookup[promo_product_id]['price']
+        total_items = current_qty + free_items
+        total_original_price = total_items * product_price
+        discounted_price = current_qty * product_price  # Only pay for bought items
+        total_savings = free_items * product_price
+        
+        combo_info = {
+            'combo_id': combo['id'],
+            'combo_name': combo['name'],
+            'combo_type': 'buy_x_get_y',
+            'buy_quantity': buy_quantity,
+            'get_quantity': get_quantity,
+            'eligible_sets': eligible_sets,
+            'free_items': free_items,
+            'total_items': total_items,
+            'original_total': total_original_price,
+            'discounted_total': discounted_price,
+            'savings': total_savings,
+            'product_ids': [promo_product_id]
+        }
+        
+        # Cart item with promotion details
+        fields = {
+            'original_price': product_price,
+            'original_qty': current_qty,
+            'free_qty': free_items,
+            'total_qty': total_items,
+            'qty': total_items,  # Update displayed quantity
+            'quantity': total_items,
+            'effective_price': discounted_price / total_items if total_items > 0 else 0,
+            'price': discounted_price / total_items if total_items > 0 else 0,
+            'in_combo': combo_info,
+            'promotion_type': 'buy_x_get_y',
+            'savings': total_savings
+        }
+        return combo_info, [(promo_product_id, fields)]
+    
+    if not combo_products_set.issubset(cart_by_product_id.keys()):
+        return None, []
+    
+    # Regular combo pricing
+    # Calculate original price vs combo price
+    original_total = 0
+    for product_id in combo_products:
+        if str(product_id) in product_lookup:
+            original_total += product_lookup[str(product_id)]['price']
+    
+    combo_price = combo['price']
+    savings = original_total - combo_price
+    
+    combo_info = {
+        'combo_id': combo['id'],
+        'combo_name': combo['name'],
+        'combo_type': 'regular',
+        'combo_price': combo_price,
+        'original_price': original_total,
+        'savings': savings,
+        'product_ids': combo_products
+    }
+    
+    # Distribute combo price among products proportionally
+    total_distributed = 0
+    combo_items = []
+    overrides = []
+    
+    for i, product_id in enumerate(combo_products):
+        if str(product_id) in cart_by_product_id:
+            original_item_price = product_lookup[str(product_id)]['price']
+            
+            # Calculate proportional combo price for this item
+            if i == len(combo_products) - 1:
+                # Last item gets remaining amount to avoid rounding errors
+                combo_item_price = combo_price - total_distributed
+            else:
+                proportion = original_item_price / original_total
+                combo_item_price = round(combo_price * proportion)
+                total_distributed += combo_item_price
+            
+            combo_items.append({
+                'product_id': product_id,
+                'original_price': original_item_price,
+                'combo_price': combo_item_price,
+                'savings': original_item_price - combo_item_price
+            })
+            overrides.append((str(product_id), {
+                'original_price': original_item_price,
+                'combo_price': combo_item_price,
+                'price': combo_item_price,  # Use combo price
+                'in_combo': combo_info,
+                'savings': original_item_price - combo_item_price
+            }))
+    
+    # Update combo_info with exact item breakdown
+    combo_info['items'] = combo_items
+    combo_info['total_distributed'] = sum(item['combo_price'] for item in combo_items)
+    return combo_info, overrides
+
+
 def detect_and_apply_combo_pricing(cart_items):
     """
     Detect combo products in cart and apply combo pricing
@@ -119,20 +252,17 @@ def detect_and_apply_combo_pricing(cart_items):
     
     # Load active combos and products
     active_combos = load_combos_from_json()
-    all_products = load_products_from_json()
     
-    # Create product lookup by product_id
-    product_lookup = {p['product_id']: p for p in all_products}
+    # Product lookup by product_id, kept by the catalog
+    product_lookup = product_catalog.get_lookup()
     
     # Track which products are in cart (by product_id)
-    cart_product_ids = set()
     cart_by_product_id = {}
     
     for item in cart_items:
         # Assuming cart items have 'product_id' field
         product_id = item.get('product_id') or item.get('id')  # fallback to 'id' if needed
         if product_id:
-            cart_product_ids.add(str(product_id))
             cart_by_product_id[str(product_id)] = item
     
     applied_combos = []
@@ -140,133 +270,18 @@ def detect_and_apply_combo_pricing(cart_items):
     
     # Check each combo to see if all products are in cart
     for combo in active_combos:
-        combo_type = combo.get('type', 'regular')
-        combo_products = combo.get('products', [])
-        combo_products_set = set(str(pid) for pid in combo_products)
+        combo_info, overrides = evaluate_combo(combo, cart_by_product_id, product_lookup)
+        if combo_info is None:
+            continue
+        applied_combos.append(combo_info)
         
-        # Handle different combo types
-        if combo_type == 'buy_x_get_y':
-            # Handle buy X get Y free promotion
-            promotion = combo.get('promotion', {})
-            buy_quantity = promotion.get('buy_quantity', 2)
-            get_quantity = promotion.get('get_quantity', 1)
-            promo_product_id = str(promotion.get('product_id', ''))
-            
-            # Check if the promotion product is in cart
-            if promo_product_id in cart_by_product_id:
-                cart_item = cart_by_product_id[promo_product_id]
-                current_qty = cart_item.get('qty', cart_item.get('quantity', 0))
-                
-                # Calculate how many free items customer gets
-                eligible_sets = current_qty // buy_quantity
-                free_items = eligible_sets * get_quantity
-                
-                if eligible_sets > 0:
-                    # Calculate pricing
-                    product_price = product_lookup[promo_product_id]['price']
-                    total_items = current_qty + free_items
-                    total_original_price = total_items * product_price
-                    discounted_price = current_qty * product_price  # Only pay for bought items
-                    total_savings = free_items * product_price
-                    
-                    combo_info = {
-                        'combo_id': combo['id'],
-                        'combo_name': combo['name'],
-                        'combo_type': 'buy_x_get_y',
-                        'buy_quantity': buy_quantity,
-                        'get_quantity': get_quantity,
-                        'eligible_sets': eligible_sets,
-                        'free_items': free_items,
-                        'total_items': total_items,
-                        'original_total': total_original_price,
-                        'discounted_total': discounted_price,
-                        'savings': total_savings,
-                        'product_ids': [promo_product_id]
-                    }
-                    applied_combos.append(combo_info)
-                    
-                    # Update cart item with promotion details
-                    for j, item in enumerate(updated_cart):
-                        if (item.get('product_id') == promo_product_id or 
-                            str(item.get('id')) == str(promo_product_id)):
-                            updated_cart[j] = item.copy()
-                            updated_cart[j]['original_price'] = product_price
-                            updated_cart[j]['original_qty'] = current_qty
-                            updated_cart[j]['free_qty'] = free_items
-                            updated_cart[j]['total_qty'] = total_items
-                            updated_cart[j]['qty'] = total_items  # Update displayed quantity
-                            updated_cart[j]['quantity'] = total_items
-                            updated_cart[j]['effective_price'] = discounted_price / total_items if total_items > 0 else 0
-                            updated_cart[j]['price'] = discounted_price / total_items if total_items > 0 else 0
-                            updated_cart[j]['in_combo'] = combo_info
-                            updated_cart[j]['promotion_type'] = 'buy_x_get_y'
-                            updated_cart[j]['savings'] = total_savings
-                            break
-        
-        elif combo_products_set.issubset(cart_product_ids):
-            # Regular combo pricing (existing logic)
-            # Calculate original price vs combo price
-            original_total = 0
-            for product_id in combo_products:
-                if str(product_id) in product_lookup:
-                    original_total += product_lookup[str(product_id)]['price']
-            
-            combo_price = combo['price']
-            savings = original_total - combo_price
-            
-            # Apply combo pricing to cart items
-            combo_info = {
-                'combo_id': combo['id'],
-                'combo_name': combo['name'],
-                'combo_type': 'regular',
-                'combo_price': combo_price,
-                'original_price': original_total,
-                'savings': savings,
-                'product_ids': combo_products
-            }
-            applied_combos.append(combo_info)
-            
-            # Update cart items with combo pricing
-            # Distribute combo price among products proportionally
-            total_distributed = 0
-            combo_items = []
-            
-            for i, product_id in enumerate(combo_products):
-                if str(product_id) in cart_by_product_id:
-                    cart_item = cart_by_product_id[str(product_id)]
-                    original_item_price = product_lookup[str(product_id)]['price']
-                    
-                    # Calculate proportional combo price for this item
-                    if i == len(combo_products) - 1:
-                        # Last item gets remaining amount to avoid rounding errors
-                        combo_item_price = combo_price - total_distributed
-                    else:
-                        proportion = original_item_price / original_total
-                        combo_item_price = round(combo_price * proportion)
-                        total_distributed += combo_item_price
-                    
-                    combo_items.append({
-                        'product_id': product_id,
-                        'original_price': original_item_price,
-                        'combo_price': combo_item_price,
-                        'savings': original_item_price - combo_item_price
-                    })
-                    
-                    # Update the cart item
-                    for j, item in enumerate(updated_cart):
-                        if (item.get('product_id') == product_id or 
-                            str(item.get('id')) == str(product_id)):
-                            updated_cart[j] = item.copy()
-                            updated_cart[j]['original_price'] = original_item_price
-                            updated_cart[j]['combo_price'] = combo_item_price
-                            updated_cart[j]['price'] = combo_item_price  # Use combo price
-                            updated_cart[j]['in_combo'] = combo_info
-                            updated_cart[j]['savings'] = original_item_price - combo_item_price
-                            break
-            
-            # Update combo_info with exact item breakdown
-            combo_info['items'] = combo_items
-            combo_info['total_distributed'] = sum(item['combo_price'] for item in combo_items)
+        # Update the first cart item of each product
+        for product_id, fields in overrides:
+            for j, item in enumerate(updated_cart):
+                if (item.get('product_id') == product_id or 
+                    str(item.get('id')) == str(product_id)):
+                    updated_cart[j] = {**item, **fields}
+                    break
     
     return updated_cart, applied_combos
 
@@ -15,78 +15,116 @@
 '''
 """
 Loadcell utility functions for error code handling and data processing
+
+The error codes (255 loadcell error, 200/222 product not placed correctly), valid slots and
+shelf total are computed once per loadcell update (LoadcellAnalysis, numpy masks over all slots)
+and cached until globals.loadcell_version changes; the helpers below and the routes read it.
 """
+import numpy as np
+
 from app.modules import globals
 
+LOADCELL_ERROR = 255
+PLACEMENT_ERRORS = (200, 222)
+ERROR_CODES = (200, 222, LOADCELL_ERROR)
+
+# code -> (message, type, allow_manual_control)
+ERROR_CODE_INFO = {
+    255: ("Loadcell error at position {}", 'loadcell_error', True),
+    222: ("Product at position {} not placed correctly", 'placement_error', False),
+    200: ("Product at position {} not placed correctly", 'placement_error', False),
+}
+
+
+class LoadcellAnalysis:
+    """Error positions by code, valid slots and shelf total of one loadcell state"""
+
+    def __init__(self, version, values):
+        values = np.asarray(values, dtype=np.int64)
+        error_mask = np.isin(values, ERROR_CODES)
+        valid_mask = (values > 0) & ~error_mask
+        self.version = version
+        self.values = values.tolist()
+        self.positions = {code: np.flatnonzero(values == code).tolist() for code in ERROR_CODES}
+        self.loadcell_errors = self.positions[LOADCELL_ERROR]
+        self.placement_errors = np.flatnonzero(np.isin(values, PLACEMENT_ERRORS)).tolist()
+        self.error_count = int(np.count_nonzero(error_mask))
+        self.valid_count = int(np.count_nonzero(valid_mask))
+        self.non_zero_count = int(np.count_nonzero(values))
+        self.shelf_total = int(values[valid_mask].sum())
+        self.has_real_data = self.valid_count > 0
+        self.has_any_data = self.non_zero_count > 0
+        self.error_codes = []
+        for i in np.flatnonzero(error_mask).tolist():
+            code = self.values[i]
+            message, error_type, allow_manual_control = ERROR_CODE_INFO[code]
+            self.error_codes.append({
+                'position': i,
+                'code': code,
+                'message': message.format(i),
+                'type': error_type,
+                'allow_manual_control': allow_manual_control
+            })
+        self.error_messages = [error['message'] for error in self.error_codes]
+
+    def error_status(self, position):
+        """LOADCELL_ERROR / PLACEMENT_ERROR / "" for a slot"""
+        if position >= len(self.values):
+            return ""
+        value = self.values[position]
+        if value == LOADCELL_ERROR:
+            return "LOADCELL_ERROR"
+        if value in PLACEMENT_ERRORS:
+            return "PLACEMENT_ERROR"
+        return ""
+
+    def data_summary(self):
+        return {
+            'total_slots': len(self.values),
+            'non_zero_slots': self.non_zero_count,
+            'error_slots': self.error_count,
+            'valid_data_slots': self.valid_count
+        }
+
+
+# Analysis of the latest loadcell state, replaced when globals.loadcell_version changes
+_analysis = None
+
+
+def get_loadcell_analysis():
+    """LoadcellAnalysis of the current loadcell quantity, computed at most once per update"""
+    global _analysis
+    analysis = _analysis
+    if analysis is None or analysis.version != globals.get_loadcell_version():
+        version, values = globals.get_loadcell_state()
+        analysis = LoadcellAnalysis(version, values)
+        _analysis = analysis
+    return analysis
+
 
 def check_loadcell_error_codes():
-    """Check for error codes in loadcell_quantity and print appropriate messages"""
-    snapshot = globals.get_loadcell_quantity_snapshot()
-    for i, val in enumerate(snapshot):
-        if val == 255:
-            pass  # Loadcell error at position {i}
-        elif val == 222:
-            pass  # Product at position {i} not placed correctly
-        elif val == 200:
-            pass  # Product at position {i} not placed correctly
+    """Check for error codes in loadcell_quantity, True when any slot reports one"""
+    return get_loadcell_analysis().error_count > 0
 
 
 def get_error_messages():
     """Get list of error messages from current loadcell data"""
-    error_messages = []
-    snapshot = globals.get_loadcell_quantity_snapshot()
-    for i, val in enumerate(snapshot):
-        if val == 255:
-            error_messages.append(f"Loadcell error at position {i}")
-        elif val == 222:
-            error_messages.append(f"Product at position {i} not placed correctly")
-        elif val == 200:
-            error_messages.append(f"Product at position {i} not placed correctly")
-    return error_messages
+    return list(get_loadcell_analysis().error_messages)
 
 
 def get_error_codes_info():
     """Get detailed error codes information"""
-    error_codes = []
-    snapshot = globals.get_loadcell_quantity_snapshot()
-    for i, val in enumerate(snapshot):
-        if val == 255:
-            error_codes.append({
-                'position': i,
-                'code': 255,
-                'message': f"Loadcell error at position {i}",
-                'type': 'loadcell_error',
-                'allow_manual_control': True
-            })
-        elif val == 222:
-            error_codes.append({
-                'position': i,
-                'code': 222,
-                'message': f"Product at position {i} not placed correctly",
-                'type': 'placement_error',
-                'allow_manual_control': False
-            })
-        elif val == 200:
-            error_codes.append({
-                'position': i,
-                'code': 200,
-                'message': f"Product at position {i} not placed correctly",
-                'type': 'placement_error',
-                'allow_manual_control': False
-            })
-    return error_codes
+    return [dict(error) for error in get_loadcell_analysis().error_codes]
 
 
 def has_real_data():
     """Check if we have real product data (not just error codes)"""
-    snapshot = globals.get_loadcell_quantity_snapshot()
-    return any(val > 0 and val not in [200, 222, 255] for val in snapshot)
+    return get_loadcell_analysis().has_real_data
 
 
 def has_any_data():
     """Check if we have any data (including error codes)"""
-    snapshot = globals.get_loadcell_quantity_snapshot()
-    return any(val != 0 for val in snapshot)
+    return get_loadcell_analysis().has_any_data
 
 
 def has_recent_data_reception():
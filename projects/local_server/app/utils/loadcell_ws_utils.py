@@ -41,6 +41,7 @@ def notification_handler_factory(device_name, globals):
                 globals.loadcell_quantity[:globals.LOADCELL_NUM_1] = data_list
             else:
                 globals.loadcell_quantity[globals.LOADCELL_NUM_1:globals.LOADCELL_NUM_TOTAL] = data_list[:globals.LOADCELL_NUM_2]
+            globals.loadcell_version += 1
             # Update last data reception timestamp to indicate active connection
             globals.last_data_reception_time = time.time()
         # Emit immediate data update via WebSocket (minimal processing for speed)
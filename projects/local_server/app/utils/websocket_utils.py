@@ -19,8 +19,8 @@ WebSocket utility functions for handling real-time updates
 from flask_socketio import emit
 
 
-def emit_loadcell_update(socketio, loadcell_data, cart):
-    """Emit loadcell update event to all connected clients"""
+def emit_loadcell_update(socketio, loadcell_data, cart, changes=None):
+    """Emit loadcell update event to all connected clients (changes: cart_model change set, if any)"""
     try:
         from app.utils.loadcell_utils import get_error_codes_info
         
@@ -32,6 +32,8 @@ def emit_loadcell_update(socketio, loadcell_data, cart):
             'cart': cart,
             'error_codes': error_codes
         }
+        if changes is not None:
+            event_data['changes'] = changes
         
         socketio.emit('loadcell_update', event_data)
         return True
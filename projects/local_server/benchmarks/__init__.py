@@ -0,0 +1,4 @@
+# Benchmarks package
+"""
+Standalone performance benchmarks, run from projects/local_server with python -m benchmarks.<name>
+"""
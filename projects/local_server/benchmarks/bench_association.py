@@ -0,0 +1,148 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Benchmark: detection-to-track association, previous implementation vs fast path (hungarian and greedy)
+on synthetic MOT-style frames (moving people, missed detections, false positives, crowds that overlap)
+
+    python -m benchmarks.bench_association --objects 0 1 5 20 50 100 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.modules.tracker.sort import associate_detections_to_trackers, iou_batch
+
+
+def previous_linear_assignment(cost_matrix):
+    try:
+        import lap
+        _, x, y = lap.lapjv(cost_matrix, extend_cost=True)
+        return np.array([[y[i], i] for i in x if i >= 0])
+    except ImportError:
+        from scipy.optimize import linear_sum_assignment
+        x, y = linear_sum_assignment(cost_matrix)
+        return np.array(list(zip(x, y)))
+
+
+def previous_associate(detections, trackers, iou_threshold=0.3):
+    """associate_detections_to_trackers before the fast path"""
+    if len(trackers) == 0:
+        return np.empty((0, 2), dtype=int), np.arange(len(detections)), np.empty((0, 5), dtype=int)
+
+    iou_matrix = iou_batch(detections, trackers)
+
+    if min(iou_matrix.shape) > 0:
+        a = (iou_matrix > iou_threshold).astype(np.int32)
+        if a.sum(1).max() == 1 and a.sum(0).max() == 1:
+            matched_indices = np.stack(np.where(a), axis=1)
+        else:
+            matched_indices = previous_linear_assignment(-iou_matrix)
+    else:
+        matched_indices = np.empty(shape=(0, 2))
+
+    unmatched_detections = []
+    for d, det in enumerate(detections):
+        if d not in matched_indices[:, 0]:
+            unmatched_detections.append(d)
+    unmatched_trackers = []
+    for t, trk in enumerate(trackers):
+        if t not in matched_indices[:, 1]:
+            unmatched_trackers.append(t)
+
+    matches = []
+    for m in matched_indices:
+        if iou_matrix[m[0], m[1]] < iou_threshold:
+            unmatched_detections.append(m[0])
+            unmatched_trackers.append(m[1])
+        else:
+            matches.append(m.reshape(1, 2))
+    if len(matches) == 0:
+        matches = np.empty((0, 2), dtype=int)
+    else:
+        matches = np.concatenate(matches, axis=0)
+
+    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+
+
+def make_frames(num_objects, num_frames, seed=0, frame_size=640):
+    """(detections, predicted track boxes) pairs; objects are packed tightly so boxes overlap"""
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(0, frame_size, (num_objects, 2))
+    vel = rng.normal(0, 2, (num_objects, 2))
+    size = rng.uniform(30, 80, (num_objects, 2))
+    frames = []
+    for _ in range(num_frames):
+        pos += vel
+        tracks = np.column_stack([pos, pos + size])
+        visible = rng.random(num_objects) > 0.1
+        dets = tracks[visible] + rng.normal(0, 3, (int(visible.sum()), 4))
+        false_positives = max(0, int(rng.poisson(num_objects * 0.05)))
+        fp_pos = rng.uniform(0, frame_size, (false_positives, 2))
+        fp_size = rng.uniform(30, 80, (false_positives, 2))
+        dets = np.vstack([dets, np.column_stack([fp_pos, fp_pos + fp_size])])
+        dets = np.column_stack([dets, rng.uniform(0.3, 1.0, len(dets))])
+        frames.append((dets[rng.permutation(len(dets))], tracks))
+    return frames
+
+
+def time_association(func, frames, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for dets, tracks in frames:
+            func(dets, tracks)
+    return (time.perf_counter() - start) / (repeat * len(frames))
+
+
+def match_set(matches):
+    return {(int(d), int(t)) for d, t in matches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Association benchmark')
+    parser.add_argument('--objects', type=int, nargs='+', default=[0, 1, 5, 20, 50, 100, 200], help='Objects per frame')
+    parser.add_argument('--frames', type=int, default=50, help='Frames per stream')
+    parser.add_argument('--repeat', type=int, default=5, help='Passes over the stream')
+    parser.add_argument('--iou', type=float, default=0.3, help='IoU threshold')
+    args = parser.parse_args()
+
+    previous = lambda d, t: previous_associate(d, t, args.iou)
+    hungarian = lambda d, t: associate_detections_to_trackers(d, t, args.iou, 'hungarian')
+    greedy = lambda d, t: associate_detections_to_trackers(d, t, args.iou, 'greedy')
+
+    print(f"IoU threshold: {args.iou}, frames: {args.frames}, repeat: {args.repeat}")
+    print(f"{'objects':>8} {'previous (ms)':>14} {'hungarian (ms)':>15} {'greedy (ms)':>12} {'greedy agreement':>17}")
+    for num_objects in args.objects:
+        frames = make_frames(num_objects, args.frames)
+
+        agreed = total = 0
+        for dets, tracks in frames:
+            expected = match_set(previous(dets, tracks)[0])
+            assert match_set(hungarian(dets, tracks)[0]) == expected, "fast path changed the hungarian matches"
+            greedy_matches = match_set(greedy(dets, tracks)[0])
+            agreed += len(expected & greedy_matches)
+            total += len(expected)
+        agreement = agreed / total * 100 if total else 100.0
+
+        t_previous = time_association(previous, frames, args.repeat)
+        t_hungarian = time_association(hungarian, frames, args.repeat)
+        t_greedy = time_association(greedy, frames, args.repeat)
+        print(f"{num_objects:>8} {t_previous * 1000:>14.3f} {t_hungarian * 1000:>15.3f} {t_greedy * 1000:>12.3f} "
+              f"{agreement:>16.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Load test of the loadcell notification pipeline on simulated loadcells (app/modules/ble_sim.py):
+BLE handler -> loadcell_events -> coalescing consumer (cart, pricing, emit, MQTT).
+For each rate both loadcells notify that many times per second, every notification changing one
+slot; reports handled notifications, cart transitions, emits and the notification-to-handled delay.
+The rate at which `pending` keeps growing or the delay exceeds the coalescing window is where emits lag.
+
+    python -m benchmarks.bench_ble_notify --rates 1 10 50 100 200 --seconds 10
+"""
+import argparse
+import contextlib
+import io
+import os
+import threading
+import time
+
+
+class EmitCounter:
+    """Stands in for the SocketIO server: counts loadcell_update emits"""
+
+    def __init__(self):
+        self.emits = 0
+
+    def emit(self, event, data=None, **kwargs):
+        if event == 'loadcell_update':
+            self.emits += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loadcell notification pipeline load test on simulated loadcells')
+    parser.add_argument('--rates', type=float, nargs='+', default=[1, 10, 50, 100, 200],
+                        help='Notifications per second per loadcell')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each rate')
+    parser.add_argument('--mqtt', action='store_true', help='Publish to the broker from .env (default: no broker)')
+    args = parser.parse_args()
+
+    # Before the app modules read .env: simulated BLE, and no MQTT broker unless asked for
+    os.environ["BLE_SIMULATION"] = "true"
+    if not args.mqtt:
+        os.environ["BROKER_URL"] = "127.0.0.1"
+        os.environ["BROKER_PORT"] = "9"
+
+    from app.modules import update_loadcell_quantity
+    from app.modules.ble_runtime import ble_runtime
+    from app.modules.ble_sim import sim_adapter
+    from app.modules.loadcell_events import loadcell_events
+    from app.utils.loadcell_ws_utils import set_socketio_instance
+
+    counter = EmitCounter()
+    set_socketio_instance(counter)
+    loadcells = [sim_adapter.by_name(name) for name in update_loadcell_quantity.DEVICES]
+    for peripheral in loadcells:
+        peripheral.set_rate(0)
+        peripheral.churn = True
+
+    update_loadcell_quantity.start_ble_clients()
+    threading.Thread(target=update_loadcell_quantity.consume_loadcell_events, daemon=True).start()
+    deadline = time.monotonic() + 30
+    while not all(ble_runtime.device(name).connected for name in update_loadcell_quantity.DEVICES):
+        if time.monotonic() > deadline:
+            print("Simulated loadcells did not connect")
+            return
+        time.sleep(0.1)
+
+    print(f"Coalescing window: {update_loadcell_quantity.LOADCELL_COALESCE_WINDOW * 1000:.0f} ms, "
+          f"{len(loadcells)} loadcells, {args.seconds:.0f} s per rate")
+    print(f"{'rate/dev':>9} {'received/s':>11} {'handled/s':>10} {'batches/s':>10} {'emits/s':>8} "
+          f"{'pending':>8} {'avg delay':>10} {'max delay':>10} {'loop lag':>9}")
+    for rate in args.rates:
+        before = loadcell_events.snapshot()
+        emits_before = counter.emits
+        loadcell_events.max_delay = 0.0
+        ble_runtime.max_loop_lag = 0.0
+        # The consumer prints every transition; keep the table readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            for peripheral in loadcells:
+                peripheral.set_rate(rate)
+            time.sleep(args.seconds)
+            for peripheral in loadcells:
+                peripheral.set_rate(0)
+            after = loadcell_events.snapshot()
+            emits = counter.emits - emits_before
+            # Let the backlog drain before the next rate
+            drain_deadline = time.monotonic() + 10
+            while loadcell_events.snapshot()['pending'] and time.monotonic() < drain_deadline:
+                time.sleep(0.1)
+            time.sleep(update_loadcell_quantity.LOADCELL_COALESCE_WINDOW * 5)
+        seconds = args.seconds
+        received = (after['received'] - before['received']) / seconds
+        handled = (after['processed'] - before['processed']) / seconds
+        batches = (after['coalesced_batches'] - before['coalesced_batches']) / seconds
+        print(f"{rate:>9.0f} {received:>11.1f} {handled:>10.1f} {batches:>10.1f} {emits / seconds:>8.1f} "
+              f"{after['pending']:>8} {after['avg_delay_ms']:>8.1f}ms {after['max_delay_ms']:>8.1f}ms "
+              f"{ble_runtime.max_loop_lag * 1000:>7.1f}ms")
+
+    ble_runtime.stop()
+
+
+if __name__ == '__main__':
+    main()
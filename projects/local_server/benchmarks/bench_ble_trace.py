@@ -0,0 +1,215 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Replay a recorded BLE trace (BLE_TRACE_FILE, app/modules/ble_trace.py) into the loadcell and XG26
+notification handlers, at the recorded timing (--speed 1) or as fast as possible (--speed 0);
+reports handler cost, consumer throughput (coalesced batches, cart transitions, emits) and the
+error code (200/222/255) changes per slot found in the trace. --dump only prints the records.
+--selftest checks that a session cut off mid-record (crash) does not hide the next session.
+
+    python -m benchmarks.bench_ble_trace logs/ble_trace.bin --speed 0
+    python -m benchmarks.bench_ble_trace logs/ble_trace.bin --dump
+    python -m benchmarks.bench_ble_trace --selftest
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+from app.modules.ble_trace import KIND_NAMES, KIND_NOTIFY, KIND_READ, BleTraceRecorder, read_trace, replay
+
+ERROR_CODES = (200, 222, 255)
+
+
+def error_changes(records):
+    """(device, slot) -> list of (t, old value, new value) where a slot went into or out of an error code"""
+    last = {}
+    changes = {}
+    for record in records:
+        if record.kind != KIND_NOTIFY or not record.device_name.startswith("Loadcell"):
+            continue
+        for slot, value in enumerate(record.data):
+            key = (record.device_name, slot)
+            old = last.get(key)
+            last[key] = value
+            if old is not None and old != value and (old in ERROR_CODES or value in ERROR_CODES):
+                changes.setdefault(key, []).append((record.t, old, value))
+    return changes
+
+
+def print_summary(records):
+    counts = {}
+    for record in records:
+        key = (record.device_name, KIND_NAMES[record.kind])
+        counts[key] = counts.get(key, 0) + 1
+    sessions = len({record.session for record in records})
+    print(f"{len(records)} records in {sessions} session(s)")
+    for (device_name, kind), n in sorted(counts.items()):
+        print(f"  {device_name:12} {kind:6} {n}")
+    changes = error_changes(records)
+    if not changes:
+        print("No error code changes")
+    for (device_name, slot), slot_changes in sorted(changes.items()):
+        print(f"  {device_name} slot {slot}: {len(slot_changes)} error code change(s), "
+              f"first at {slot_changes[0][0]:.3f}s: {slot_changes[0][1]} -> {slot_changes[0][2]}")
+
+
+def selftest():
+    """Record two sessions with a crash (partial last record) after the first, check both read back"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ble_trace.bin")
+        recorder = BleTraceRecorder()
+        recorder.start(path)
+        for i in range(3):
+            recorder.notify("Loadcell_1", "char-1", [i] * 15)
+        recorder.stop()
+        with open(path, 'rb') as f:
+            session_1 = f.read()
+
+        for cut in range(1, 24):
+            # Crash: the buffered writer only got part of one more record to disk
+            with open(path, 'wb') as f:
+                f.write(session_1 + bytes([9] * cut))
+            # Old files: read_trace resyncs on the next session header
+            with open(path, 'ab') as f:
+                f.write(session_1)
+            records = list(read_trace(path))
+            assert [record.session for record in records] == [0, 0, 0, 1, 1, 1], f"resync, cut {cut}: {records}"
+
+            # start() drops the partial record before appending its session
+            with open(path, 'wb') as f:
+                f.write(session_1 + bytes([9] * cut))
+            recorder.start(path)
+            recorder.notify("Loadcell_2", "char-2", [7] * 15)
+            recorder.stop()
+            with open(path, 'rb') as f:
+                assert f.read().startswith(session_1 + b"BLETRACE"), f"truncate, cut {cut}"
+            records = list(read_trace(path))
+            assert [(record.session, record.device_name) for record in records] == \
+                [(0, "Loadcell_1")] * 3 + [(1, "Loadcell_2")], f"truncate, cut {cut}: {records}"
+            assert all(list(record.data) == [i] * 15 for i, record in enumerate(records[:3]))
+    print("Self test passed: a crashed session does not hide the next one")
+
+
+class EmitCounter:
+    """Stands in for the SocketIO server: counts loadcell_update emits"""
+
+    def __init__(self):
+        self.emits = 0
+
+    def emit(self, event, data=None, **kwargs):
+        if event == 'loadcell_update':
+            self.emits += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a BLE trace into the notification handlers')
+    parser.add_argument('trace', nargs='?', help='Trace file recorded with BLE_TRACE_FILE')
+    parser.add_argument('--speed', type=float, default=1.0, help='1 = recorded timing, 0 = as fast as possible')
+    parser.add_argument('--dump', action='store_true', help='Only print the records and the error code changes')
+    parser.add_argument('--verbose', action='store_true', help='Keep the handlers\' output')
+    parser.add_argument('--mqtt', action='store_true', help='Publish to the broker from .env (default: no broker)')
+    parser.add_argument('--selftest', action='store_true', help='Check crash recovery of the trace format and exit')
+    args = parser.parse_args()
+
+    if args.selftest:
+        selftest()
+        return
+    if args.trace is None:
+        parser.error('the trace file is required')
+
+    records = list(read_trace(args.trace))
+    if args.dump:
+        for record in records:
+            print(record)
+        print_summary(records)
+        return
+    print_summary(records)
+
+    # Before the app modules read .env: no BLE adapter or MQTT broker needed to replay
+    os.environ["BLE_SIMULATION"] = "true"
+    os.environ["BLE_TRACE_FILE"] = ""
+    os.environ["BLE_SIM_SCRIPT"] = ""
+    if not args.mqtt:
+        os.environ["BROKER_URL"] = "127.0.0.1"
+        os.environ["BROKER_PORT"] = "9"
+
+    from app.modules import update_loadcell_quantity, xg26_sensor
+    from app.modules.ble_sim import SimCharacteristic
+    from app.modules.loadcell_events import loadcell_events
+    from app.utils.loadcell_ws_utils import set_socketio_instance
+
+    counter = EmitCounter()
+    set_socketio_instance(counter)
+    threading.Thread(target=update_loadcell_quantity.consume_loadcell_events, daemon=True).start()
+
+    handlers = {}
+    senders = {}
+    handler_time = [0.0]
+
+    def handler_for(record):
+        key = (record.device_name, record.char_uuid)
+        handler = handlers.get(key)
+        if handler is None:
+            if record.device_name in update_loadcell_quantity.DEVICES:
+                handler = update_loadcell_quantity.notification_handler_factory(record.device_name)
+            elif record.device_name == xg26_sensor.DEVICE_NAME:
+                handler = xg26_sensor.create_notify_handler(record.char_uuid)
+            else:
+                handler = lambda sender, data: None
+            handlers[key] = handler
+            senders[key] = SimCharacteristic(record.char_uuid, len(senders) + 1)
+        return handler, senders[key]
+
+    def on_notify(record):
+        handler, sender = handler_for(record)
+        start = time.perf_counter()
+        handler(sender, bytearray(record.data))
+        handler_time[0] += time.perf_counter() - start
+
+    def on_read(record):
+        if record.device_name == xg26_sensor.DEVICE_NAME and record.char_uuid in xg26_sensor.CHAR_MAP:
+            xg26_sensor.apply_sensor_reading(record.char_uuid, record.data)
+
+    before = loadcell_events.snapshot()
+    output = None if args.verbose else io.StringIO()
+    with contextlib.redirect_stdout(output) if output is not None else contextlib.nullcontext():
+        start = time.perf_counter()
+        handled = replay(records, {KIND_NOTIFY: on_notify, KIND_READ: on_read}, speed=args.speed)
+        replay_time = time.perf_counter() - start
+        # Wait for the consumer to finish the backlog
+        while loadcell_events.snapshot()['pending']:
+            time.sleep(0.01)
+        time.sleep(update_loadcell_quantity.LOADCELL_COALESCE_WINDOW * 5)
+        total_time = time.perf_counter() - start
+    after = loadcell_events.snapshot()
+
+    notifications = sum(1 for record in records if record.kind == KIND_NOTIFY)
+    processed = after['processed'] - before['processed']
+    print(f"Replayed {handled} records in {replay_time:.2f}s (speed {args.speed:g}), drained after {total_time:.2f}s")
+    if notifications:
+        print(f"Handlers: {handler_time[0] / notifications * 1e6:.1f} us/notification, "
+              f"{notifications / max(handler_time[0], 1e-9):,.0f} notifications/s")
+    print(f"Consumer: {processed} loadcell events in {after['coalesced_batches'] - before['coalesced_batches']} batches, "
+          f"{after['transitions'] - before['transitions']} transitions, {counter.emits} emits, "
+          f"{processed / total_time:,.0f} events/s, max delay {after['max_delay_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
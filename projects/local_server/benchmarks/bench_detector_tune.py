@@ -0,0 +1,302 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Person detector autotuner: sweep input size, precision and confidence threshold over labeled clips,
+report latency percentiles, CPU usage and person recall, and write the best setting to
+database/detector.json (loaded by create_detector() at startup)
+
+    python -m benchmarks.bench_detector_tune labeled/session1/ labeled/session2.mp4 --imgsz 320 416 512
+
+Labels use the YOLO format, normalized [cx, cy, w, h] of the person boxes:
+    image directory   <stem>.txt next to each image (or in a sibling labels/ directory), "cls cx cy w h" per line;
+                      an image without a label file has no people
+    video file        <video>.labels.json: {"<frame index>": [[cx, cy, w, h], ...]}, missing frames have no people
+
+The model runs once per (input size, precision) at the lowest threshold; higher thresholds filter
+those detections, which gives the same boxes as running the model with that threshold.
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.modules.camera_config import get_camera_config
+from app.modules.detector import (DEFAULT_MODELS, MODELS_DIR, PERSON_CLASS_ID, create_detector, resolve_model_path,
+                                  tuned_config_path)
+from app.modules.frame_source import create_frame_source
+from app.modules.tracker.sort import greedy_assignment, iou_batch
+from app.utils.file_utils import write_file
+
+
+def load_label_file(path):
+    """Normalized [cx, cy, w, h] person boxes of a YOLO label file"""
+    boxes = []
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 5 and int(float(parts[0])) == PERSON_CLASS_ID:
+                boxes.append([float(v) for v in parts[1:5]])
+    return boxes
+
+
+def load_clip_labels(spec, frame_count):
+    """Per-frame normalized label boxes of a clip, None if the clip has no labels"""
+    kind, _, path = spec.partition(':')
+    path = path if kind in ("images", "file") else spec
+    if os.path.isdir(path):
+        files = sorted(f for f in glob.glob(os.path.join(path, '*'))
+                       if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))
+        labels = []
+        for file in files[:frame_count]:
+            stem = os.path.splitext(os.path.basename(file))[0]
+            candidates = [os.path.join(path, stem + ".txt"),
+                          os.path.join(os.path.dirname(os.path.abspath(path)), "labels", stem + ".txt")]
+            label_file = next((c for c in candidates if os.path.exists(c)), None)
+            labels.append(load_label_file(label_file) if label_file else [])
+        return labels
+
+    label_file = path + ".labels.json"
+    if not os.path.exists(label_file):
+        return None
+    with open(label_file) as f:
+        by_frame = json.load(f)
+    return [by_frame.get(str(index), []) for index in range(frame_count)]
+
+
+def to_pixel_boxes(normalized, frame_shape):
+    height, width = frame_shape[:2]
+    if not normalized:
+        return np.empty((0, 4))
+    cx, cy, w, h = np.asarray(normalized, dtype=np.float64).T
+    return np.column_stack([(cx - w / 2) * width, (cy - h / 2) * height, (cx + w / 2) * width, (cy + h / 2) * height])
+
+
+def load_labeled_frames(clips, camera, max_frames):
+    """Frames (resized to the camera frame size, like the live pipeline) and their pixel label boxes"""
+    frames, labels = [], []
+    for spec in clips:
+        source = create_frame_source(spec, camera["frame_size"], camera["fps"])
+        if not source.isOpened():
+            print(f"Error: Could not open {spec}")
+            continue
+        clip_frames = []
+        try:
+            while not max_frames or len(clip_frames) < max_frames:
+                ret, frame = source.read()
+                if not ret:
+                    break
+                clip_frames.append(frame)
+        finally:
+            source.release()
+        clip_labels = load_clip_labels(spec, len(clip_frames))
+        if clip_labels is None:
+            print(f"Skipping {spec}: no labels found")
+            continue
+        frames.extend(clip_frames)
+        labels.extend(to_pixel_boxes(boxes, frame.shape) for boxes, frame in zip(clip_labels, clip_frames))
+        print(f"{spec}: {len(clip_frames)} frames, {sum(len(b) for b in clip_labels)} labeled people")
+    return frames, labels
+
+
+def quantize_onnx_int8(model_path):
+    """Dynamic INT8 quantization of an ONNX model for onnxruntime, cached next to the model"""
+    quantized = os.path.splitext(model_path)[0] + "-int8.onnx"
+    if not os.path.exists(quantized):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f"Quantizing {model_path} -> {quantized}")
+        quantize_dynamic(model_path, quantized, weight_type=QuantType.QUInt8)
+    return quantized
+
+
+def export_engine(model_path, imgsz, precision, int8_data):
+    """TensorRT engine of a .pt model for one input size/precision, cached next to the model"""
+    engine = f"{os.path.splitext(model_path)[0]}-{imgsz}-{precision}.engine"
+    if not os.path.exists(engine):
+        from ultralytics import YOLO
+        print(f"Exporting {engine} (this takes a few minutes on a Jetson)")
+        exported = YOLO(model_path).export(format="engine", imgsz=imgsz, half=precision == "fp16",
+                                           int8=precision == "int8", data=int8_data)
+        os.replace(exported, engine)
+    return engine
+
+
+def model_variants(backend, model_path, imgsz_list, precisions, export, int8_data):
+    """(imgsz, precision, get_model, reason) to try; get_model returns the model file, None (with reason) if unsupported"""
+    variants = []
+    for precision in precisions:
+        for imgsz in imgsz_list:
+            if backend == "ultralytics" and model_path.endswith(".pt") and (export or precision == "int8"):
+                if not export:
+                    variants.append((imgsz, precision, None, "int8 needs a TensorRT engine (--export)"))
+                    continue
+                variants.append((imgsz, precision, lambda i=imgsz, p=precision: export_engine(model_path, i, p, int8_data),
+                                 None))
+            elif backend == "onnxruntime" and precision == "int8":
+                variants.append((imgsz, precision, lambda: quantize_onnx_int8(model_path), None))
+            else:
+                variants.append((imgsz, precision, lambda: model_path, None))
+    return variants
+
+
+def run_variant(detector, frames):
+    """Detections per frame, per-frame latencies and CPU usage (process CPU time / wall time, %)"""
+    detector.warmup(frames[0])
+    detections, latencies = [], []
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for frame in frames:
+        start = time.perf_counter()
+        detections.append(detector.detect(frame))
+        latencies.append(time.perf_counter() - start)
+    cpu_percent = (time.process_time() - cpu_start) / max(time.perf_counter() - wall_start, 1e-9) * 100
+    return detections, np.asarray(latencies) * 1000, cpu_percent
+
+
+def score(detections, labels, conf, iou_threshold):
+    """(recall, precision) of detections above conf, one-to-one matching at iou_threshold"""
+    matched = predicted = expected = 0
+    for frame_detections, truth in zip(detections, labels):
+        kept = frame_detections[frame_detections[:, 4] >= conf] if len(frame_detections) else frame_detections
+        predicted += len(kept)
+        expected += len(truth)
+        if len(kept) and len(truth):
+            matched += len(greedy_assignment(iou_batch(truth, kept[:, :4]), iou_threshold))
+    recall = matched / expected if expected else float('nan')
+    precision = matched / predicted if predicted else (1.0 if expected == 0 else 0.0)
+    return recall, precision
+
+
+def pick_best(results, min_recall):
+    """Lowest p95 latency among settings with recall >= min_recall, otherwise the highest recall"""
+    eligible = [r for r in results if r['recall'] >= min_recall]
+    if eligible:
+        return min(eligible, key=lambda r: (r['p95_ms'], -r['recall']))
+    return max(results, key=lambda r: (r['recall'], -r['p95_ms']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Person detector input size / precision / threshold autotuner')
+    parser.add_argument('clips', nargs='+', help='Labeled video files or image directories (frame source specs)')
+    parser.add_argument('--camera', default=None, help='Camera name in database/cameras.json (frame size)')
+    parser.add_argument('--backend', default=None, help='Detector backend, default DETECTOR_BACKEND')
+    parser.add_argument('--model', default=None, help='Model file, default DETECTOR_MODEL (.pt to sweep input sizes)')
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[320, 416, 512], help='Input sizes to try')
+    parser.add_argument('--precision', nargs='+', default=['fp32', 'fp16', 'int8'], help='Precisions to try')
+    parser.add_argument('--conf', type=float, nargs='+', default=[0.25, 0.4, 0.5, 0.6], help='Thresholds to try')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU to count a labeled person as found')
+    parser.add_argument('--min-recall', type=float, default=0.9, help='Recall the picked setting must reach')
+    parser.add_argument('--max-frames', type=int, default=300, help='Frames per clip, 0 = all')
+    parser.add_argument('--export', action='store_true', help='ultralytics .pt: build a TensorRT engine per setting')
+    parser.add_argument('--int8-data', default=None, help='Dataset yaml for TensorRT INT8 calibration')
+    parser.add_argument('--output', default=tuned_config_path, help='Where to write the best setting')
+    parser.add_argument('--dry-run', action='store_true', help='Only report, do not write the config')
+    args = parser.parse_args()
+    load_dotenv()
+
+    camera = get_camera_config(args.camera)
+    frames, labels = load_labeled_frames(args.clips, camera, args.max_frames)
+    if not frames:
+        print("No labeled frames")
+        return
+    print(f"Frames: {len(frames)}, labeled people: {sum(len(b) for b in labels)}\n")
+
+    backend = (args.backend or os.getenv("DETECTOR_BACKEND") or "ultralytics").lower()
+    model = args.model or os.getenv("DETECTOR_MODEL") or DEFAULT_MODELS[backend]
+    model_path = resolve_model_path(model)
+    min_conf = min(args.conf)
+
+    results = []
+    tried = set()
+    for imgsz, precision, get_model, reason in model_variants(backend, model_path, args.imgsz, args.precision,
+                                                              args.export, args.int8_data):
+        if get_model is None:
+            print(f"imgsz {imgsz} {precision}: skipped, {reason}")
+            continue
+        try:
+            variant_model = get_model()
+            detector = create_detector(backend, variant_model, min_conf, imgsz, precision=precision)
+        except Exception as e:
+            print(f"imgsz {imgsz} {precision}: skipped, {e}")
+            continue
+        if (detector.imgsz, precision, variant_model) in tried:
+            # Fixed-size models ignore the requested input size
+            continue
+        tried.add((detector.imgsz, precision, variant_model))
+
+        try:
+            detections, latencies, cpu_percent = run_variant(detector, frames)
+        except Exception as e:
+            print(f"imgsz {detector.imgsz} {precision}: failed, {e}")
+            continue
+        p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99])
+        for conf in args.conf:
+            recall, precision_score = score(detections, labels, conf, args.iou)
+            results.append({
+                'backend': backend, 'model': variant_model, 'imgsz': detector.imgsz, 'precision': precision,
+                'conf': conf, 'recall': recall, 'box_precision': precision_score,
+                'mean_ms': float(latencies.mean()), 'p50_ms': float(p50), 'p90_ms': float(p90),
+                'p95_ms': float(p95), 'p99_ms': float(p99), 'cpu_percent': cpu_percent,
+            })
+
+    if not results:
+        print("No detector setting could run")
+        return
+
+    print(f"\n{'imgsz':>6} {'prec':>5} {'conf':>5} {'mean ms':>8} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} "
+          f"{'CPU %':>6} {'recall':>7} {'box prec':>8}  model")
+    for r in results:
+        print(f"{r['imgsz']:>6} {r['precision']:>5} {r['conf']:>5.2f} {r['mean_ms']:>8.2f} {r['p50_ms']:>7.2f} "
+              f"{r['p90_ms']:>7.2f} {r['p99_ms']:>7.2f} {r['cpu_percent']:>6.0f} {r['recall']:>7.3f} "
+              f"{r['box_precision']:>8.3f}  {os.path.basename(r['model'])}")
+
+    best = pick_best(results, args.min_recall)
+    print(f"\nBest (p95 latency with recall >= {args.min_recall}): imgsz {best['imgsz']}, {best['precision']}, "
+          f"conf {best['conf']}, p95 {best['p95_ms']:.2f} ms, recall {best['recall']:.3f}, "
+          f"{os.path.basename(best['model'])}")
+
+    if args.dry_run:
+        return
+    # Models in the detector models folder are stored by name, like DETECTOR_MODEL
+    model = best['model']
+    if os.path.dirname(model) == MODELS_DIR:
+        model = os.path.basename(model)
+    write_file(args.output, {
+        'backend': best['backend'],
+        'model': model,
+        'imgsz': best['imgsz'],
+        'precision': best['precision'],
+        'conf': best['conf'],
+        'tuned': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'clips': args.clips,
+            'frames': len(frames),
+            'min_recall': args.min_recall,
+            'recall': round(best['recall'], 4),
+            'box_precision': round(best['box_precision'], 4),
+            'p50_ms': round(best['p50_ms'], 2),
+            'p95_ms': round(best['p95_ms'], 2),
+            'cpu_percent': round(best['cpu_percent'], 1),
+        },
+    })
+    print(f"Written to {args.output} (set DETECTOR_TUNED_CONFIG = \"false\" to go back to the .env settings)")
+
+
+if __name__ == '__main__':
+    main()
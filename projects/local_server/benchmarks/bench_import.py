@@ -0,0 +1,90 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Startup cost: import time of server modules, each measured in a fresh interpreter with -X importtime
+
+    python -m benchmarks.bench_import --modules app.modules.tracking_customer_behavior app.modules.tracker.sort
+
+Run it on two commits (e.g. `git checkout <old>` then back) to compare before and after a change.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('matplotlib', 'skimage', 'filterpy', 'scipy', 'torch', 'ultralytics', 'onnxruntime')
+
+PROBE = (
+    "import importlib, sys, time\n"
+    "start = time.perf_counter()\n"
+    "importlib.import_module({module!r})\n"
+    "elapsed = time.perf_counter() - start\n"
+    "import json\n"
+    "print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))\n"
+)
+
+
+def measure_once(module):
+    """Import module in a fresh interpreter; returns (seconds, heavy modules loaded, top-level packages by cumulative time)"""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed')
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # stderr lines look like "import time:   self [us] | cumulative | imported package"
+    entries = []
+    for line in proc.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not line.startswith('import time:'):
+            continue
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue
+        name = parts[2].strip()
+        if '.' not in name:
+            entries.append((cumulative, name))
+    return result['seconds'], result['heavy'], sorted(entries, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Module import time benchmark')
+    parser.add_argument('--modules', nargs='+',
+                        default=['app.modules.tracker.sort', 'app.modules.tracking_customer_behavior'])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=5, help='Slowest top-level packages to list')
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            runs = [measure_once(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module}: could not import ({e})")
+            continue
+        times = [seconds * 1000 for seconds, _, _ in runs]
+        _, heavy, entries = runs[-1]
+        print(f"{module}: median {statistics.median(times):.1f} ms, min {min(times):.1f} ms over {args.runs} runs")
+        print(f"    heavy modules loaded: {', '.join(heavy) if heavy else 'none'}")
+        for cumulative, name in entries[:args.top]:
+            print(f"    {cumulative / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
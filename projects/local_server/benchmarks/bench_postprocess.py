@@ -0,0 +1,84 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Micro-benchmark: per-box vs batched conversion of ultralytics results into Sort detections
+
+    python -m benchmarks.bench_postprocess --boxes 5 20 50 100 300 --device cuda
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+from app.modules.detector.postprocess import results_to_detections, results_to_detections_per_box
+
+
+class FakeResult:
+    """Minimal stand-in for ultralytics Results: only .boxes is read by the post-processing"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def make_crowded_result(num_boxes, device, frame_size=416, num_classes=2, seed=0):
+    """Random boxes covering the frame, with mixed classes and confidences"""
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, frame_size - 40, num_boxes)
+    y1 = rng.uniform(0, frame_size - 80, num_boxes)
+    w = rng.uniform(20, 120, num_boxes)
+    h = rng.uniform(40, 240, num_boxes)
+    conf = rng.uniform(0.25, 1.0, num_boxes)
+    cls = rng.integers(0, num_classes, num_boxes)
+    data = np.column_stack([x1, y1, x1 + w, y1 + h, conf, cls]).astype(np.float32)
+    boxes = Boxes(torch.from_numpy(data).to(device), (frame_size, frame_size))
+    return [FakeResult(boxes)]
+
+
+def time_call(func, results, repeat):
+    func(results, 0.5, (0,))  # warm up
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(results, 0.5, (0,))
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detection post-processing benchmark')
+    parser.add_argument('--boxes', type=int, nargs='+', default=[5, 20, 50, 100, 300], help='Boxes per frame')
+    parser.add_argument('--repeat', type=int, default=200, help='Iterations per measurement')
+    parser.add_argument('--device', default='cuda' if torch.cuda.is_available() else 'cpu')
+    args = parser.parse_args()
+
+    print(f"Device: {args.device}, repeat: {args.repeat}")
+    print(f"{'boxes':>6} {'per-box (ms)':>14} {'batched (ms)':>14} {'speedup':>9}")
+    for num_boxes in args.boxes:
+        results = make_crowded_result(num_boxes, args.device)
+
+        expected = results_to_detections_per_box(results, 0.5, (0,))
+        actual = results_to_detections(results, 0.5, (0,))
+        assert np.allclose(expected, actual), "batched output differs from per-box output"
+
+        per_box = time_call(results_to_detections_per_box, results, args.repeat)
+        batched = time_call(results_to_detections, results, args.repeat)
+        print(f"{num_boxes:>6} {per_box * 1000:>14.3f} {batched * 1000:>14.3f} {per_box / batched:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
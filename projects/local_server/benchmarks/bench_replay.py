@@ -0,0 +1,151 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Replay recorded shopping sessions through the vision pipeline (detection, tracking, ROI/alert logic)
+as fast as possible; reports per-stage latency percentiles and the customer events produced
+
+    python -m benchmarks.bench_replay recordings/session1.mp4 images:recordings/session2 --camera shelf_front
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.modules.camera_config import get_camera_config
+from app.modules.detector import create_detector
+from app.modules.frame_capture import VisionMetrics
+from app.modules.frame_source import create_frame_source
+from app.modules.vision_pipeline import create_vision_pipeline
+
+STAGES = ('read', 'motion', 'detect', 'track', 'predict', 'logic', 'total')
+
+
+def replay_session(spec, camera, detector, max_frames=0):
+    """Run one recording through a fresh pipeline; returns (stage timings dict, events, frames, metrics)"""
+    source = create_frame_source(spec, camera["frame_size"], camera["fps"])
+    if not source.isOpened():
+        print(f"Error: Could not open {spec}")
+        return {}, [], 0, None
+    fps = source.fps or camera["fps"]
+    metrics = VisionMetrics()
+    pipeline = create_vision_pipeline(camera, detector=detector, metrics=metrics)
+    timings = {stage: [] for stage in STAGES}
+    events = []
+    frames = 0
+    try:
+        while not max_frames or frames < max_frames:
+            start = time.perf_counter()
+            ret, frame = source.read()
+            read_time = time.perf_counter() - start
+            if not ret:
+                break
+            # Customer alerts are timed in seconds of the recording, not of the replay
+            _, frame_events = pipeline.process(frame, session_time=frames / fps)
+            total = time.perf_counter() - start
+
+            timings['read'].append(read_time)
+            for stage, seconds in pipeline.last_timings.items():
+                timings[stage].append(seconds)
+            timings['total'].append(total)
+            for event in frame_events:
+                events.append({'session': spec, 'frame': frames, 'time_s': round(frames / fps, 2),
+                               'type': event['type'], 'customer_id': event.get('customer_id')})
+            frames += 1
+    finally:
+        source.release()
+    return timings, events, frames, metrics
+
+
+def print_latency_table(timings):
+    print(f"{'stage':>8} {'count':>7} {'mean ms':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for stage in STAGES:
+        values = np.asarray(timings.get(stage, [])) * 1000
+        if len(values) == 0:
+            continue
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        print(f"{stage:>8} {len(values):>7} {values.mean():>9.2f} {p50:>8.2f} {p90:>8.2f} {p99:>8.2f} {values.max():>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline replay benchmark of the vision pipeline')
+    parser.add_argument('sessions', nargs='+', help='Video files or image directories (frame source specs)')
+    parser.add_argument('--camera', default=None, help='Camera name in database/cameras.json')
+    parser.add_argument('--max-frames', type=int, default=0, help='Frames per session, 0 = all')
+    parser.add_argument('--detect-interval', type=int, default=None, help='Override detect_interval')
+    parser.add_argument('--no-motion-gate', action='store_true', help='Run without the motion gate')
+    parser.add_argument('--roi-crop', action='store_true', help='Force ROI-cropped inference')
+    parser.add_argument('--events-json', default=None, help='Also write the events to this file')
+    args = parser.parse_args()
+
+    camera = dict(get_camera_config(args.camera))
+    if args.detect_interval is not None:
+        camera["detect_interval"] = args.detect_interval
+    if args.no_motion_gate:
+        camera["motion_gate"] = False
+    if args.roi_crop:
+        camera["roi_crop"] = True
+
+    detector = create_detector()
+    warmed_up = False
+    all_timings = {stage: [] for stage in STAGES}
+    all_events = []
+    total_frames = 0
+    wall_start = time.perf_counter()
+
+    for spec in args.sessions:
+        if not warmed_up:
+            source = create_frame_source(spec, camera["frame_size"], camera["fps"])
+            ret, frame = source.read()
+            source.release()
+            if ret:
+                detector.warmup(frame)
+                warmed_up = True
+        timings, events, frames, metrics = replay_session(spec, camera, detector, args.max_frames)
+        if metrics is None:
+            continue
+        snapshot = metrics.snapshot()
+        print(f"{spec}: {frames} frames, inferred {snapshot['frames_inferred']}, "
+              f"predicted {snapshot['frames_predicted']}, skipped {snapshot['frames_skipped']}, {len(events)} events")
+        for stage, values in timings.items():
+            all_timings[stage].extend(values)
+        all_events.extend(events)
+        total_frames += frames
+
+    wall = time.perf_counter() - wall_start
+    if total_frames == 0:
+        print("No frames replayed")
+        return
+
+    print(f"\nDetector: {detector}, camera: {camera['name']}, detect_interval: {camera['detect_interval']}, "
+          f"motion_gate: {camera['motion_gate']}, roi_crop: {camera['roi_crop']}")
+    print(f"Frames: {total_frames}, wall time: {wall:.1f}s, throughput: {total_frames / wall:.1f} FPS\n")
+    print_latency_table(all_timings)
+
+    print(f"\n{'session':>30} {'frame':>7} {'time s':>8} {'event':>9} {'customer':>9}")
+    for event in all_events:
+        if event['type'] in ('enter', 'leave', 'unpaid'):
+            print(f"{event['session'][-30:]:>30} {event['frame']:>7} {event['time_s']:>8.2f} {event['type']:>9} "
+                  f"{str(event['customer_id']):>9}")
+
+    if args.events_json:
+        with open(args.events_json, 'w') as f:
+            json.dump(all_events, f, indent=2)
+        print(f"\nEvents written to {args.events_json}")
+
+
+if __name__ == '__main__':
+    main()
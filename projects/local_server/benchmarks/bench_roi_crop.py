@@ -0,0 +1,149 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+ROI-cropped vs full-frame inference on recorded clips: latency saved and detection recall
+
+Recall is measured against the full-frame detections whose centre lies inside the ROI,
+i.e. exactly the people the customer tracker cares about.
+
+    python -m benchmarks.bench_roi_crop recordings/session1.mp4 recordings/session2/ --margins 0 16 32 64
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from app.modules.camera_config import get_camera_config
+from app.modules.detector import create_detector
+from app.modules.detector.roi import RoiCroppedDetector
+from app.modules.tracker.sort import iou_batch
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def iter_clip_frames(path, max_frames=None):
+    """Yield BGR frames from a video file or a directory of images"""
+    count = 0
+    if os.path.isdir(path):
+        files = sorted(f for f in glob.glob(os.path.join(path, '*')) if f.lower().endswith(IMAGE_EXTENSIONS))
+        for file in files:
+            if max_frames and count >= max_frames:
+                return
+            frame = cv2.imread(file)
+            if frame is not None:
+                count += 1
+                yield frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"Error: Could not open clip {path}")
+        return
+    try:
+        while not max_frames or count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+    finally:
+        cap.release()
+
+
+def centers_in_roi(detections, roi):
+    x1, y1, x2, y2 = roi
+    cx = (detections[:, 0] + detections[:, 2]) / 2
+    cy = (detections[:, 1] + detections[:, 3]) / 2
+    return (cx >= x1) & (cx <= x2) & (cy >= y1) & (cy <= y2)
+
+
+def count_matches(reference, candidates, iou_threshold):
+    """Number of reference boxes matched by a candidate box with IoU >= threshold"""
+    if len(reference) == 0 or len(candidates) == 0:
+        return 0
+    return int(np.sum(iou_batch(reference[:, :4], candidates[:, :4]).max(axis=1) >= iou_threshold))
+
+
+def timed_detect(detector, frame):
+    start = time.perf_counter()
+    detections = detector.detect(frame)
+    return detections, time.perf_counter() - start
+
+
+def summarize(latencies):
+    arr = np.asarray(latencies) * 1000
+    return np.mean(arr), np.percentile(arr, 50), np.percentile(arr, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ROI-cropped inference benchmark')
+    parser.add_argument('clips', nargs='+', help='Video files or image directories')
+    parser.add_argument('--camera', default=None, help='Camera name in database/cameras.json (ROI source)')
+    parser.add_argument('--margins', type=int, nargs='+', default=None, help='ROI margins to compare')
+    parser.add_argument('--max-frames', type=int, default=0, help='Frames per clip, 0 = all')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU to count a detection as recalled')
+    args = parser.parse_args()
+
+    camera = get_camera_config(args.camera)
+    margins = args.margins if args.margins is not None else [camera["roi_margin"]]
+    detector = create_detector()
+    cropped = {margin: RoiCroppedDetector(detector, camera["roi"], margin) for margin in margins}
+
+    full_latencies = []
+    crop_latencies = {margin: [] for margin in margins}
+    reference_count = 0
+    matched = {margin: 0 for margin in margins}
+    frames = 0
+
+    for clip in args.clips:
+        for frame in iter_clip_frames(clip, args.max_frames):
+            if frames == 0:
+                detector.warmup(frame)
+                for wrapped in cropped.values():
+                    wrapped.warmup(frame)
+            frames += 1
+
+            full, elapsed = timed_detect(detector, frame)
+            full_latencies.append(elapsed)
+            reference = full[centers_in_roi(full, camera["roi"])]
+            reference_count += len(reference)
+
+            for margin, wrapped in cropped.items():
+                detections, elapsed = timed_detect(wrapped, frame)
+                crop_latencies[margin].append(elapsed)
+                matched[margin] += count_matches(reference, detections, args.iou)
+
+    if frames == 0:
+        print("No frames read from the given clips")
+        return
+
+    full_mean, full_p50, full_p95 = summarize(full_latencies)
+    print(f"Camera: {camera['name']}, ROI: {camera['roi']}, detector: {detector}")
+    print(f"Frames: {frames}, people in ROI (full-frame reference): {reference_count}")
+    print(f"{'mode':>14} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'saved':>7} {'recall':>7}")
+    print(f"{'full frame':>14} {full_mean:>9.2f} {full_p50:>8.2f} {full_p95:>8.2f} {'-':>7} {'1.000':>7}")
+    for margin in margins:
+        mean, p50, p95 = summarize(crop_latencies[margin])
+        saved = (full_mean - mean) / full_mean * 100 if full_mean > 0 else 0.0
+        recall = matched[margin] / reference_count if reference_count else float('nan')
+        print(f"{'crop m=' + str(margin):>14} {mean:>9.2f} {p50:>8.2f} {p95:>8.2f} {saved:>6.1f}% {recall:>7.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+'''
+* Copyright 2025 Vo Duong Khang [C]
+*
+* Licensed under the Apache License, Version 2.0 (the "License");
+* you may not use this file except in compliance with the License.
+* You may obtain a copy of the License at
+*
+*     http://www.apache.org/licenses/LICENSE-2.0
+*
+* Unless required by applicable law or agreed to in writing, software
+* distributed under the License is distributed on an "AS IS" BASIS,
+* WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+* See the License for the specific language governing permissions and
+* limitations under the License.
+'''
+"""
+Benchmark: Sort.update() cost vs number of live tracks, batched Kalman vs one filterpy filter per track
+
+    python -m benchmarks.bench_sort --tracks 1 5 20 50 100 200 --frames 300
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.modules.tracker.sort import KalmanBoxTracker, Sort, associate_detections_to_trackers
+
+
+class FilterpySort(Sort):
+    """The previous Sort.update(): predict/update every KalmanBoxTracker in a Python loop"""
+
+    def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3):
+        super().__init__(max_age, min_hits, iou_threshold)
+
+    def update(self, dets=np.empty((0, 5))):
+        self.frame_count += 1
+        trks = np.zeros((len(self.trackers), 5))
+        to_del = []
+        ret = []
+        for t, trk in enumerate(trks):
+            pos = self.trackers[t].predict()[0]
+            trk[:] = [pos[0], pos[1], pos[2], pos[3], 0]
+            if np.any(np.isnan(pos)):
+                to_del.append(t)
+        trks = np.ma.compress_rows(np.ma.masked_invalid(trks))
+        for t in reversed(to_del):
+            self.trackers.pop(t)
+        matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets, trks, self.iou_threshold)
+        for m in matched:
+            self.trackers[m[1]].update(dets[m[0], :])
+        for i in unmatched_dets:
+            self.trackers.append(KalmanBoxTracker(dets[i, :]))
+        i = len(self.trackers)
+        for trk in reversed(self.trackers):
+            d = trk.get_state()[0]
+            if (trk.time_since_update < 1) and (trk.hit_streak >= self.min_hits or self.frame_count <= self.min_hits):
+                ret.append(np.concatenate((d, [trk.id + 1])).reshape(1, -1))
+            i -= 1
+            if trk.time_since_update > self.max_age:
+                self.trackers.pop(i)
+        if len(ret) > 0:
+            return np.concatenate(ret)
+        return np.empty((0, 5))
+
+
+def make_stream(num_tracks, num_frames, seed=0, frame_size=1920):
+    """Objects moving with constant velocity plus box noise and random misses"""
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(0, frame_size, (num_tracks, 2))
+    vel = rng.normal(0, 3, (num_tracks, 2))
+    size = rng.uniform(20, 60, (num_tracks, 2))
+    frames = []
+    for _ in range(num_frames):
+        pos += vel
+        visible = rng.random(num_tracks) > 0.1
+        dets = np.column_stack([pos, pos + size, rng.uniform(0.3, 1.0, num_tracks)])[visible]
+        dets[:, :4] += rng.normal(0, 1.0, (len(dets), 4))
+        frames.append(dets)
+    return frames
+
+
+def run(tracker_cls, frames):
+    """Return (mean seconds per update, all outputs)"""
+    KalmanBoxTracker.count = 0
+    tracker = tracker_cls(max_age=5, min_hits=3, iou_threshold=0.3)
+    outputs = []
+    start = time.perf_counter()
+    for dets in frames:
+        outputs.append(tracker.update(dets))
+    return (time.perf_counter() - start) / len(frames), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SORT update() benchmark')
+    parser.add_argument('--tracks', type=int, nargs='+', default=[1, 5, 20, 50, 100, 200], help='Live tracks')
+    parser.add_argument('--frames', type=int, default=300, help='Frames per stream')
+    args = parser.parse_args()
+
+    print(f"Frames per stream: {args.frames}")
+    print(f"{'tracks':>7} {'filterpy (ms)':>14} {'batched (ms)':>13} {'speedup':>8}")
+    for num_tracks in args.tracks:
+        frames = make_stream(num_tracks, args.frames)
+        per_track, expected = run(FilterpySort, frames)
+        batched, actual = run(Sort, frames)
+        for a, b in zip(expected, actual):
+            assert a.shape == b.shape and np.allclose(a, b), "batched Sort output differs from filterpy Sort"
+        print(f"{num_tracks:>7} {per_track * 1000:>14.3f} {batched * 1000:>13.3f} {per_track / batched:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
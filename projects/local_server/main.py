@@ -14,19 +14,22 @@
 * limitations under the License.
 '''
 import threading
-import app.webserver as webserver
-from app.modules import update_loadcell_quantity
-from app.modules import listen_rfid
-from app.modules import xg26_voice_command
-from app.modules import xg26_sensor
-from app.modules import tracking_customer_behavior
-from app.utils.sound_utils import play_sound
 def main():
+    # Imported here, not at module level: the vision worker is a spawned process that re-imports
+    # this file, and it must not load the web server, BLE or cloud modules
+    import app.webserver as webserver
+    from app.modules import update_loadcell_quantity
+    from app.modules import listen_rfid
+    from app.modules import xg26_voice_command
+    from app.modules import xg26_sensor
+    from app.modules import tracking_customer_behavior
+    from app.utils.sound_utils import play_sound
+
     threading.Thread(target=play_sound, args=("app/static/sounds/start-program.mp3",)).start()
 
     threading.Thread(target=webserver.start_webserver, daemon=True).start()
     threading.Thread(target=listen_rfid.start_listen_rfid, daemon=True).start()
-    threading.Thread(target=xg26_sensor.start_xg26_sensor, daemon=True).start()
+    xg26_sensor.start_xg26_sensor()
     threading.Thread(target=update_loadcell_quantity.start_update_loadcell_quantity, daemon=True).start()
     threading.Thread(target=tracking_customer_behavior.start_tracking_customer_behavior, daemon=True).start()
     threading.Thread(target=xg26_voice_command.start_xg26_voice_command, daemon=True).start()